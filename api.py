@@ -0,0 +1,193 @@
+"""
+Versioned JSON API on app.server with the data behind the Book Deep Dive and Your Profile pages, for other
+services. Both endpoints are multi-gets of up to MAX_IDS ids:
+
+    GET  /api/v1/books?ids=4640799,2962492&fields=title,author,rating_histogram
+    GET  /api/v1/users?ids=8842281e1d,72fb0d0087&fields=name,recommendations
+    POST /api/v1/books   {"ids": [4640799, 2962492], "fields": ["title", "similar_books"]}
+
+`fields` is optional (all fields by default). Responses are {"version", "items", "missing"}, with items in the
+order of the requested ids. Lookups go through the positional indexes of the Dataset in one vectorized call,
+and GET responses carry an ETag derived from the dataset version and the query, so a repeated request is
+answered with 304 without doing the lookup.
+"""
+import ast
+import hashlib
+import json
+
+import flask
+import numpy as np
+import pandas as pd
+
+import shared_data
+
+
+API_PREFIX = '/api/v1'
+MAX_IDS = 500
+MAX_AGE_SECONDS = 60
+
+
+# --- Field projections: name -> function(rows) returning one value per row ---
+def column(name, kind=None):
+    def values(rows):
+        if name not in rows:
+            return [None] * len(rows)
+        series = rows[name]
+        if kind == 'int':
+            return [None if pd.isna(value) else int(value) for value in series]
+        if kind == 'seconds':
+            return [None if pd.isna(value) else int(pd.to_timedelta(value).total_seconds()) for value in series]
+        series = series.astype(object)
+        return series.where(series.notna(), None).tolist()
+    return values
+
+
+def id_list(name):
+    def values(rows):
+        if name not in rows:
+            return [None] * len(rows)
+        return [[int(item) for item in (ast.literal_eval(value) if isinstance(value, str) else value)]
+                if value is not None and not (np.isscalar(value) and pd.isna(value)) else []
+                for value in rows[name]]
+    return values
+
+
+def histogram(columns):
+    def values(rows):
+        if not all(col in rows for col in columns):
+            return [None] * len(rows)
+        counts = rows[columns].fillna(0).astype('int64').to_numpy().tolist()
+        return [dict(zip(['5', '4', '3', '2', '1'], row)) for row in counts]
+    return values
+
+
+def sentiment(rows):
+    columns = ['avg_sentiment_pos', 'avg_sentiment_neu', 'avg_sentiment_neg']
+    if not all(col in rows for col in columns):
+        return [None] * len(rows)
+    return [None if any(pd.isna(value) for value in row) else dict(zip(['positive', 'neutral', 'negative'], row))
+            for row in rows[columns].to_numpy().tolist()]
+
+
+def genres(rows):
+    return [[genre.strip() for genre in value.split(',') if genre.strip()] if isinstance(value, str) else []
+            for value in rows['genres'].astype(object)]
+
+
+BOOK_FIELDS = {
+    'work_id': column('work_id', 'int'),
+    'title': column('original_title'),
+    'author': column('author'),
+    'genres': genres,
+    'year': column('original_publication_year', 'int'),
+    'num_pages': column('num_pages', 'int'),
+    'description': column('description'),
+    'image_url': column('image_url'),
+    'avg_rating': column('avg_rating'),
+    'ratings_count': column('ratings_count', 'int'),
+    'reviews_count': column('reviews_count', 'int'),
+    'popularity_score': column('popularity_score'),
+    'rating_histogram': histogram(['5_star_ratings', '4_star_ratings', '3_star_ratings', '2_star_ratings', '1_star_ratings']),
+    'sentiment': sentiment,
+    'avg_reading_time_seconds': column('Avg_Reading_Time', 'seconds'),
+    'review_summary': column('review_text_summary'),
+    'similar_books': id_list('similar_books'),
+}
+
+USER_FIELDS = {
+    'dummy_id': column('dummy_id'),
+    'name': column('name'),
+    'books_read': column('books_read', 'int'),
+    'avg_rating': column('avg_rating'),
+    'avg_reading_time_seconds': column('avg_reading_time', 'seconds'),
+    'rating_histogram': histogram(['5_star_rating', '4_star_rating', '3_star_rating', '2_star_rating', '1_star_rating']),
+    'favorite_genre': column('favorite_genre'),
+    'recent_reads': id_list('recent_reads'),
+    'recommendations': id_list('book_recs_id'),
+}
+
+
+# --- Lookups ---
+def project(rows, fields, projections):
+    columns = [projections[field](rows) for field in fields]
+    return [dict(zip(fields, values)) for values in zip(*columns)]
+
+
+def lookup(index, frame, ids):
+    """(rows of the found ids in request order, ids not found), with a single get_indexer call."""
+    positions = index.get_indexer(ids)
+    found = positions >= 0
+    return frame.iloc[positions[found]], [item for item, ok in zip(ids, found) if not ok]
+
+
+class BadRequest(Exception):
+    pass
+
+
+def parse_query(projections, id_type):
+    request = flask.request
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            raise BadRequest('the body must be a JSON object like {"ids": [...], "fields": [...]}')
+        ids, fields = body.get('ids') or [], body.get('fields')
+        if not isinstance(ids, list):
+            raise BadRequest('ids must be a list')
+        if fields is not None and not (isinstance(fields, list) and all(isinstance(field, str) for field in fields)):
+            raise BadRequest('fields must be a list of field names')
+    else:
+        ids = [item for item in request.args.get('ids', '').split(',') if item]
+        fields = request.args.get('fields')
+        fields = [field for field in fields.split(',') if field] if fields else None
+
+    if not ids:
+        raise BadRequest('ids is required')
+    if len(ids) > MAX_IDS:
+        raise BadRequest(f'at most {MAX_IDS} ids per request')
+    try:
+        ids = [id_type(item) for item in ids]
+    except (TypeError, ValueError):
+        raise BadRequest(f'ids must be {id_type.__name__} values')
+
+    fields = fields or list(projections)
+    unknown = [field for field in fields if field not in projections]
+    if unknown:
+        raise BadRequest(f"unknown fields {', '.join(map(str, unknown))}; available: {', '.join(projections)}")
+    return ids, fields
+
+
+def respond(name, projections, id_type, index_of):
+    data = shared_data.current()
+    try:
+        ids, fields = parse_query(projections, id_type)
+    except BadRequest as error:
+        return flask.jsonify({'error': str(error)}), 400
+
+    etag = None
+    if flask.request.method == 'GET':
+        etag = hashlib.sha1(json.dumps([data.version, name, ids, fields]).encode()).hexdigest()
+        if flask.request.if_none_match.contains_weak(etag):  # compressed responses carry it as a weak tag
+            response = flask.Response(status=304)
+            response.set_etag(etag)
+            return response
+
+    index, frame = index_of(data)
+    rows, missing = lookup(index, frame, ids)
+    response = flask.jsonify({'version': data.version, 'items': project(rows, fields, projections), 'missing': missing})
+    if etag:
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = MAX_AGE_SECONDS
+    return response
+
+
+def install(server):
+    """Adds the /api/v1 routes."""
+
+    @server.route(f'{API_PREFIX}/books', methods=['GET', 'POST'])
+    def api_books():
+        return respond('books', BOOK_FIELDS, int, lambda data: (data.book_index, data.df_books))
+
+    @server.route(f'{API_PREFIX}/users', methods=['GET', 'POST'])
+    def api_users():
+        return respond('users', USER_FIELDS, str, lambda data: (data.dummy_index, data.df_users))
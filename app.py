@@ -1,11 +1,41 @@
 from dash import Dash, page_registry, page_container, dcc
 import dash_bootstrap_components as dbc
+import api
+import callback_guard
+import exports
+import metrics
+import responses
+import shared_data
 
 
 # --- app Instantiation ---
-app = Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.FLATLY, dbc.icons.FONT_AWESOME])
+app = Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.FLATLY, dbc.icons.FONT_AWESOME],
+           suppress_callback_exceptions=True)  # page callbacks target components rendered by other callbacks
 server = app.server
 
+# Load the active dataset version (and start the snapshot watcher when BOOKEND_DATA_DIR is set)
+# at startup rather than on the first request
+shared_data.current()
+
+# Client id cookie used to drop superseded callback requests (see callback_guard.py)
+callback_guard.install(server)
+
+# Per-callback latency, phase and payload metrics on /metrics (see metrics.py)
+metrics.install(app)
+
+# gzip/brotli compression, ETags and the Deep Dive response cache (see responses.py)
+responses.install(app)
+
+# Streaming CSV/Parquet/Arrow download of the filtered books on /export/books.<format> (see exports.py)
+exports.install(server)
+
+# Cacheable GET route of the client-side Explorer catalog on /explorer/catalog/<version>.json (see pages/explorer.py)
+from pages import explorer  # noqa: E402  (already imported by Dash when it registered the pages)
+explorer.install(server)
+
+# Batched JSON API with the book and profile data for other services on /api/v1 (see api.py)
+api.install(server)
+
 # --- Define the desired order ---
 page_order = ['About', 'Explorer', 'Your Profile','Book Deep Dive', 'Books']
 
@@ -0,0 +1,41 @@
+// Wraps fetch for Dash callback requests (see callback_guard.py):
+// * every request carries an id of this tab and a per-tab sequence number, so the server only lets a newer
+//   request of the same tab supersede an older one;
+// * requests shed by an overloaded worker (503) are sent again after their Retry-After delay.
+
+(function () {
+    const MAX_RETRIES = 5;
+    const tabId = window.crypto && window.crypto.randomUUID ? window.crypto.randomUUID()
+                                                            : Math.random().toString(36).slice(2) + Date.now();
+    let sequence = 0;
+    const originalFetch = window.fetch;
+
+    function isCallbackRequest(resource) {
+        const url = typeof resource === 'string' ? resource : (resource && resource.url) || '';
+        return url.indexOf('_dash-update-component') !== -1;
+    }
+
+    function sleep(milliseconds) {
+        return new Promise(resolve => setTimeout(resolve, milliseconds));
+    }
+
+    async function send(resource, options, attempt) {
+        const response = await originalFetch(resource, options);
+        if (response.status !== 503 || attempt >= MAX_RETRIES) {
+            return response;
+        }
+        const delay = (parseFloat(response.headers.get('Retry-After')) || 1) * 1000;
+        await sleep(delay * (1 + Math.random()));  // jittered, so shed requests don't come back all at once
+        return send(resource, options, attempt + 1);
+    }
+
+    window.fetch = function (resource, options) {
+        if (!isCallbackRequest(resource)) {
+            return originalFetch.apply(this, arguments);
+        }
+        const headers = new Headers((options && options.headers) || {});
+        headers.set('X-Bookend-Tab', tabId);
+        headers.set('X-Bookend-Seq', String(++sequence));
+        return send(resource, Object.assign({}, options, {headers: headers}), 0);
+    };
+})();
@@ -0,0 +1,208 @@
+// Client-side versions of the Explorer callbacks (pages/explorer.py), used when BOOKEND_CLIENTSIDE_EXPLORER=1.
+// They work on the columnar catalog fetched by load_catalog from its per-version URL, which the browser caches,
+// and mirror the server callbacks, top-5 tables included: filter changes make no request to the server.
+
+(function () {
+    const PASTEL = ['rgb(102, 197, 204)', 'rgb(246, 207, 113)', 'rgb(248, 156, 116)', 'rgb(220, 176, 242)',
+                    'rgb(135, 197, 95)', 'rgb(158, 185, 243)', 'rgb(254, 136, 177)', 'rgb(201, 219, 116)',
+                    'rgb(139, 224, 164)', 'rgb(180, 151, 231)', 'rgb(179, 179, 179)'];
+
+    const MISSING_YEAR = -32768;  // books without a year, see catalog_snapshot
+
+    // --- Decoding the catalog (once per dataset version) ---
+    let decoded = null;
+
+    function typedArray(base64, Type) {
+        const bytes = Uint8Array.from(atob(base64), c => c.charCodeAt(0));
+        return new Type(bytes.buffer);
+    }
+
+    function decode(catalog) {
+        if (decoded && decoded.version === catalog.version) {
+            return decoded;
+        }
+        decoded = {
+            ...catalog,
+            work_id: typedArray(catalog.work_id, Int32Array),
+            year: typedArray(catalog.year, Int16Array),
+            reviews_count: typedArray(catalog.reviews_count, Int32Array),
+            popularity_score: typedArray(catalog.popularity_score, Float32Array),
+            avg_rating: typedArray(catalog.avg_rating, Float32Array),
+            author: typedArray(catalog.author, Int32Array),
+            genre_offsets: typedArray(catalog.genre_offsets, Int32Array),
+            genre_codes: typedArray(catalog.genre_codes, Int16Array),
+        };
+        decoded.authorCodes = new Map(catalog.authors.map((author, code) => [author, code]));
+        return decoded;
+    }
+
+    // --- Components, in the JSON form Dash renders ---
+    function component(namespace, type, props) {
+        return {namespace: namespace, type: type, props: props};
+    }
+    const html = (type, props) => component('dash_html_components', type, props);
+    const dcc = (type, props) => component('dash_core_components', type, props);
+    const dbc = (type, props) => component('dash_bootstrap_components', type, props);
+
+    function genreText(c, i) {
+        const names = [];
+        for (let j = c.genre_offsets[i]; j < c.genre_offsets[i + 1]; j++) {
+            names.push(c.genres[c.genre_codes[j]]);
+        }
+        return names.join(', ');
+    }
+
+    // same structure as table_generator in explorer.py
+    function tableGenerator(c, rows) {
+        const header = html('Thead', {children: html('Tr', {children: [html('Th', {children: ''}), html('Th', {children: ''})]})});
+        const body = html('Tbody', {children: rows.map(i => html('Tr', {children: [
+            html('Td', {children: html('Div', {
+                children: [html('Img', {src: c.image_url[i], height: '60px', className: 'me-2 rounded'})],
+                className: 'd-flex align-items-center'
+            })}),
+            html('Td', {children: html('Div', {children: [
+                html('P', {children: [
+                    dcc('Link', {
+                        children: html('Span', {children: c.title[i], className: 'text-black fw-bold me-2'}),
+                        href: '/book_dive/' + c.work_id[i], className: 'text-black fw-bold me-2'
+                    }),
+                    html('Span', {children: html('I', {children: c.authors[c.author[i]], className: 'small text-info me-2'})}),
+                    html('Span', {children: html('I', {children: c.year[i] === MISSING_YEAR ? '' : c.year[i], className: 'text-info'})}),
+                ], className: 'mb-0'}),
+                html('I', {children: html('P', {children: genreText(c, i), className: 'small mb-0 mt-0'})}),
+            ]})}),
+        ]}))});
+        return dbc('Table', {children: [header, body], hover: true, bordered: false, striped: false});
+    }
+
+    function topRows(indices, compare) {
+        return indices.slice().sort(compare).slice(0, 5);
+    }
+
+    function quantile(sortedValues, q) {
+        // linear interpolation, as pandas' Series.quantile
+        const position = (sortedValues.length - 1) * q;
+        const low = Math.floor(position), high = Math.ceil(position);
+        return sortedValues[low] + (sortedValues[high] - sortedValues[low]) * (position - low);
+    }
+
+    // --- Filtering ---
+    function filterBooks(c, authors, genres, years) {
+        let authorCodes = null;
+        if (authors && authors.length) {
+            authorCodes = new Set(authors.map(author => c.authorCodes.get(author)));
+        }
+        let genreCodes = null;
+        if (genres && genres.length) {
+            // the server matches the selected names as case-insensitive substrings of the genres
+            const patterns = genres.map(genre => genre.toLowerCase());
+            genreCodes = new Set();
+            c.genres.forEach((name, code) => {
+                if (patterns.some(pattern => name.toLowerCase().includes(pattern))) genreCodes.add(code);
+            });
+        }
+        const indices = [];
+        for (let i = 0; i < c.count; i++) {
+            if (years && (c.year[i] < years[0] || c.year[i] > years[1])) continue;
+            if (authorCodes && !authorCodes.has(c.author[i])) continue;
+            if (genreCodes) {
+                let match = false;
+                for (let j = c.genre_offsets[i]; j < c.genre_offsets[i + 1] && !match; j++) {
+                    match = genreCodes.has(c.genre_codes[j]);
+                }
+                if (!match) continue;
+            }
+            indices.push(i);
+        }
+        return indices;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        explorer: {
+            load_catalog: function (source, cached) {
+                const noUpdate = window.dash_clientside.no_update;
+                if (!source || (cached && cached.version === source.version)) {
+                    return noUpdate;
+                }
+                // a GET, so the browser's HTTP cache answers page loads until a new version is published
+                return fetch(source.url, {credentials: 'same-origin'})
+                    .then(response => response.ok ? response.json() : noUpdate)
+                    .catch(() => noUpdate);
+            },
+
+            update_dashboard: function (selectedAuthors, selectedGenres, selectedYears, catalog) {
+                const noUpdate = window.dash_clientside.no_update;
+                if (!catalog) {
+                    return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+                }
+                const c = decode(catalog);
+                const indices = filterBooks(c, selectedAuthors, selectedGenres, selectedYears);
+                if (!indices.length) {
+                    const emptyFigure = {data: [], layout: {title: {text: ' Genre Distribution of Books'},
+                                                            margin: {t: 50, r: 25, b: 25, l: 25}}};
+                    return [html('Div', {children: ['No books match the selected filters.'], className: 'mb-4'}),
+                            emptyFigure, '0', '0', '– ★', c.total_users.toLocaleString('en-US')];
+                }
+
+                // Tables
+                const mostReviewed = topRows(indices, (a, b) => c.reviews_count[b] - c.reviews_count[a]);
+                const mostPopular = topRows(indices, (a, b) => c.popularity_score[b] - c.popularity_score[a]);
+                const maxReviewGems = quantile(indices.map(i => c.reviews_count[i]).sort((a, b) => a - b), 0.5);
+                const gems = indices.filter(i => c.reviews_count[i] >= c.min_review_gems && c.reviews_count[i] <= maxReviewGems);
+                // unrated books last, as pandas sorts NaN
+                const rating = i => Number.isNaN(c.avg_rating[i]) ? -Infinity : c.avg_rating[i];
+                const hiddenGems = topRows(gems, (a, b) => (rating(b) - rating(a)) || (c.reviews_count[a] - c.reviews_count[b]));
+                const tabs = dbc('Tabs', {key: String(Date.now()), children: [
+                    dbc('Tab', {children: tableGenerator(c, mostReviewed), label: 'Most Reviewed', className: 'tab'}),
+                    dbc('Tab', {children: tableGenerator(c, mostPopular), label: 'Most Popular', className: 'tab'}),
+                    dbc('Tab', {children: tableGenerator(c, hiddenGems), label: 'Hidden Gems', className: 'tab'}),
+                ]});
+
+                // Treemap
+                const counts = new Int32Array(c.genres.length);
+                let reviews = 0, ratingSum = 0, rated = 0;
+                indices.forEach(i => {
+                    for (let j = c.genre_offsets[i]; j < c.genre_offsets[i + 1]; j++) counts[c.genre_codes[j]]++;
+                    reviews += c.reviews_count[i];
+                    if (!Number.isNaN(c.avg_rating[i])) {  // pandas' mean skips missing ratings
+                        ratingSum += c.avg_rating[i];
+                        rated++;
+                    }
+                });
+                const labels = [], values = [];
+                counts.forEach((count, code) => {
+                    if (count) { labels.push(c.genres[code]); values.push(count); }
+                });
+                const figure = {
+                    data: [{type: 'treemap', labels: labels, parents: labels.map(() => ''), values: values,
+                            ids: labels, branchvalues: 'total'}],
+                    layout: {title: {text: ' Genre Distribution of Books'}, treemapcolorway: PASTEL,
+                             margin: {t: 50, r: 25, b: 25, l: 25}},
+                };
+
+                // Cards
+                const books = new Set(indices.map(i => c.work_id[i])).size;
+                const ratingText = rated ? (ratingSum / rated).toFixed(2) + ' ★' : '– ★';
+                return [tabs, figure, books.toLocaleString('en-US'), reviews.toLocaleString('en-US'),
+                        ratingText, c.total_users.toLocaleString('en-US')];
+            },
+
+            update_slider_from_dropdown: function (selectedEra, catalog) {
+                if (!catalog) {
+                    return [window.dash_clientside.no_update, window.dash_clientside.no_update, window.dash_clientside.no_update];
+                }
+                const era = (selectedEra && catalog.eras[selectedEra]) || [null, null];
+                const newMin = era[0] === null ? catalog.min_year : era[0];
+                const newMax = era[1] === null ? catalog.max_year : era[1];
+                return [newMin, newMax, [newMin, newMax]];
+            },
+
+            store_filter_values: function (genres, authors, years, era, catalog) {
+                if (catalog && years && years[0] === catalog.min_year && years[1] === catalog.max_year) {
+                    years = null;
+                }
+                return {genres: genres, authors: authors, years: years, era: era};
+            },
+        },
+    });
+})();
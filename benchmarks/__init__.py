@@ -0,0 +1 @@
+# Benchmarks for the dashboard callbacks, run against BOOKEND_DATA_DIR or a synthetic dataset (synthetic_data.py)
@@ -0,0 +1,91 @@
+"""
+Compares the server load of the Explorer's server-side and client-side (BOOKEND_CLIENTSIDE_EXPLORER=1) modes
+for one scripted visit: dragging the year slider step by step, then picking genres and authors.
+
+In server mode every filter change is a round trip to update_dashboard and store_filter_values; in client-side
+mode the browser downloads the columnar catalog once per dataset version and filter changes make no requests.
+
+    BOOKEND_DATA_DIR=data python -m benchmarks.explorer_modes --steps 50 --output explorer_modes.json
+"""
+import argparse
+import json
+import time
+
+import plotly
+
+
+def payload_bytes(result):
+    return len(json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def filter_script(data, summary, steps):
+    """(authors, genres, years) for a slider drag followed by a few genre and author picks."""
+    min_year, max_year = summary['min_year'], summary['max_year']
+    span = max_year - min_year
+    script = [(None, None, [min_year + span * step // (2 * steps), max_year]) for step in range(steps)]
+    genres = summary['genre_options'][:3]
+    authors = data.df_books['author'].value_counts().index[:2].tolist()
+    for count in range(1, len(genres) + 1):
+        script.append((None, genres[:count], [min_year, max_year]))
+    for count in range(1, len(authors) + 1):
+        script.append((authors[:count], genres[:1], [min_year, max_year]))
+    return script
+
+
+def measure(fn):
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = fn()
+    return result, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def run(steps):
+    import app  # noqa: F401  (instantiates the Dash app, which registers the pages)
+    import shared_data
+    from pages import explorer
+
+    data = shared_data.current()
+    summary = explorer.catalog_summary(data)
+    script = filter_script(data, summary, steps)
+
+    server = {'requests': 0, 'response_bytes': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0}
+    for authors, genres, years in script:
+        for fn in (lambda: explorer.update_dashboard(authors, genres, years),
+                   lambda: explorer.store_filter_values(genres, authors, years, None)):
+            result, wall, cpu = measure(fn)
+            server['requests'] += 1
+            server['response_bytes'] += payload_bytes(result)
+            server['wall_seconds'] += wall
+            server['cpu_seconds'] += cpu
+
+    # the snapshot is cached per dataset version, so this is the cost paid once per version and worker; the
+    # browser caches it too, and the filter changes of the script are all handled in the browser
+    body, wall, cpu = measure(lambda: explorer.catalog_snapshot_body.__wrapped__(data))
+    client = {'requests': 1, 'response_bytes': len(body), 'wall_seconds': wall, 'cpu_seconds': cpu}
+
+    return {
+        'dataset_version': data.version,
+        'books': len(data.df_books),
+        'filter_changes': len(script),
+        'server_mode': server,
+        'client_mode': client,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare server load of the Explorer filtering modes.')
+    parser.add_argument('--steps', type=int, default=50, help='year slider steps in the scripted visit')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.steps)
+    for mode in ['server_mode', 'client_mode']:
+        numbers = results[mode]
+        print(f"{mode:12} {numbers['requests']:5} requests  {numbers['response_bytes'] / 1e6:8.2f} MB  "
+              f"{numbers['cpu_seconds']:7.3f} s CPU")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
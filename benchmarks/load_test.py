@@ -0,0 +1,329 @@
+"""
+End-to-end load test: starts `gunicorn app:server` on a synthetic dataset for each worker/thread configuration,
+replays callback traffic against it with a ramp of concurrent simulated readers and reports throughput,
+latency percentiles and error rates per configuration and concurrency level. Everything runs locally.
+
+    python -m benchmarks.load_test --data-dir bench-data --scale small --configs 2x1 4x1 2x4 4x4 \\
+        --concurrency 1 8 32 64 --duration 20 --output run-a.json
+    python -m benchmarks.load_test --report run-a.json run-b.json
+
+Traffic mix (weights set with --mix):
+* explorer: a filter change, i.e. update_dashboard with random genres and year range;
+* book: a Book Deep Dive visit, i.e. every callback fired by the page URL, for a book drawn from a Zipf
+  distribution over the books ranked by review count;
+* profile: update_profile_page for a random user.
+
+Request payloads are built from the app's /_dash-dependencies, so they match the running code. Every simulated
+reader keeps its own connection and client cookie, like a browser tab.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic_data
+from pipeline.snapshots import latest_version, snapshot_path, table_path
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPDATE_PATH = '/_dash-update-component'
+BOOK_DIVE_CALLBACKS = ['book-detail-content-area', 'grqph1', 'book-summary-area', 'book-reviews-area',
+                       'graph2', 'book-similar-area']
+
+
+# --- Payloads ---
+def parse_output(output):
+    """'..a.children...b.figure..' or 'a.children' -> [{'id': 'a', 'property': 'children'}, ...]"""
+    parts = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [dict(zip(['id', 'property'], part.rsplit('.', 1))) for part in parts]
+
+
+def find_dependency(dependencies, output_id):
+    for dependency in dependencies:
+        if any(output['id'] == output_id for output in parse_output(dependency['output'])):
+            return dependency
+    return None
+
+
+def payload(dependency, values, changed):
+    """The body Dash's renderer posts for one callback; values maps 'id.property' to input/state values."""
+    outputs = parse_output(dependency['output'])
+    return {
+        'output': dependency['output'],
+        'outputs': outputs if dependency['output'].startswith('..') else outputs[0],
+        'inputs': [{**item, 'value': values.get(f"{item['id']}.{item['property']}")} for item in dependency['inputs']],
+        'state': [{**item, 'value': values.get(f"{item['id']}.{item['property']}")} for item in dependency['state']],
+        'changedPropIds': [changed],
+    }
+
+
+class Traffic:
+    """Builds the request sequences of the three scenarios from the dataset and the app's dependencies."""
+
+    def __init__(self, data_dir, dependencies, zipf_exponent=1.1):
+        folder = snapshot_path(data_dir, latest_version(data_dir))
+        books = pd.read_parquet(table_path(folder, 'books'), columns=['work_id', 'genres', 'reviews_count',
+                                                                      'original_publication_year'])
+        users = pd.read_parquet(table_path(folder, 'users'), columns=['dummy_id'])
+
+        self.work_ids = books.sort_values('reviews_count', ascending=False)['work_id'].to_numpy()
+        weights = 1.0 / np.arange(1, len(self.work_ids) + 1) ** zipf_exponent
+        self.book_cdf = np.cumsum(weights / weights.sum())
+        self.dummy_ids = users['dummy_id'].tolist()
+        self.genres = sorted({genre.strip().capitalize() for genres in books['genres'].dropna().unique()
+                              for genre in genres.split(',') if genre.strip()})
+        self.years = (int(books['original_publication_year'].min()), int(books['original_publication_year'].max()))
+
+        self.dashboard = find_dependency(dependencies, 'genre_treemap')
+        self.profile = find_dependency(dependencies, 'profile-content-area')
+        self.book_dive = [dependency for dependency in (find_dependency(dependencies, output_id)
+                                                        for output_id in BOOK_DIVE_CALLBACKS) if dependency]
+
+    def available(self):
+        return {'explorer': self.dashboard is not None, 'book': bool(self.book_dive), 'profile': self.profile is not None}
+
+    def requests(self, scenario, rng):
+        """[(callback label, body), ...] for one user action of the scenario."""
+        if scenario == 'explorer':
+            start = rng.randint(self.years[0], self.years[1])
+            values = {'genre-dropdown.value': rng.sample(self.genres, rng.randint(0, 2)),
+                      'author-dropdown.value': [], 'year-slider.value': [start, self.years[1]]}
+            return [('update_dashboard', payload(self.dashboard, values, 'year-slider.value'))]
+        if scenario == 'book':
+            work_id = int(self.work_ids[np.searchsorted(self.book_cdf, rng.random())])
+            values = {'book-dive-url.pathname': f'/book_dive/{work_id}'}
+            return [(parse_output(dependency['output'])[0]['id'], payload(dependency, values, 'book-dive-url.pathname'))
+                    for dependency in self.book_dive]
+        values = {'load-profile-button.n_clicks': 1, 'user-id-input.value': rng.choice(self.dummy_ids)}
+        return [('update_profile_page', payload(self.profile, values, 'load-profile-button.n_clicks'))]
+
+
+# --- Server ---
+class Server:
+    """A gunicorn app:server subprocess serving the data directory."""
+
+    def __init__(self, data_dir, workers, threads, port, startup_timeout=600):
+        self.port = port
+        command = [sys.executable, '-m', 'gunicorn', 'app:server', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--threads', str(threads), '--timeout', '300']
+        env = {**os.environ, 'BOOKEND_DATA_DIR': data_dir}
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, env=env, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=self.log)
+        self._wait_ready(startup_timeout)
+
+    def request(self, method, path, body=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def _wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                self.log.seek(0)
+                raise RuntimeError(f"gunicorn exited: {self.log.read().decode(errors='replace')[-2000:]}")
+            try:
+                if self.request('GET', '/_dash-dependencies')[0] == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        raise TimeoutError('gunicorn did not become ready')
+
+    def dependencies(self):
+        return json.loads(self.request('GET', '/_dash-dependencies')[1])
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+# --- Load generation ---
+class Reader(threading.Thread):
+    """One simulated browser tab: a keep-alive connection and a client cookie, issuing actions back to back."""
+
+    def __init__(self, port, traffic, mix, stop, results, seed):
+        super().__init__(daemon=True)
+        self.port, self.traffic, self.stop, self.results = port, traffic, stop, results
+        self.scenarios, self.weights = zip(*mix.items())
+        self.random = random.Random(seed)
+        self.cookie = None
+        self.tab, self.sequence = uuid.uuid4().hex, 0
+
+    def post(self, connection, body):
+        # the tab id and sequence number assets/callback_retry.js adds to every callback request
+        self.sequence += 1
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip, br',
+                   'X-Bookend-Tab': self.tab, 'X-Bookend-Seq': str(self.sequence)}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        connection.request('POST', UPDATE_PATH, body=json.dumps(body), headers=headers)
+        response = connection.getresponse()
+        content = response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, len(content)
+
+    def run(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        while not self.stop.is_set():
+            scenario = self.random.choices(self.scenarios, self.weights)[0]
+            for label, body in self.traffic.requests(scenario, self.random):
+                start = time.perf_counter()
+                try:
+                    status, size = self.post(connection, body)
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+                    status, size = 'error', 0
+                self.results.append((time.perf_counter(), scenario, label, time.perf_counter() - start, status, size))
+        connection.close()
+
+
+def summarize(samples, seconds):
+    latencies = np.array([sample[3] for sample in samples]) * 1000
+    errors = sum(1 for sample in samples if sample[4] not in (200, 204))
+    if not len(latencies):
+        return {'requests': 0, 'errors': 0}
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / seconds, 2),
+        'error_rate': round(errors / len(samples), 4),
+        'shed_rate': round(sum(1 for sample in samples if sample[4] == 503) / len(samples), 4),  # retried by browsers
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p90_ms': round(float(np.percentile(latencies, 90)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        'max_ms': round(float(latencies.max()), 2),
+        'mean_response_bytes': int(np.mean([sample[5] for sample in samples])),
+    }
+
+
+def run_step(server, traffic, mix, concurrency, duration, warmup):
+    stop, results = threading.Event(), []
+    readers = [Reader(server.port, traffic, mix, stop, results, seed) for seed in range(concurrency)]
+    for reader in readers:
+        reader.start()
+    time.sleep(warmup)
+    measured_from = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    measured_to = time.perf_counter()
+    for reader in readers:
+        reader.join()
+
+    samples = [sample for sample in results if measured_from <= sample[0] <= measured_to]
+    step = {'concurrency': concurrency, **summarize(samples, measured_to - measured_from)}
+    step['by_callback'] = {label: summarize([sample for sample in samples if sample[2] == label], measured_to - measured_from)
+                           for label in sorted({sample[2] for sample in samples})}
+    return step
+
+
+def run_config(data_dir, workers, threads, concurrency_levels, duration, warmup, mix, port):
+    server = Server(data_dir, workers, threads, port)
+    try:
+        traffic = Traffic(data_dir, server.dependencies())
+        missing = [scenario for scenario, ok in traffic.available().items() if not ok and mix.get(scenario)]
+        if missing:
+            print(f"  not served by this app configuration, skipped: {', '.join(missing)}")
+        mix = {scenario: weight for scenario, weight in mix.items() if weight and scenario not in missing}
+
+        steps = []
+        for concurrency in concurrency_levels:
+            step = run_step(server, traffic, mix, concurrency, duration, warmup)
+            steps.append(step)
+            print(f"  {workers}x{threads} c={concurrency:4}  {step.get('throughput_rps', 0):8.1f} req/s  "
+                  f"p50 {step.get('p50_ms', 0):8.1f} ms  p99 {step.get('p99_ms', 0):8.1f} ms  "
+                  f"errors {step.get('error_rate', 0):6.2%}")
+        return {'workers': workers, 'threads': threads, 'steps': steps}
+    finally:
+        server.stop()
+
+
+# --- Report ---
+def report(runs):
+    """Peak throughput and the p99 at each concurrency of every configuration, one column per run."""
+    names = [run['name'] for run in runs]
+    print(f"{'config':10} {'concurrency':>11}  " + '  '.join(f'{name[:24]:>24}' for name in names))
+    keys = sorted({(config['workers'], config['threads']) for run in runs for config in run['configs']})
+    for workers, threads in keys:
+        levels = sorted({step['concurrency'] for run in runs for config in run['configs']
+                         if (config['workers'], config['threads']) == (workers, threads) for step in config['steps']})
+        for concurrency in levels:
+            cells = []
+            for run in runs:
+                step = next((step for config in run['configs'] if (config['workers'], config['threads']) == (workers, threads)
+                             for step in config['steps'] if step['concurrency'] == concurrency), None)
+                cells.append(f"{step.get('throughput_rps', 0):8.1f}/s p99 {step.get('p99_ms', 0):7.0f}ms" if step else '-')
+            print(f"{workers}x{threads:<8} {concurrency:>11}  " + '  '.join(f'{cell:>24}' for cell in cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test gunicorn app:server with replayed callback traffic.')
+    parser.add_argument('--data-dir', default='bench-data', help='snapshot directory, generated when empty')
+    parser.add_argument('--scale', choices=synthetic_data.SCALES, default='small', help='scale of generated data')
+    parser.add_argument('--configs', nargs='*', default=['2x1', '4x1', '2x4'], help='WORKERSxTHREADS')
+    parser.add_argument('--concurrency', nargs='*', type=int, default=[1, 8, 32], help='simulated readers per step')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per step')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds at the start of each step')
+    parser.add_argument('--mix', nargs=3, type=float, default=[0.4, 0.4, 0.2], metavar=('EXPLORER', 'BOOK', 'PROFILE'))
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--name', help='name of this run in reports (defaults to the output file name)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--report', nargs='*', help='only print a comparison of these result files')
+    args = parser.parse_args(argv)
+
+    if args.report:
+        runs = []
+        for path in args.report:
+            with open(path) as file:
+                runs.append(json.load(file))
+        report(runs)
+        return
+
+    if not latest_version(args.data_dir):
+        books, reviews = synthetic_data.SCALES[args.scale]
+        print(f"Generating {args.scale} synthetic data in {args.data_dir}")
+        synthetic_data.generate(args.data_dir, books, reviews)
+
+    mix = dict(zip(['explorer', 'book', 'profile'], args.mix))
+    configs = []
+    for config in args.configs:
+        workers, threads = (int(value) for value in config.lower().split('x'))
+        configs.append(run_config(os.path.abspath(args.data_dir), workers, threads, args.concurrency, args.duration,
+                                  args.warmup, mix, args.port))
+
+    results = {
+        'name': args.name or (os.path.splitext(os.path.basename(args.output))[0] if args.output else 'run'),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'dataset_version': latest_version(args.data_dir),
+        'cpu_count': os.cpu_count(),
+        'mix': mix,
+        'configs': configs,
+    }
+    report([results])
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Calls the heaviest page callbacks directly against a dataset and records, per scenario, latency percentiles,
+the peak memory allocated while computing one response and the size of the JSON response.
+
+    python -m benchmarks.synthetic_data --scale small --out bench-data
+    python -m benchmarks.run_callbacks --data-dir bench-data --repeat 20 --output small.json
+    python -m benchmarks.run_callbacks --data-dir bench-data --compare small.json
+
+The callbacks are unwrapped from the callback_guard decorators, so the numbers are the cost of one
+computation. Caches keyed by dataset version are warm after the first call of a scenario; that first call is
+reported separately as `first_ms`. A Book Deep Dive visit fires one callback per section: each of them is a
+scenario of its own, and `deep_dive_visit/*` calls all of them in turn, the server time of a whole page view.
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.explorer_modes import payload_bytes
+
+
+# The Book Deep Dive callbacks triggered by a page view, one per section of the page
+DEEP_DIVE_CALLBACKS = ['update_book_details', 'update_rating_chart', 'update_review_summary', 'update_reviews',
+                       'update_sentiment_chart', 'update_similar_books']
+
+
+def deep_dive_visit(book_dive):
+    sections = [inspect.unwrap(getattr(book_dive, name)) for name in DEEP_DIVE_CALLBACKS]
+
+    def visit(pathname):
+        return [section(pathname) for section in sections]
+    return visit
+
+
+def scenarios(data, summary, pages, sample=5):
+    """name -> list of argument tuples; every call of a run cycles through its list."""
+    explorer, books_all, book_dive, recommender = pages
+    min_year, max_year = summary['min_year'], summary['max_year']
+    genres = summary['genre_options'][:2]
+    authors = data.df_books['author'].value_counts().index[:2].tolist()
+
+    by_reviews = data.df_books.sort_values('reviews_count', ascending=False)['work_id']
+    popular_books = by_reviews.head(sample).tolist()
+    tail_books = by_reviews.tail(sample).tolist()
+    by_books_read = data.df_users.sort_values('books_read', ascending=False)['dummy_id']
+    heavy_readers = by_books_read.head(sample).tolist()
+
+    def stored(genres=None, authors=None, years=None, era=None):
+        return ({'genres': genres, 'authors': authors, 'years': years, 'era': era},)
+
+    book_paths = {
+        'popular': [(f'/book_dive/{work_id}',) for work_id in popular_books],
+        'tail': [(f'/book_dive/{work_id}',) for work_id in tail_books],
+    }
+    deep_dive = {f'{name}/{books}': (getattr(book_dive, name), calls)
+                 for name in DEEP_DIVE_CALLBACKS for books, calls in book_paths.items()}
+    deep_dive.update({f'deep_dive_visit/{books}': (deep_dive_visit(book_dive), calls)
+                      for books, calls in book_paths.items()})
+
+    return {
+        'update_dashboard/all': (explorer.update_dashboard, [(None, None, [min_year, max_year])]),
+        'update_dashboard/genres': (explorer.update_dashboard, [(None, genres, [min_year, max_year])]),
+        'update_dashboard/authors': (explorer.update_dashboard, [(authors, None, [min_year, max_year])]),
+        'update_dashboard/years': (explorer.update_dashboard, [(None, None, [2000, max_year])]),
+        'update_table/genres': (books_all.update_table, [stored(genres=genres)]),
+        'update_table/years': (books_all.update_table, [stored(years=[2000, max_year], era='2000s')]),
+        **deep_dive,
+        'update_profile_page/heavy_readers': (recommender.update_profile_page, [(1, dummy_id) for dummy_id in heavy_readers]),
+        'update_profile_page/random': (recommender.update_profile_page,
+                                       [(1, dummy_id) for dummy_id in data.df_users['dummy_id'].sample(sample, random_state=0)]),
+    }
+
+
+def measure(fn, calls, repeat):
+    fn = inspect.unwrap(fn)  # skip the callback_guard wrappers
+
+    first = time.perf_counter()
+    result = fn(*calls[0])
+    first = time.perf_counter() - first
+
+    latencies = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(*calls[i % len(calls)])
+        latencies.append(time.perf_counter() - start)
+
+    # a separate traced pass, tracemalloc slows the calls down too much to time them at the same time
+    tracemalloc.start()
+    peaks = []
+    for args in calls:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn(*args)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'calls': repeat,
+        'first_ms': round(first * 1000, 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p90_ms': round(float(np.percentile(latencies, 90)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'peak_memory_bytes': int(max(peaks)),
+        'response_bytes': payload_bytes(result),
+    }
+
+
+def run(repeat, only=None):
+    import app  # noqa: F401  (instantiates the Dash app, which registers the pages)
+    import shared_data
+    from pages import book_dive, books_all, explorer, recommender
+
+    data = shared_data.current()
+    summary = explorer.catalog_summary(data)
+    cases = scenarios(data, summary, (explorer, books_all, book_dive, recommender))
+
+    results = {}
+    for name, (fn, calls) in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(fn, calls, repeat)
+        print(f"{name:38} p50 {results[name]['p50_ms']:9.2f} ms  p99 {results[name]['p99_ms']:9.2f} ms  "
+              f"peak {results[name]['peak_memory_bytes'] / 1e6:8.2f} MB  response {results[name]['response_bytes'] / 1e3:9.1f} kB")
+
+    return {
+        'dataset_version': data.version,
+        'books': len(data.df_books),
+        'reviews': int(summary['total_reviews']),
+        'users': len(data.df_users),
+        'python': platform.python_version(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'scenarios': results,
+    }
+
+
+def compare(baseline, results):
+    """Prints the p50/p99 ratio of every scenario present in both runs (below 1 is faster)."""
+    for name, numbers in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            continue
+        ratios = [numbers[key] / before[key] if before[key] else float('nan') for key in ['p50_ms', 'p99_ms']]
+        print(f"{name:38} p50 x{ratios[0]:5.2f}  p99 x{ratios[1]:5.2f}  "
+              f"response {numbers['response_bytes'] - before['response_bytes']:+,} bytes")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the page callbacks against a dataset.')
+    parser.add_argument('--data-dir', help='snapshot directory to load (defaults to BOOKEND_DATA_DIR)')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per scenario')
+    parser.add_argument('--only', nargs='*', help='run only the scenarios starting with these names')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='a previous JSON result to compare this run with')
+    args = parser.parse_args(argv)
+
+    if args.data_dir:
+        os.environ['BOOKEND_DATA_DIR'] = args.data_dir  # read by shared_data when it is first imported
+
+    results = run(args.repeat, args.only)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Seeded generator of synthetic datasets with the columns the pages read, for benchmarking without the GCS data.
+
+Books, selected_reviews, users and sunburst are written with the schemas of pipeline.ingest and published as a
+snapshot, so the app and the benchmarks can load it through BOOKEND_DATA_DIR:
+
+    python -m benchmarks.synthetic_data --scale medium --out bench-data
+    BOOKEND_DATA_DIR=bench-data python -m benchmarks.run_callbacks
+
+Review counts, authors and reading histories follow power laws, so a few books and authors dominate as in
+the real catalog. Reviews are generated and written one bucket at a time, which keeps memory bounded by the
+bucket size even at 10M reviews.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from pipeline.catalog import write_catalog
+from pipeline.incremental import IncrementalAggregator
+from pipeline.ingest import BOOK_SCHEMA, RECENT_READS, REVIEW_SCHEMA, SUNBURST_SCHEMA, USER_SCHEMA, dummy_ids, to_table
+from pipeline.review_features import SENTIMENT_COLS
+from pipeline.snapshots import BOOK_ROW_GROUP, REVIEW_ROW_GROUP, USER_ROW_GROUP, publish_snapshot
+
+
+# (books, reviews)
+SCALES = {
+    'small': (10_000, 100_000),
+    'medium': (100_000, 1_000_000),
+    'large': (1_000_000, 10_000_000),
+}
+BUCKETS = 32
+SUNBURST_BOOKS = 10  # books on a user's shelf: the sunburst rows, the first RECENT_READS are the recent reads
+
+GENRES = [
+    'fiction', 'fiction, romance', 'fantasy, paranormal, fiction', 'mystery, thriller, crime, fiction',
+    'young-adult, fantasy, paranormal', 'history, historical fiction, biography', 'non-fiction, history',
+    'romance', 'children, fiction', 'comics, graphic', 'poetry', 'non-fiction',
+]
+GENRE_WEIGHTS = np.array([20, 14, 12, 12, 9, 8, 7, 6, 5, 3, 2, 2], dtype='float64')
+
+FIRST_NAMES = ['Anna', 'James', 'Maria', 'John', 'Elena', 'David', 'Sofia', 'Peter', 'Laura', 'Michael',
+               'Chloe', 'Samuel', 'Irene', 'Thomas', 'Nadia', 'George', 'Olivia', 'Henry', 'Julia', 'Victor']
+LAST_NAMES = ['Smith', 'García', 'Müller', 'Rossi', 'Novak', 'Kowalski', 'Dubois', 'Silva', 'Ivanova', 'Brown',
+              'Jensen', 'Nakamura', 'Okafor', 'Larsen', 'Moreau', 'Costa', 'Walsh', 'Horvat', 'Reyes', 'Lindqvist']
+WORDS = ('river night house shadow garden letter winter secret city stone light fire daughter king sea road '
+         'memory storm silence island heart forest war promise glass summer name mountain book wolf star '
+         'mirror kingdom ghost crown bridge journey truth morning dream lost hidden last silent broken dark '
+         'golden wild quiet long little first').split()
+REVIEW_PHRASES = [
+    'I could not put it down.', 'The characters felt real.', 'The pacing dragged in the middle.',
+    'Beautifully written.', 'The ending surprised me.', 'Not my kind of book.', 'A slow start but worth it.',
+    'The world building is wonderful.', 'I expected more from the plot.', 'I will read it again.',
+    'The dialogue is sharp and funny.', 'Too long for what it has to say.', 'A perfect summer read.',
+]
+
+
+def zipf_weights(count, exponent, rng):
+    """Power law weights over a random order of `count` items, summing to 1."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    weights = weights[rng.permutation(count)]
+    return weights / weights.sum()
+
+
+def random_text(rng, words, low, high):
+    return ' '.join(rng.choice(words, size=rng.integers(low, high)))
+
+
+# --- Books ---
+def make_books(n_books, rng):
+    work_ids = np.sort(rng.choice(np.arange(1, n_books * 20), size=n_books, replace=False)).astype('int64')
+
+    n_authors = max(50, n_books // 8)
+    author_names = np.array([f'{FIRST_NAMES[i % 20]} {LAST_NAMES[(i // 20) % 20]}' + (f' {i // 400}' if i >= 400 else '')
+                             for i in range(n_authors)], dtype=object)
+    authors = author_names[rng.choice(n_authors, size=n_books, p=zipf_weights(n_authors, 0.8, rng))]
+    genres = np.array(GENRES, dtype=object)[rng.choice(len(GENRES), size=n_books, p=GENRE_WEIGHTS / GENRE_WEIGHTS.sum())]
+
+    words = np.array(WORDS, dtype=object)
+    titles = ('The ' + pd.Series(rng.choice(words, n_books)).str.capitalize() + ' '
+              + pd.Series(rng.choice(words, n_books)).str.capitalize())
+    similar = work_ids[rng.integers(0, n_books, size=(n_books, 5))]
+    years = np.clip(np.round(rng.normal(1995, 25, size=n_books)), 1600, 2017)
+
+    return pd.DataFrame({
+        'work_id': work_ids,
+        'book_id': work_ids * 3 + 1,
+        'original_title': titles.values,
+        'author': authors,
+        'genres': genres,
+        'original_publication_year': years,
+        'num_pages': np.clip(np.round(rng.lognormal(5.7, 0.4, size=n_books)), 24, 2000),
+        'description': [random_text(rng, words, 20, 80) for _ in range(n_books)],
+        'image_url': [f'https://images.gr-assets.com/books/{work_id}m/{work_id}.jpg' for work_id in work_ids],
+        'similar_books': [str(sorted(set(row))) for row in similar.tolist()],
+    })
+
+
+# --- Reviews ---
+def make_user_ids(n_users, rng):
+    high, low = rng.integers(0, 2 ** 63, size=n_users), rng.integers(0, 2 ** 63, size=n_users)
+    return np.array([f'{a:016x}{b:016x}' for a, b in zip(high, low)], dtype=object)
+
+
+def write_reviews(folder, df_books, review_counts, user_ids, user_weights, rng, buckets=BUCKETS):
+    """Writes selected_reviews/bucket=NNN/part-0.parquet sorted by work_id; returns the per-book star counts."""
+    quality = np.clip(rng.normal(3.9, 0.35, size=len(df_books)), 1.5, 4.9)
+    texts = np.array([' '.join(rng.choice(REVIEW_PHRASES, size=rng.integers(1, 12))) for _ in range(1000)], dtype=object)
+    stars = np.zeros(len(df_books) * 5, dtype='int64')
+    start = pd.Timestamp('2010-01-01', tz='UTC').value // 1000
+    span = pd.Timedelta(days=365 * 7).value // 1000
+
+    work_ids = df_books['work_id'].values
+    for bucket in range(buckets):
+        positions = np.flatnonzero(work_ids % buckets == bucket)
+        positions = np.repeat(positions, review_counts[positions])
+        if not len(positions):
+            continue
+        rows = len(positions)
+        rating = np.clip(np.round(quality[positions] + rng.normal(0, 0.9, size=rows)), 1, 5).astype('int8')
+        stars += np.bincount(positions * 5 + rating - 1, minlength=len(stars))
+
+        started = start + rng.integers(0, span, size=rows)
+        read = started + rng.integers(1, 60, size=rows) * 86_400_000_000
+        df = pd.DataFrame({
+            'user_id': user_ids[rng.choice(len(user_ids), size=rows, p=user_weights)],
+            'work_id': work_ids[positions],
+            'rating': rating,
+            'review_text': texts[rng.integers(0, len(texts), size=rows)],
+            'date_added': pd.to_datetime(read + rng.integers(0, 86_400_000_000, size=rows), unit='us', utc=True),
+            'started_at': pd.to_datetime(started, unit='us', utc=True),
+            'read_at': pd.to_datetime(read, unit='us', utc=True),
+        })
+        target = os.path.join(folder, 'selected_reviews', f'bucket={bucket:03d}')
+        os.makedirs(target)
+        pq.write_table(to_table(df, REVIEW_SCHEMA), os.path.join(target, 'part-0.parquet'),
+                       row_group_size=REVIEW_ROW_GROUP)
+    return stars.reshape(-1, 5)
+
+
+def add_review_features(df_books, review_counts, stars, rng):
+    n_books = len(df_books)
+    for star in range(5, 0, -1):
+        df_books[f'{star}_star_ratings'] = stars[:, star - 1]
+    df_books['reviews_count'] = review_counts.astype('int64')
+    df_books['ratings_count'] = review_counts * rng.integers(3, 30, size=n_books) + rng.integers(0, 20, size=n_books)
+    rated = stars.sum(axis=1)
+    mean_stars = (stars * np.arange(1, 6)).sum(axis=1) / np.maximum(rated, 1)
+    df_books['avg_rating'] = np.where(rated > 0, mean_stars, np.round(rng.uniform(3, 4.5, size=n_books), 2))
+
+    positive = np.clip((df_books['avg_rating'].values - 1) / 4 * 0.6 + rng.normal(0, 0.05, size=n_books), 0.01, 0.9)
+    negative = np.clip((1 - positive) * rng.uniform(0.1, 0.5, size=n_books), 0.01, 0.9)
+    for col, values in zip(SENTIMENT_COLS, [positive, 1 - positive - negative, negative]):
+        df_books[col] = np.where(review_counts > 0, values, np.nan)
+    df_books['Avg_Reading_Time'] = pd.to_timedelta(rng.integers(86_400, 86_400 * 40, size=n_books), unit='s')
+    df_books['review_text_summary'] = [REVIEW_PHRASES[i] for i in rng.integers(0, len(REVIEW_PHRASES), size=n_books)]
+
+    aggregator = IncrementalAggregator.from_books(df_books)
+    df_books['popularity_score'] = aggregator.stats['popularity_score'].values
+    df_books['popularity_rank'] = aggregator.stats['popularity_rank'].values.astype('int64')
+    return df_books
+
+
+# --- Users ---
+def make_users(df_books, user_ids, book_weights, rng):
+    n_users = len(user_ids)
+    books_read = np.minimum(rng.zipf(1.8, size=n_users), 2000)
+    shelf_sizes = np.minimum(books_read, SUNBURST_BOOKS)
+    shelf = df_books['work_id'].values[rng.choice(len(df_books), size=shelf_sizes.sum(), p=book_weights)]
+    offsets = np.concatenate([[0], np.cumsum(shelf_sizes)])
+
+    star_shares = rng.dirichlet([5, 6, 3, 1, 1], size=n_users)  # 5 stars first
+    stars = np.round(star_shares * books_read[:, None]).astype('int64')
+    main_genre = df_books['genres'].str.split(',').str[0].str.strip().str.capitalize().values
+
+    users = pd.DataFrame({
+        'user_id': user_ids,
+        'dummy_id': dummy_ids(user_ids).reindex(user_ids).values,
+        'books_read': books_read.astype('int64'),
+        'avg_rating': (star_shares * np.arange(5, 0, -1)).sum(axis=1),
+        'avg_reading_time': pd.to_timedelta(rng.integers(86_400, 86_400 * 40, size=n_users), unit='s'),
+        'recent_reads': [shelf[offsets[i]:offsets[i] + RECENT_READS].tolist() for i in range(n_users)],
+        'favorite_genre': main_genre[rng.integers(0, len(df_books), size=n_users)],
+        'book_recs_id': [str(rng.choice(shelf, size=5).tolist()) for _ in range(n_users)],
+    })
+    users['name'] = 'Reader ' + users['dummy_id']
+    for star in range(5, 0, -1):
+        users[f'{star}_star_rating'] = stars[:, 5 - star]
+
+    book_positions = df_books['work_id'].searchsorted(shelf)
+    sunburst = pd.DataFrame({
+        'user_id': np.repeat(user_ids, shelf_sizes),
+        'work_id': shelf,
+        'main_genre': main_genre[book_positions],
+        'author': df_books['author'].values[book_positions],
+    }).sort_values('user_id', kind='stable')
+    return users[USER_SCHEMA.names], sunburst
+
+
+def generate(data_dir, n_books, n_reviews, n_users=None, seed=0):
+    """Publishes one synthetic snapshot into data_dir and returns its version."""
+    n_users = n_users or int(np.clip(n_reviews // 25, 1_000, 2_000_000))
+    os.makedirs(data_dir, exist_ok=True)
+
+    def write(folder):
+        rng = np.random.default_rng(seed)
+        df_books = make_books(n_books, rng)
+        book_weights = zipf_weights(n_books, 1.1, rng)
+        review_counts = rng.multinomial(n_reviews, book_weights)
+
+        user_ids = make_user_ids(n_users, rng)
+        stars = write_reviews(folder, df_books, review_counts, user_ids, zipf_weights(n_users, 0.9, rng), rng)
+        df_books = add_review_features(df_books, review_counts, stars, rng)
+        pq.write_table(to_table(df_books, BOOK_SCHEMA), os.path.join(folder, 'books.parquet'),
+                       row_group_size=BOOK_ROW_GROUP)
+
+        users, sunburst = make_users(df_books, user_ids, book_weights, rng)
+        pq.write_table(to_table(users, USER_SCHEMA), os.path.join(folder, 'users.parquet'), row_group_size=USER_ROW_GROUP)
+        pq.write_table(to_table(sunburst, SUNBURST_SCHEMA), os.path.join(folder, 'sunburst.parquet'),
+                       row_group_size=USER_ROW_GROUP)
+        write_catalog(folder, df_books, n_users)
+
+    return publish_snapshot(data_dir, write)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic dataset snapshot for the benchmarks.')
+    parser.add_argument('--out', required=True, help='data directory (BOOKEND_DATA_DIR) to publish into')
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--books', type=int, help='overrides the number of books of the scale')
+    parser.add_argument('--reviews', type=int, help='overrides the number of reviews of the scale')
+    parser.add_argument('--users', type=int, help='defaults to one user per 25 reviews')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    n_books, n_reviews = SCALES[args.scale]
+    version = generate(args.out, args.books or n_books, args.reviews or n_reviews, args.users, args.seed)
+    print(f"Published synthetic snapshot {version} in {args.out}")
+
+
+if __name__ == '__main__':
+    main()
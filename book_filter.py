@@ -0,0 +1,40 @@
+"""
+The Explorer's filter spec, as stored in shared-filter-store ({'genres': [...], 'authors': [...], 'years': [from, to],
+'era': ...}), applied to df_books. Shared by the Explorer, the Books page and the export endpoint.
+"""
+import re
+
+import numpy as np
+
+
+def filter_mask(df_books, genres=None, authors=None, years=None):
+    """Boolean numpy mask of the books matching every given filter (genres match as case-insensitive substrings)."""
+    mask = np.ones(len(df_books), dtype=bool)
+    if genres:
+        pattern = '|'.join(re.escape(genre) for genre in genres)
+        mask &= df_books['genres'].astype(str).str.contains(pattern, case=False, na=False).to_numpy()
+    if authors:
+        mask &= df_books['author'].isin(authors).to_numpy()
+    if years:
+        year = df_books['original_publication_year']
+        mask &= ((year >= years[0]) & (year <= years[1])).to_numpy()
+    return mask
+
+
+def check_spec(spec):
+    """Raises ValueError unless spec has the shape of a stored filter spec (a spec from a URL, say)."""
+    if not isinstance(spec, dict):
+        raise ValueError('filters must be a JSON object')
+    for key in ['genres', 'authors']:
+        values = spec.get(key)
+        if values is not None and not (isinstance(values, list) and all(isinstance(value, str) for value in values)):
+            raise ValueError(f'{key} must be a list of names')
+    years = spec.get('years')
+    if years is not None and not (isinstance(years, list) and len(years) == 2 and all(
+            isinstance(year, (int, float)) and not isinstance(year, bool) for year in years)):
+        raise ValueError('years must be a [from, to] pair of years')
+
+
+def spec_mask(df_books, spec):
+    spec = spec or {}
+    return filter_mask(df_books, spec.get('genres'), spec.get('authors'), spec.get('years'))
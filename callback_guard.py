@@ -0,0 +1,179 @@
+"""
+Decorators that keep bursts of callback requests from doing the same or obsolete work:
+
+* latest_only: a request that is still waiting behind an earlier request of the same browser tab for the same
+  callback is dropped as soon as a newer one arrives (e.g. dragging the year slider).
+* single_flight: identical concurrent requests (same callback, same inputs, same dataset version) share one
+  computation (e.g. many readers opening the same popular book at once).
+* bounded: at most max_concurrent computations of a callback per worker; requests that can't get a slot within
+  `wait` seconds are shed.
+
+Superseded requests raise PreventUpdate: the tab's newer request renders instead. Shed requests may be the tab's
+latest state, so they are answered with 503 and a Retry-After header, and assets/callback_retry.js sends them
+again. That script also tags every callback request with an id of its tab and a sequence number, so tabs
+sharing the client cookie never supersede each other and a retried request never supersedes a newer one.
+
+Everything is per worker process, and only matters when a worker serves requests concurrently (the gthread
+worker of the Procfile). Stack them as latest_only -> single_flight -> bounded, outermost first.
+"""
+import functools
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import flask
+from dash import ctx
+from dash.exceptions import PreventUpdate
+from werkzeug.exceptions import ServiceUnavailable
+
+import shared_data
+
+
+CLIENT_COOKIE = 'bookend_client'
+TAB_HEADER = 'X-Bookend-Tab'
+SEQUENCE_HEADER = 'X-Bookend-Seq'
+RETRY_AFTER_SECONDS = 1
+MAX_IDLE_QUEUES = 10_000
+
+_lock = threading.Lock()
+_inflight = {}
+_latest = OrderedDict()
+stats = {'coalesced': 0, 'superseded': 0, 'shed': 0}
+
+
+def install(server):
+    """Gives every browser a client id cookie, used to tell superseded requests of the same client apart."""
+
+    @server.after_request
+    def set_client_cookie(response):
+        if CLIENT_COOKIE not in flask.request.cookies:
+            response.set_cookie(CLIENT_COOKIE, uuid.uuid4().hex, httponly=True, samesite='Lax')
+        return response
+
+
+def client_id():
+    if not flask.has_request_context():
+        return 'local'
+    request = flask.request
+    client = request.cookies.get(CLIENT_COOKIE) or f"{request.remote_addr}|{request.user_agent.string}"
+    tab = request.headers.get(TAB_HEADER)
+    return f'{client}|{tab}' if tab else client
+
+
+def request_sequence():
+    """The tab's sequence number of the request, None when the request doesn't carry one."""
+    if not flask.has_request_context():
+        return None
+    sequence = flask.request.headers.get(SEQUENCE_HEADER, '')
+    return int(sequence) if sequence.isdigit() else None
+
+
+def _callback_name(fn):
+    return f'{fn.__module__}.{fn.__qualname__}'
+
+
+def _canonical(args, kwargs):
+    try:
+        triggered = sorted(ctx.triggered_prop_ids)  # callbacks like update_review_feed depend on the trigger
+    except Exception:
+        triggered = []
+    return json.dumps([args, kwargs, triggered], sort_keys=True, default=str)
+
+
+def _count(name):
+    with _lock:
+        stats[name] += 1
+
+
+def single_flight(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (_callback_name(fn), shared_data.current().version, _canonical(args, kwargs))
+        with _lock:
+            future = _inflight.get(key)
+            leader = future is None
+            if leader:
+                future = _inflight[key] = Future()
+        if not leader:
+            _count('coalesced')
+            return future.result()  # re-raises the leader's exception, PreventUpdate included
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with _lock:
+                _inflight.pop(key, None)
+
+    return wrapper
+
+
+class _ClientQueue:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.users = 0
+
+
+def _evict_idle_queues():
+    # queues outlive their requests so a late retry still sees the newest generation; the oldest idle go first
+    for key in [key for key, queue in _latest.items() if not queue.users][:len(_latest) - MAX_IDLE_QUEUES]:
+        del _latest[key]
+
+
+def latest_only(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (client_id(), _callback_name(fn))
+        with _lock:
+            queue = _latest.get(key) or _ClientQueue()
+            _latest[key] = queue
+            _latest.move_to_end(key)
+            sequence = request_sequence()
+            generation = queue.generation + 1 if sequence is None else sequence
+            replaced = generation < queue.generation  # a retry of a request the tab has already replaced
+            if not replaced:
+                queue.generation = generation
+                queue.users += 1
+        if replaced:
+            _count('superseded')
+            raise PreventUpdate
+        try:
+            with queue.lock:  # one computation per client and callback at a time
+                if queue.generation != generation:
+                    _count('superseded')
+                    raise PreventUpdate
+                return fn(*args, **kwargs)
+        finally:
+            with _lock:
+                queue.users -= 1
+                if len(_latest) > MAX_IDLE_QUEUES:
+                    _evict_idle_queues()
+
+    return wrapper
+
+
+def bounded(max_concurrent, wait=1.0):
+    def decorator(fn):
+        slots = threading.BoundedSemaphore(max_concurrent)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not slots.acquire(timeout=wait):
+                _count('shed')
+                raise ServiceUnavailable('Too many concurrent requests, retry shortly.',
+                                         retry_after=RETRY_AFTER_SECONDS)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                slots.release()
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,126 @@
+"""
+Download of the books matching an Explorer filter spec, on app.server:
+
+    GET /export/books.csv?filters={"genres": ["Fantasy"], "years": [1900, 1950]}
+    GET /export/books.parquet?filters=...
+    GET /export/books.arrow?filters=...      (Arrow IPC stream)
+
+The filters parameter is the JSON stored in shared-filter-store; without it the whole catalog is exported.
+Matching rows are converted and sent EXPORT_CHUNK_ROWS at a time from a generator, so memory stays flat
+however many books match: only the boolean mask and one chunk are ever materialized.
+"""
+import json
+
+import flask
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from book_filter import check_spec, spec_mask
+import shared_data
+
+
+EXPORT_CHUNK_ROWS = 10_000
+EXPORT_COLUMNS = ['work_id', 'original_title', 'author', 'genres', 'original_publication_year', 'num_pages',
+                  'avg_rating', 'ratings_count', 'reviews_count', 'popularity_score', 'image_url']
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+class _ChunkSink:
+    """Write-only file object collecting what the Arrow writers produce until the generator yields it."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def export_schema(df):
+    """Arrow schema of the export, fixed up front so every chunk is written with the same types."""
+    fields = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == object or isinstance(dtype, pd.CategoricalDtype):
+            fields.append(pa.field(col, pa.string()))
+        else:
+            fields.append(pa.field(col, pa.from_numpy_dtype(dtype)))
+    return pa.schema(fields)
+
+
+def chunks(df_books, positions, columns):
+    for start in range(0, len(positions), EXPORT_CHUNK_ROWS):
+        chunk = df_books.iloc[positions[start:start + EXPORT_CHUNK_ROWS]][columns]
+        for col in chunk.columns:
+            if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                chunk[col] = chunk[col].astype(object)
+        yield chunk
+
+
+def stream(fmt, df_books, positions):
+    columns = [col for col in EXPORT_COLUMNS if col in df_books.columns]
+    schema = export_schema(df_books[columns].head(0))
+
+    if fmt == 'csv':
+        header = True
+        for chunk in chunks(df_books, positions, columns):
+            yield chunk.to_csv(index=False, header=header).encode()
+            header = False
+        if header:  # nothing matched
+            yield df_books[columns].head(0).to_csv(index=False).encode()
+        return
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if fmt == 'parquet' else pa.ipc.new_stream(sink, schema)
+    for chunk in chunks(df_books, positions, columns):
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def install(server):
+    """Adds the /export/books.<format> route."""
+
+    @server.route('/export/books.<fmt>')
+    def export_books(fmt):
+        if fmt not in FORMATS:
+            flask.abort(404)
+        try:
+            spec = json.loads(flask.request.args.get('filters') or '{}')
+        except ValueError:
+            flask.abort(400, 'filters must be the JSON filter spec of shared-filter-store')
+        try:
+            check_spec(spec)
+        except ValueError as error:
+            flask.abort(400, str(error))
+
+        df_books = shared_data.current().df_books  # the whole export reads one dataset version
+        positions = spec_mask(df_books, spec).nonzero()[0]
+        response = flask.Response(flask.stream_with_context(stream(fmt, df_books, positions)), mimetype=FORMATS[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename=books.{fmt}'
+        response.headers['X-Row-Count'] = str(len(positions))
+        return response
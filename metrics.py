@@ -0,0 +1,221 @@
+"""
+Instrumentation of the Dash callbacks, exposed in the Prometheus text format on /metrics:
+
+* bookend_callback_seconds / bookend_callback_response_bytes: latency and response size histograms of every
+  POST to /_dash-update-component, labelled with the callback's function name and the outcome (ok, no_update
+  for PreventUpdate, error).
+* bookend_callback_phase_seconds: time spent in the phases the page callbacks mark with `with phase('filter'):`.
+  The rest of the request (Dash dispatch, JSON serialization, unmarked code) is recorded as the 'dispatch' phase.
+* bookend_cache_hits_total / bookend_cache_misses_total and the callback_guard counters.
+
+Set BOOKEND_PROFILE_SLOW_MS to sample the stacks of in-flight callback requests every BOOKEND_PROFILE_INTERVAL_MS
+and write the collapsed stacks (flamegraph.pl / speedscope format) of requests slower than the threshold to
+BOOKEND_PROFILE_DIR. BOOKEND_METRICS=0 turns all of it off.
+
+Metrics are kept per worker process; scrape every worker (or run one worker per container).
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import flask
+
+import callback_guard
+import shared_data
+
+
+ENABLED = os.environ.get('BOOKEND_METRICS', '1') == '1'
+PROFILE_SLOW_MS = float(os.environ.get('BOOKEND_PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('BOOKEND_PROFILE_INTERVAL_MS', 10))
+PROFILE_DIR = os.environ.get('BOOKEND_PROFILE_DIR', 'profiles')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 2e7)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+# --- Metric types ---
+class Histogram:
+
+    def __init__(self, name, help, labels, buckets):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        position = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            if position < len(self.buckets):
+                series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for label_values, values in sorted(series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {values[-1]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {values[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {values[-1]}')
+        return lines
+
+
+def counter_lines(name, help, labels, values):
+    """Renders counters owned elsewhere (cache and guard statistics) at scrape time."""
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} counter']
+    lines.extend(f'{name}{{{_labels(labels, label_values)}}} {value}' for label_values, value in values)
+    return lines
+
+
+callback_seconds = Histogram('bookend_callback_seconds', 'Callback request latency.', ['callback', 'outcome'],
+                             LATENCY_BUCKETS)
+callback_bytes = Histogram('bookend_callback_response_bytes', 'Callback response body size.', ['callback'],
+                           BYTES_BUCKETS)
+phase_seconds = Histogram('bookend_callback_phase_seconds', 'Time per phase inside a callback.',
+                          ['callback', 'phase'], LATENCY_BUCKETS)
+
+
+# --- Phase timers ---
+def _current_request():
+    return flask.g.get('metrics') if flask.has_request_context() else None
+
+
+@contextmanager
+def phase(name):
+    """Times a block of a callback, e.g. `with metrics.phase('figure'):`."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record = _current_request()
+        if record is not None:
+            record['phases'] += elapsed
+        phase_seconds.observe((record['callback'] if record else 'local', name), elapsed)
+
+
+# --- Sampling profiler for slow requests ---
+_in_flight = {}  # thread id -> request record
+_profiler_pid = None
+_profiler_lock = threading.Lock()
+
+
+def _sample_stacks(interval):
+    while True:
+        time.sleep(interval)
+        frames = sys._current_frames()
+        for thread_id, record in list(_in_flight.items()):
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f'{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                record['samples'][';'.join(reversed(stack))] += 1
+
+
+def _ensure_profiler():
+    # started per process, like the dataset watcher, so it survives gunicorn forking its workers
+    global _profiler_pid
+    if _profiler_pid != os.getpid():
+        with _profiler_lock:
+            if _profiler_pid != os.getpid():
+                threading.Thread(target=_sample_stacks, args=(PROFILE_INTERVAL_MS / 1000,), name='metrics-profiler',
+                                 daemon=True).start()
+                _profiler_pid = os.getpid()
+
+
+def _dump_profile(record, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{record['callback']}-{elapsed * 1000:.0f}ms.folded"
+    with open(os.path.join(PROFILE_DIR, name), 'w') as file:
+        file.writelines(f'{stack} {count}\n' for stack, count in record['samples'].most_common())
+
+
+# --- Flask hooks and the /metrics route ---
+def callback_name(app, payload):
+    """Function name of the callback a /_dash-update-component request body is for."""
+    output = (payload or {}).get('output', '')
+    entry = app.callback_map.get(output) or {}
+    return getattr(entry.get('callback'), '__name__', None) or output[:80]
+
+
+def render():
+    lines = callback_seconds.render() + callback_bytes.render() + phase_seconds.render()
+
+    caches = [(cache.name, cache.hits, cache.misses) for cache in shared_data.caches()]
+    reviews = shared_data.current().reviews
+    caches.append(('review_store', reviews.hits, reviews.misses))
+    lines += counter_lines('bookend_cache_hits_total', 'Cache lookups answered from the cache.', ['cache'],
+                           [((name,), hits) for name, hits, _ in caches])
+    lines += counter_lines('bookend_cache_misses_total', 'Cache lookups that computed the value.', ['cache'],
+                           [((name,), misses) for name, _, misses in caches])
+    lines += counter_lines('bookend_callback_guard_total', 'Requests coalesced, superseded or shed by callback_guard.',
+                           ['action'], [((action,), count) for action, count in sorted(callback_guard.stats.items())])
+    return '\n'.join(lines) + '\n'
+
+
+def install(app):
+    """Adds the request hooks and the /metrics route to the Flask server of the Dash app."""
+    if not ENABLED:
+        return
+    server = app.server
+
+    @server.before_request
+    def start_timer():
+        request = flask.request
+        if request.method != 'POST' or not request.path.endswith('_dash-update-component'):
+            return
+        record = {'callback': callback_name(app, request.get_json(silent=True)), 'start': time.perf_counter(),
+                  'phases': 0.0, 'samples': Counter()}
+        flask.g.metrics = record
+        if PROFILE_SLOW_MS:
+            _ensure_profiler()
+            _in_flight[threading.get_ident()] = record
+
+    @server.after_request
+    def record_request(response):
+        record = flask.g.pop('metrics', None)
+        if record is None:
+            return response
+        _in_flight.pop(threading.get_ident(), None)
+        elapsed = time.perf_counter() - record['start']
+
+        outcome = 'ok' if response.status_code == 200 else 'no_update' if response.status_code == 204 else 'error'
+        callback_seconds.observe((record['callback'], outcome), elapsed)
+        callback_bytes.observe((record['callback'],), response.calculate_content_length() or 0)
+        phase_seconds.observe((record['callback'], 'dispatch'), max(elapsed - record['phases'], 0.0))
+        if PROFILE_SLOW_MS and elapsed * 1000 >= PROFILE_SLOW_MS and record['samples']:
+            _dump_profile(record, elapsed)
+        return response
+
+    @server.teardown_request
+    def forget_request(error):
+        _in_flight.pop(threading.get_ident(), None)
+
+    @server.route('/metrics')
+    def metrics_endpoint():
+        return flask.Response(render(), mimetype='text/plain; version=0.0.4')
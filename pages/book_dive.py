@@ -1,16 +1,20 @@
 import dash
-from dash import dcc, html, callback, Output, Input
+from dash import dcc, html, callback, ctx, Output, Input, State, MATCH, Patch
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.express as px
 import ast
-from shared_data import  df_books, df_selected_reviews, df_users
+from callback_guard import latest_only, single_flight
+import metrics
+import shared_data
 
 # --- Register Page ---
 dash.register_page(__name__, path_template="/book_dive/<work_id>", name="Book Deep Dive", nav=False)
 
 
 # --- Page Layout ---
+# Every section is filled by its own callback keyed off the URL, so the header shows up after a single row
+# lookup while the charts, reviews and similar books load independently (and in parallel across workers).
 layout = dbc.Container([
     # This component reads the URL
     dcc.Location(id='book-dive-url', refresh=False),
@@ -21,33 +25,211 @@ layout = dbc.Container([
         href="/"
     ),
 
-    # Main content area will be populated by the callback
-    html.Div(id='book-detail-content-area')
+    # Header Section
+    html.Div(id='book-detail-content-area'),
+
+    # Charts Section
+    dbc.Card(dbc.CardBody(dbc.Row([
+        dbc.Col(dcc.Loading(html.Div(id='grqph1')), width=12, md=4, className='mb-4 border-0'),
+        dbc.Col(html.Div(id='content2', children=[
+            dcc.Loading(html.Div(id='book-summary-area')),
+            dcc.Loading(html.Div(id='book-reviews-area')),
+        ]), width=12, md=4, className='mb-4 border-0'),
+        dbc.Col(dcc.Loading(html.Div(id='graph2')), width=12, md=4, className='mb-4 border-0'),
+    ])), className='border-0'),
+
+    # Similar Books Section
+    dcc.Loading(html.Div(id='book-similar-area')),
 
 ], fluid=True)
 
 
-# --- Callback to Update Page Content ---
+def known(value, label=str):
+    """label(value), or 'Unknown' for the missing years, page counts and reading times of ingested snapshots."""
+    return 'Unknown' if pd.isna(value) else label(value)
+
+
+def reading_time_label(value):
+    reading_time = pd.to_timedelta(value)
+    return f"{reading_time.days} days, {int(reading_time.seconds/3600)} hours"
+
+
+def selected_book(pathname):
+    """Active dataset, work_id and df_books row of the book in the URL (work_id/row are None when invalid)."""
+    data = shared_data.current()
+    # Extract the work_id from the URL, e.g., "/book_dive/123" -> "123"
+    try:
+        selected_work_id = int(pathname.split('/')[-1])
+    except (ValueError, IndexError, AttributeError):
+        return data, None, None
+    return data, selected_work_id, data.book(selected_work_id)
+
+
+# --- Review Feed ---
+REVIEW_PAGE_SIZE = 10  # reviews rendered per window
+REVIEW_PREVIEW_CHARS = 300  # longer review texts are truncated until expanded
+REVIEW_SORTS = {
+    'newest': (['date_added'], [False]),
+    'oldest': (['date_added'], [True]),
+    'highest': (['rating', 'date_added'], [False, False]),
+    'lowest': (['rating', 'date_added'], [True, False]),
+}
+
+
+@shared_data.versioned_cache(maxsize=32)
+def sorted_reviews(data, work_id, sort):
+    df_reviews_book = data.reviews.reviews(work_id).copy()
+    df_reviews_book['date_added'] = pd.to_datetime(df_reviews_book['date_added'], errors='coerce')
+    df_reviews_book['rating'] = df_reviews_book['rating'].fillna(0).astype(int)
+    by, ascending = REVIEW_SORTS.get(sort, REVIEW_SORTS['newest'])
+    return df_reviews_book.sort_values(by=by, ascending=ascending).reset_index(drop=True)
+
+
+def review_rows(data, df_reviews_book, start):
+    """Table rows for one window of reviews; texts are cut to a preview with a link to load the rest."""
+    window = df_reviews_book.iloc[start:start + REVIEW_PAGE_SIZE]
+    names = data.user_names(window['user_id'])
+    rows = []
+    for name, (index, row) in zip(names, window.iterrows()):
+        text = row['review_text'] if isinstance(row['review_text'], str) else ''
+        review_key = f"{row['work_id']}:{row['user_id']}"
+        truncated = len(text) > REVIEW_PREVIEW_CHARS
+        date_added = row['date_added'].strftime('%b %d, %Y') if pd.notna(row['date_added']) else 'an unknown date'
+        rows.append(html.Tr([
+            #First column: Reviewer and Review Text
+            html.Td(
+                html.Div([
+                    html.P([html.I(className='fas fa-star small', style={'color':'#FFD700', 'marginRight':'2px'}) for _ in range(row['rating'])],className='mb-0'),
+                    html.I(
+                        f"Reviewed by {name} on  {date_added}",
+                        className="text-info small mt-0",
+                    ),
+                    html.P(text[:REVIEW_PREVIEW_CHARS] + ('…' if truncated else ''),
+                           id={'type': 'review-text', 'index': review_key}, className = 'small mb-0'),
+                    dbc.Button("Read full review", id={'type': 'review-expand', 'index': review_key},
+                               color='link', size='sm', className='p-0',
+                               style={} if truncated else {'display': 'none'}),
+                ])
+            ),
+        ]))
+    return rows
+
+
+def review_feed_layout(data, work_id, sort='newest'):
+    df_reviews_book = sorted_reviews(data, work_id, sort)
+    total = len(df_reviews_book)
+    return html.Div([
+        dcc.Store(id='review-feed-state', data={'work_id': work_id, 'sort': sort, 'offset': REVIEW_PAGE_SIZE}),
+        dcc.Dropdown(
+            id='review-sort',
+            options=[
+                {'label': 'Newest first', 'value': 'newest'},
+                {'label': 'Oldest first', 'value': 'oldest'},
+                {'label': 'Highest rated', 'value': 'highest'},
+                {'label': 'Lowest rated', 'value': 'lowest'},
+            ],
+            value=sort,
+            clearable=False,
+            className='small',
+        ),
+        html.Div(
+            dbc.Table(html.Tbody(review_rows(data, df_reviews_book, 0), id='review-feed-rows'),
+                      striped=False, bordered = False, hover = True, className="mt-3"),
+            id='table1', className='p-0', style={'height': '20vh', 'overflow': 'auto'}
+        ),
+        html.Div([
+            html.Small(f"{total:,} reviews", className='text-muted me-2'),
+            dbc.Button("Load more reviews", id='review-more', size='sm', color='link',
+                       style={} if total > REVIEW_PAGE_SIZE else {'display': 'none'}),
+        ], className='mt-1'),
+    ])
+
+
+@callback(
+    Output('review-feed-rows', 'children'),
+    Output('review-feed-state', 'data'),
+    Output('review-more', 'style'),
+    Input('review-sort', 'value'),
+    Input('review-more', 'n_clicks'),
+    State('review-feed-state', 'data'),
+    prevent_initial_call=True
+)
+@latest_only
+def update_review_feed(sort, n_clicks, state):
+    data = shared_data.current()
+    df_reviews_book = sorted_reviews(data, state['work_id'], sort)
+
+    if ctx.triggered_id == 'review-sort':
+        # a new sort order restarts the feed
+        start, rows = 0, review_rows(data, df_reviews_book, 0)
+    else:
+        # the next window is appended to the rows already in the browser
+        start, rows = state['offset'], Patch()
+        rows.extend(review_rows(data, df_reviews_book, state['offset']))
+
+    offset = start + REVIEW_PAGE_SIZE
+    more_style = {} if offset < len(df_reviews_book) else {'display': 'none'}
+    return rows, {**state, 'sort': sort, 'offset': offset}, more_style
+
+
+@callback(
+    Output({'type': 'review-text', 'index': MATCH}, 'children'),
+    Output({'type': 'review-expand', 'index': MATCH}, 'style'),
+    Input({'type': 'review-expand', 'index': MATCH}, 'n_clicks'),
+    prevent_initial_call=True
+)
+def expand_review(n_clicks):
+    work_id, user_id = ctx.triggered_id['index'].split(':', 1)
+    df_reviews_book = shared_data.current().reviews.reviews(int(work_id))
+    text = df_reviews_book.loc[df_reviews_book['user_id'] == user_id, 'review_text']
+    return (text.iloc[0] if len(text) else ''), {'display': 'none'}
+
+
+# --- Callbacks to Update Page Content ---
+# Header: only needs the book's row, so it renders first
 @callback(
     Output('book-detail-content-area', 'children'),
     Input('book-dive-url', 'pathname')  # Triggered by URL change
 )
+@single_flight  # readers landing on the same book share one computation
 def update_book_details(pathname):
-    # Extract the work_id from the URL, e.g., "/book_dive/123" -> "123"
-    try:
-        selected_work_id = int(pathname.split('/')[-1])
-    except (ValueError, IndexError):
+    with metrics.phase('lookup'):
+        data, selected_work_id, book_data = selected_book(pathname)
+    if selected_work_id is None:
         return html.H4("Invalid book ID in URL.")
-
-    # Find the selected book's data
-    if selected_work_id not in df_books['work_id'].values:
+    if book_data is None:
         return html.H4("Book ID not found in dataset.")
 
-    book_data = df_books[df_books['work_id'] == selected_work_id].iloc[0]
+    return dbc.Card(dbc.CardBody(dbc.Row([
+                                            dbc.Col(dbc.Card([dbc.CardImg(src=book_data['image_url'], style={'height':'350px', 'width':'220px' }, className="img-fluid rounded border-0")], className='border-0'), width=12, lg=2, className="ps-lg-4"),
+                                            dbc.Col([
+                                                             html.H1(book_data['original_title']),
+                                                             html.H4(f"by {book_data['author']}", className="text-muted"),
+                                                             html.Hr(),
+                                                             dbc.Row([
+                                                                dbc.Col(html.Div([html.H5("Avg. Rating"), html.P(f"{book_data['avg_rating']:.2f} ★")])),
+                                                                dbc.Col(html.Div([html.H5("Total Ratings"), html.P(f"{book_data['ratings_count']:,}")])),
+                                                                dbc.Col(html.Div([html.H5("Published"), html.P(known(book_data['original_publication_year'], int))])),
+                                                                dbc.Col(html.Div([html.H5("Pages"), html.P(known(book_data['num_pages'], int))])),
+                                                                dbc.Col(html.Div([html.H5("Average Reading Time"), html.P(known(book_data['Avg_Reading_Time'], reading_time_label))])),
+                                                            ]),
+                                                            html.Hr(),
+                                                            html.P(book_data['description'])
+                                            ], width=12, lg=10, className="ps-lg-4")
+        ], align="center")), className="mb-4 border-0")
+
 
+# Rating Distribution
+@callback(
+    Output('grqph1', 'children'),
+    Input('book-dive-url', 'pathname')
+)
+@single_flight
+def update_rating_chart(pathname):
+    data, selected_work_id, book_data = selected_book(pathname)
+    if book_data is None:
+        return []
 
-    # --- Prepare Data for Charts ---
-    # Rating Distribution Data
     rating_cols = ['5_star_ratings', '4_star_ratings', '3_star_ratings', '2_star_ratings', '1_star_ratings']
     rating_values = list(book_data[rating_cols].values)
     rating_labels = ['5 Stars', '4 Stars', '3 Stars', '2 Stars', '1 Star']
@@ -61,19 +243,64 @@ def update_book_details(pathname):
         plot_bgcolor='white',
     )
 
+    return [
+        html.H4('Rating Distribution', className='mb-0'),
+        dcc.Graph(figure=ratings_fig, className='mt-0'),
+    ]
+
 
-    reading_time = pd.to_timedelta(df_books[df_books['work_id']==selected_work_id]['Avg_Reading_Time'].iloc[0])
+# AI Summary
+@callback(
+    Output('book-summary-area', 'children'),
+    Input('book-dive-url', 'pathname')
+)
+@single_flight
+def update_review_summary(pathname):
+    data, selected_work_id, book_data = selected_book(pathname)
+    if book_data is None:
+        return []
+
+    return [
+        html.H4('AI Summary of Reviews:', className='mb-2'),
+        html.I(book_data['review_text_summary'], className='text-primary fw-bold',  style={'fontWeight':'bold'}),
+        html.Hr(),
+    ]
 
-    # --- Sentiment Data ---
-    reviews_for_book = df_books[df_books['work_id'] == selected_work_id][['avg_sentiment_pos', 'avg_sentiment_neu', 'avg_sentiment_neg']]
 
-    # ---  Prepare Sentiment Data ---
+# Review Feed: only the first window of reviews is rendered here, further windows come from update_review_feed
+@callback(
+    Output('book-reviews-area', 'children'),
+    Input('book-dive-url', 'pathname')
+)
+@single_flight
+def update_reviews(pathname):
+    data, selected_work_id, book_data = selected_book(pathname)
+    if book_data is None:
+        return []
+
+    return [
+        html.H5 ('Recent Reviews'),
+        review_feed_layout(data, selected_work_id),
+    ]
+
+
+# Sentiment Donut
+@callback(
+    Output('graph2', 'children'),
+    Input('book-dive-url', 'pathname')
+)
+@single_flight
+def update_sentiment_chart(pathname):
+    data, selected_work_id, book_data = selected_book(pathname)
+    if book_data is None:
+        return []
+
     sentiment_fig = {}  # Default to an empty figure
-    if not reviews_for_book.empty:
+    if book_data[['avg_sentiment_pos', 'avg_sentiment_neu', 'avg_sentiment_neg']].notna().any():
         #  Prepare data for the pie chart
         sentiment_data_for_chart = pd.DataFrame({
             'sentiment': ['Positive', 'Neutral', 'Negative'], #
-            'score': [reviews_for_book['avg_sentiment_pos'].iloc[0], reviews_for_book['avg_sentiment_neu'].iloc[0], reviews_for_book['avg_sentiment_neg'].iloc[0]]
+            'score': [book_data['avg_sentiment_pos'], book_data['avg_sentiment_neu'], book_data['avg_sentiment_neg']]
         })
 
         # Create the pie (donut) chart
@@ -89,13 +316,29 @@ def update_book_details(pathname):
         sentiment_fig.update_traces(textinfo='percent+label')
         sentiment_fig.update_layout(showlegend=False)
 
-    # --- Prepare Similar Books ---
+    return [
+        html.H4('Average Reviewers Sentiment', className='mb-2'),
+        dcc.Graph(figure=sentiment_fig,
+                  className='fluid rounded border-0')
+    ]
+
+
+# Similar Books
+@callback(
+    Output('book-similar-area', 'children'),
+    Input('book-dive-url', 'pathname')
+)
+@single_flight
+def update_similar_books(pathname):
+    data, selected_work_id, book_data = selected_book(pathname)
+    if book_data is None:
+        return []
+
     # Assumes 'similar_books' is a list of work_ids stored as a string
     try:
         # Safely evaluate the list
-        similar_book_string = df_books[df_books['work_id'] == selected_work_id]['similar_books'].to_list()[0]
-        similar_book_ids = ast.literal_eval(similar_book_string)
-        similar_books = df_books[df_books['work_id'].isin(similar_book_ids)].head(5)
+        similar_book_ids = ast.literal_eval(book_data['similar_books'])
+        similar_books = data.books(similar_book_ids).head(5)
         similar_books_cards = [
             dbc.Col(
                 dbc.Card([
@@ -113,105 +356,8 @@ def update_book_details(pathname):
     except (SyntaxError, NameError):
         similar_books_cards = dbc.Col(html.P("No similar books available."))
 
-    # --- Generate Review Table ---
-    df_reviews_book = df_selected_reviews[df_selected_reviews['work_id'] == selected_work_id].copy()
-    df_reviews_book['date_added'] = pd.to_datetime(df_reviews_book['date_added'], errors='coerce')
-    df_reviews_book=df_reviews_book.sort_values(by=['date_added'], ascending=False).reset_index(drop=True)
-    df_reviews_book['rating'] = df_reviews_book['rating'].fillna(0).astype(int)
-
-    table_body=[
-                html.Tbody([
-                    #List comprehension to generate rows (html.Tr)
-                    html.Tr([
-                        #First column: Reviewer and Review Text
-                        html.Td(
-                            html.Div([
-                                     html.P([html.I(className='fas fa-star small', style={'color':'#FFD700', 'marginRight':'2px'}) for _ in range(row['rating'])],className='mb-0'),
-                                     html.I(
-                                         f"Reviewed by {df_users[df_users['user_id']==row['user_id']]['name'].iloc[0]} on  {row['date_added'].strftime('%b %d, %Y')}",
-                                         className="text-info small mt-0",
-                                         ),
-
-                                    html.P(row['review_text'], className = 'small mb-0')
-                            ])
-
-                        ),
-
-
-                    ]) for index, row in df_reviews_book.iterrows()
-
-                ])
-    ]
-
-    review_table = dbc.Table(table_body, striped=False, bordered = False, hover = True, className="mt-3")
-
-
-
-
-
-    # --- Assemble the Final Layout ---
-    return html.Div([
-        # Header Section
-        dbc.Card(dbc.CardBody(dbc.Row([
-                                            dbc.Col(dbc.Card([dbc.CardImg(src=book_data['image_url'], style={'height':'350px', 'width':'220px' }, className="img-fluid rounded border-0")], className='border-0'), width=12, lg=2, className="ps-lg-4"),
-                                            dbc.Col([
-                                                             html.H1(book_data['original_title']),
-                                                             html.H4(f"by {book_data['author']}", className="text-muted"),
-                                                             html.Hr(),
-                                                             dbc.Row([
-                                                                dbc.Col(html.Div([html.H5("Avg. Rating"), html.P(f"{book_data['avg_rating']:.2f} ★")])),
-                                                                dbc.Col(html.Div([html.H5("Total Ratings"), html.P(f"{book_data['ratings_count']:,}")])),
-                                                                dbc.Col(html.Div([html.H5("Published"), html.P(int(book_data['original_publication_year']))])),
-                                                                dbc.Col(html.Div([html.H5("Pages"), html.P(int(book_data['num_pages']))])),
-                                                                dbc.Col(html.Div([html.H5("Average Reading Time"), html.P(f"{reading_time.days} days, {int(reading_time.seconds/3600)} hours")])),
-                                                            ]),
-                                                            html.Hr(),
-                                                            html.P(book_data['description'])
-                                            ], width=12, lg=10, className="ps-lg-4")
-        ], align="center")), className="mb-4 border-0"),
-
-        # Charts Section
-        dbc.Card(dbc.CardBody(dbc.Row([
-                                        dbc.Col(html.Div(id='grqph1',
-                                                         children=[
-                                                                    html.H4('Rating Distribution', className='mb-0'),
-                                                                    dcc.Graph(figure=ratings_fig, className='mt-0'),
-                                                        ]
-                                                ),width=12, md=4, className='mb-4 border-0'
-                                        ),
-                                        dbc.Col(html.Div(id='content2',
-                                                           children=[
-
-                                                               html.H4('AI Summary of Reviews:', className='mb-2'),
-                                                               html.I(df_books[df_books['work_id']==selected_work_id]['review_text_summary'], className='text-primary fw-bold',  style={'fontWeight':'bold'}),
-                                                               html.Hr(),
-                                                               html.H5 ('Recent Reviews'),
-                                                               html.Div(id='table1',
-                                                                        children=[review_table],
-                                                                        className='p-0', style={'height': '20vh', 'overflow': 'auto'}
-                                                               ),
-
-
-                                                           ]), width=12, md=4, className='mb-4 border-0',
-
-                                        ),
-                                        dbc.Col(
-                                            html.Div(id='graph2',
-                                                     children=[
-                                                         html.H4('Average Reviewers Sentiment', className='mb-2'),
-                                                         dcc.Graph(figure=sentiment_fig,
-                                                                   className='fluid rounded border-0')
-                                                     ]), width=12, md=4, className='mb-4 border-0'
-
-
-                                        )
-
-
-        ])), className='border-0'),
-
-        # Similar Books Section
+    return [
         html.H4("You Might Also Like..."),
         html.Hr(),
         dbc.Row(similar_books_cards),
-
-    ])
+    ]
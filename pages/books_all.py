@@ -1,16 +1,22 @@
+import json
+import urllib.parse
+
 import dash
 from dash import dcc, html, callback, Output, Input
-from shared_data import df_books
+from book_filter import spec_mask
+from callback_guard import bounded, latest_only, single_flight
+import metrics
+import shared_data
 import dash_bootstrap_components as dbc
 
 
 # --- Register Page ---
 dash.register_page(__name__, path="/books_all",name='Books', nav=False)
 
-book_options = df_books['original_title'].unique().tolist()
 Author_list = 'All'
 Genre_list = 'All'
 Literary_era = 'All'
+SEARCH_RESULTS = 10
 
 #Create table function
 def table_generator(df):
@@ -84,7 +90,27 @@ layout = dbc.Container([#Contained Begin
     dbc.Row([ # Row 2 Begin
         dbc.Col( # Col 1 Begin --- Filter SideBar ---
             html.Div([
+                html.H4("Search", className='mb-3'),
+                dcc.Input(
+                    id='book-search-input',
+                    type='search',
+                    placeholder='Title, author or description',
+                    debounce=0.3,
+                    className='form-control mb-2'
+                ),
+                html.Div(id='book-search-results', className='mb-4'),
                 html.H4("Filters", className='mb-3'),
+                dbc.DropdownMenu(
+                    [
+                        dbc.DropdownMenuItem('CSV', id='export-csv', external_link=True),
+                        dbc.DropdownMenuItem('Parquet', id='export-parquet', external_link=True),
+                        dbc.DropdownMenuItem('Arrow', id='export-arrow', external_link=True),
+                    ],
+                    label='Export',
+                    color='secondary',
+                    size='sm',
+                    className='mb-3'
+                ),
                 html.Label('Sort by:', className='fw-bold'),
                 dcc.Dropdown(
                     id ="sorting-dd",
@@ -116,6 +142,45 @@ layout = dbc.Container([#Contained Begin
     ]) # Row 2 End
 ])#Container End
 
+# --- Export ---
+# links to the streaming download of the filtered books (exports.py)
+@callback(
+    Output('export-csv', 'href'),
+    Output('export-parquet', 'href'),
+    Output('export-arrow', 'href'),
+    Input('shared-filter-store', 'data')
+)
+def update_export_links(stored_data):
+    query = urllib.parse.urlencode({'filters': json.dumps(stored_data or {})})
+    return [f'/export/books.{fmt}?{query}' for fmt in ['csv', 'parquet', 'arrow']]
+
+
+# --- Search ---
+@callback(
+    Output('book-search-results', 'children'),
+    Input('book-search-input', 'value')
+)
+@latest_only
+@single_flight
+def update_search_results(query):
+    if not query or not query.strip():
+        return []
+    data = shared_data.current()
+    hits = data.search.search(query, limit=SEARCH_RESULTS)
+    if not hits:
+        return html.P("No books found.", className='small text-muted')
+
+    books = data.books([work_id for work_id, _ in hits])
+    return dbc.ListGroup([
+        dbc.ListGroupItem(
+            dcc.Link([
+                html.Span(row['original_title'], className='text-black fw-bold me-2'),
+                html.I(row['author'], className='small text-info')
+            ], href=f"/book_dive/{row['work_id']}", className='text-decoration-none')
+        ) for _, row in books.iterrows()
+    ], flush=True)
+
+
 @callback(
     Output('table-content-area2', 'children'),
     Output('genre', 'children'),
@@ -123,9 +188,10 @@ layout = dbc.Container([#Contained Begin
     Output('era', 'children'),
     Input('shared-filter-store', 'data')
 )
-
+@latest_only
+@single_flight
+@bounded(2)
 def update_table(stored_data):
-    print("Data from store:",stored_data)
     author_list="Multi-Authors"
     genre_list="Multi-Genres"
     era_list="Multi-Era"
@@ -136,26 +202,19 @@ def update_table(stored_data):
     ):
         return "Go to the Explorer page to select filters", genre_list, author_list, era_list
 
-    filtered_df = df_books.copy()
-
-    if stored_data.get('genres'):
-        filter_pattern = '|'.join(stored_data['genres'])
-        filtered_df = filtered_df[filtered_df['genres'].str.contains(filter_pattern, case=False, na=False)]
-
-    if stored_data.get('authors'):
-        filtered_df = filtered_df[filtered_df['author'].isin(stored_data['authors'])]
-        author_list = "|".join(stored_data['authors'])
+    with metrics.phase('filter'):
+        df_books = shared_data.current().df_books
+        filtered_df = df_books[spec_mask(df_books, stored_data)]
 
+        if stored_data.get('authors'):
+            author_list = "|".join(stored_data['authors'])
 
-    if stored_data.get('years'):
-        years = stored_data['years']
-        filtered_df = filtered_df[
-            (filtered_df['original_publication_year'] >= years[0]) &
-            (filtered_df['original_publication_year'] <= years[1])
-            ]
-        era_list= stored_data['era'].capitalize()
+        if stored_data.get('years'):
+            era_list= stored_data['era'].capitalize()
 
     if filtered_df.empty:
-        return "No books match the selected filters."
+        return "No books match the selected filters.", genre_list, author_list, era_list
 
-    return table_generator(filtered_df), genre_list,author_list,era_list
\ No newline at end of file
+    with metrics.phase('components'):
+        table = table_generator(filtered_df)
+    return table, genre_list,author_list,era_list
\ No newline at end of file
@@ -1,10 +1,17 @@
-import uuid, dash
-from dash import dcc, html, callback, Output, Input
+import base64, json, os, uuid, dash
+import flask
+from dash import dcc, html, callback, clientside_callback, ClientsideFunction, Output, Input, State
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 import dash_bootstrap_components as dbc
-from shared_data import df_books # Loading the dataframe from shared_data.py directly.
+from book_filter import filter_mask
+from callback_guard import bounded, latest_only, single_flight
+import metrics
+from search_index import PrefixIndex
+import shared_data # Data is read through shared_data.current() so every request sees one dataset version
 
 
 # --- Register Page ---
@@ -13,18 +20,99 @@ from shared_data import df_books # Loading the dataframe from shared_data.py dir
 
 dash.register_page(__name__, path='/', name='Explorer')
 
-# --- Calculate Key Metrics ---
-total_books = df_books['work_id'].nunique()
-total_reviews = df_books['reviews_count'].sum()
-overall_ratings =df_books['avg_rating'].mean()
-total_users = 18800
+# With BOOKEND_CLIENTSIDE_EXPLORER=1 the browser downloads a compact columnar copy of the catalog once per
+# dataset version and filters and ranks it itself (assets/explorer_clientside.js): filter changes never reach
+# the server
+CLIENTSIDE_EXPLORER = os.environ.get('BOOKEND_CLIENTSIDE_EXPLORER') == '1'
+CATALOG_ROUTE = '/explorer/catalog'
+CATALOG_MAX_AGE_SECONDS = 365 * 24 * 3600  # the URL names the dataset version, whose content never changes
+
+# --- Key Metrics and Filter Options ---
+# read from the dataset version's catalog manifest (pipeline/catalog.py), so nothing here scans df_books
+@shared_data.versioned_cache(maxsize=2)
+def catalog_summary(data):
+    catalog = data.catalog
+    return {
+        'total_books': catalog['total_books'],
+        'total_reviews': catalog['total_reviews'],
+        'overall_ratings': catalog['overall_rating'],
+        'total_users': catalog['total_users'],
+        'genre_options': sorted(name for name, _ in catalog['genres']),
+        'min_year': catalog['min_year'],
+        'max_year': catalog['max_year'],
+        'eras': catalog['eras'],
+    }
+
+# --- Typeahead Indexes ---
+# The author dropdown (and the genre dropdown once it has more than GENRE_STATIC_OPTIONS entries) is filled
+# as the user types instead of shipping every option with the page
+TYPEAHEAD_MATCHES = 20
+GENRE_STATIC_OPTIONS = 300
+
+@shared_data.versioned_cache(maxsize=2)
+def author_index(data):
+    return vocabulary_index(data.catalog['authors'])
+
+@shared_data.versioned_cache(maxsize=2)
+def genre_index(data):
+    return vocabulary_index(data.catalog['genres'])
+
+def vocabulary_index(vocabulary):
+    return PrefixIndex([name for name, _ in vocabulary], [count for _, count in vocabulary])
+
+def typeahead_options(index, search_value, selected):
+    # selected values must stay in the options or the dropdown drops them
+    selected = selected or []
+    matches = [value for value in index.search(search_value, limit=TYPEAHEAD_MATCHES) if value not in selected]
+    return [{'label': value, 'value': value} for value in selected + matches]
+
+# --- Columnar Catalog for the Client-Side Mode ---
+def typed_array(values, dtype):
+    """Base64 of a little-endian numpy array, decoded into a JS typed array in the browser."""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+@shared_data.versioned_cache(maxsize=2)
+def catalog_snapshot(data):
+    """
+    The columns the Explorer filters, ranks and renders the top-5 lists from: numbers as typed arrays, authors
+    and genres dictionary-encoded, titles and cover URLs as plain lists: about 40 bytes per book plus its title
+    and cover URL, under 30 bytes per book once compressed. Browsers cache the response, see install.
+    """
+    df_books = data.df_books
+    authors = pd.Categorical(df_books['author'].astype(str))
+
+    # genres are a comma separated string per book: stored as offsets into one array of genre codes
+    book_genres = [[genre.strip().capitalize() for genre in lst.split(',')] for lst in df_books['genres'].astype(object).fillna('')]
+    genre_names = sorted(set(genre for genres in book_genres for genre in genres if genre))
+    genre_codes = {genre: code for code, genre in enumerate(genre_names)}
+    codes = [genre_codes[genre] for genres in book_genres for genre in genres if genre]
+    offsets = np.cumsum([0] + [sum(1 for genre in genres if genre) for genres in book_genres])
+
+    summary = catalog_summary(data)
+    years = df_books['original_publication_year']
+    return {
+        'version': data.version,
+        'count': len(df_books),
+        'work_id': typed_array(df_books['work_id'], '<i4'),
+        'year': typed_array(years.fillna(-32768), '<i2'),  # books without a year never match a year range
+        'reviews_count': typed_array(df_books['reviews_count'].fillna(0), '<i4'),
+        'popularity_score': typed_array(df_books['popularity_score'].fillna(0), '<f4'),
+        'avg_rating': typed_array(df_books['avg_rating'], '<f4'),  # NaN when unrated, skipped like pandas does
+        'author': typed_array(authors.codes, '<i4'),
+        'authors': authors.categories.tolist(),
+        'genre_offsets': typed_array(offsets, '<i4'),
+        'genre_codes': typed_array(codes, '<i2'),
+        'genres': genre_names,
+        'title': df_books['original_title'].astype(object).fillna('').astype(str).tolist(),
+        'image_url': df_books['image_url'].astype(object).fillna('').astype(str).tolist(),
+        'min_year': summary['min_year'],
+        'max_year': summary['max_year'],
+        'eras': summary['eras'],
+        'total_users': summary['total_users'],
+        'min_review_gems': min_review_gems,
+    }
 
-# --- Prepare Filter Options ---
-genres_list = df_books['genres'].unique().tolist()
-genre_options = sorted(set([genre.strip().capitalize() for lst in genres_list for genre in lst.split(',')]))
-author_options=sorted(df_books['author'].unique())
-min_year = int(df_books['original_publication_year'].min())
-max_year = int(df_books['original_publication_year'].max())
 
 # --- Function to Generate Book Tables ---
 def table_generator(df):
@@ -67,6 +155,28 @@ def table_generator(df):
 
 min_review_gems = 50
 
+
+def top_books(filtered_df):
+    """The Most Reviewed, Most Popular and Hidden Gems top 5 of the filtered books."""
+    top_reviewed_books = filtered_df.nlargest(5, 'reviews_count')
+    top_popular_books = filtered_df.nlargest(5, 'popularity_score')
+
+    max_review_gems = filtered_df['reviews_count'].quantile(0.5)
+    gems_df = filtered_df[(filtered_df['reviews_count'] >= min_review_gems) & (filtered_df['reviews_count'] <= max_review_gems)]
+    top_gems_df = gems_df.sort_values(by=['avg_rating', 'reviews_count'], ascending=[False, True]).head(5)
+    return top_reviewed_books, top_popular_books, top_gems_df
+
+
+def top_books_tabs(top_reviewed_books, top_popular_books, top_gems_df):
+    return dbc.Tabs(
+        [
+            dbc.Tab(table_generator(top_reviewed_books), label='Most Reviewed', className='tab'),
+            dbc.Tab(table_generator(top_popular_books), label='Most Popular', className='tab'),
+            dbc.Tab(table_generator(top_gems_df), label='Hidden Gems', className='tab'),
+        ]
+    , key = str(uuid.uuid4())
+    )
+
 # --- Generate Tabbed Tables ---
 
 table_tabs = dbc.Tabs( #initiate with empty table they will be updated by the callback during the page load
@@ -87,241 +197,242 @@ genre_treemap_fig = go.Figure()
 #publication_trends = px.bar(trends_df, x='original_publication_year', y='book_count')
 
 # --- Page Layout ---
-layout = dbc.Container([
-    #First Row to add title for the page
-    dbc.Row(
-        [
-        dbc.Col(html.H1 ("📚 Book Explorer Dashboard", className ='text-center mb-4'), width=12)
-    ]
-    ),
-
-    # Second Row for the summary cards - it has four columns, one for each card
-    dbc.Row(
-        [
-            dbc.Col(
-                      dbc.Card(
-                                dbc.CardBody(
-                            [
-                                html.H4(f'{total_books:,}',id='card-books',  className='card-title text-primary'),
-                                html.P("Total Books", className='card-text'),
-                            ]
-                                            ),
-                            className = 'text-center'
-                            ), width=6, lg=3
-
+# A function so that a page load always uses the active dataset version
+def layout(**kwargs):
+    summary = catalog_summary(shared_data.current())
+    total_books, total_reviews, overall_ratings = summary['total_books'], summary['total_reviews'], summary['overall_ratings']
+    genre_options = summary['genre_options'] if len(summary['genre_options']) <= GENRE_STATIC_OPTIONS else []
+    min_year, max_year = summary['min_year'], summary['max_year']
+    total_users = summary['total_users']
+
+    return dbc.Container([
+        #First Row to add title for the page
+        dbc.Row(
+            [
+            dbc.Col(html.H1 ("📚 Book Explorer Dashboard", className ='text-center mb-4'), width=12)
+        ]
+        ),
 
+        # Second Row for the summary cards - it has four columns, one for each card
+        dbc.Row(
+            [
+                dbc.Col(
+                          dbc.Card(
+                                    dbc.CardBody(
+                                [
+                                    html.H4(f'{total_books:,}',id='card-books',  className='card-title text-primary'),
+                                    html.P("Total Books", className='card-text'),
+                                ]
+                                                ),
+                                className = 'text-center'
+                                ), width=6, lg=3
+
+
+                        ),
+
+                dbc.Col(
+                        dbc.Card(
+                                    dbc.CardBody(
+                                [
+                                    html.H4(f'{total_reviews:,}', id='card-reviews', className="card-title text-success", ),
+                                    html.P("Total Reviews", className="card-text"),
+                                ]
+                                                ),
+                                className="text-center",
+                                ),width = 6, lg=3
+                        ),
+                dbc.Col(
+                        dbc.Card(
+                                    dbc.CardBody(
+                                [
+                                    html.H4(f'{overall_ratings:.2f} ★',id='card-rating', className="card-title text-warning", ),
+                                    html.P("Overall Avg. Rating", className="card-text"),
+                                ]
+                                                ),
+                                className="text-center",
+                                ), width=6, lg=3
+                        ),
+                dbc.Col(
+                        dbc.Card(
+                                    dbc.CardBody(
+                                [
+                                    html.H4(f'{total_users:,}', id='card-users',className="card-title text-info", ),
+                                    html.P("Total Users", className="card-text"),
+                                ]
+                                                ),
+                                className="text-center",
+                                ), width = 6, lg=3
+                        )
+
+
+        ], className='mb-4'
+        ),
+        html.Hr(), # Horizontal Line
+
+        #Third Row for filters and Graphs
+        dbc.Row([
+            # --- Filter Sidebar (Left Column) ---
+            dbc.Col(# first column
+                html.Div([
+                    html.H4 ("Filters", className='mb-3'),
+                    html.Label("Select Genre:", className='fw-bold'),
+                    dcc.Dropdown(
+                        id='genre-dropdown',
+                        options=[{'label':genre, 'value': genre} for genre in genre_options],
+                        multi=True, # allow multiple selections
+                        placeholder="Select Genre (s):"
+                    ),
+                    html.Br(),
+                    html.Label("Select Author:", className='fw-bold'),
+                    dcc.Dropdown(
+                        id='author-dropdown',
+                        options=[], # filled by update_author_options as the user types
+                        multi=True,
+                        placeholder="Select Author (s):"
                     ),
 
-            dbc.Col(
-                    dbc.Card(
-                                dbc.CardBody(
-                            [
-                                html.H4(f'{total_reviews:,}', id='card-reviews', className="card-title text-success", ),
-                                html.P("Total Reviews", className="card-text"),
-                            ]
-                                            ),
-                            className="text-center",
-                            ),width = 6, lg=3
+                    html.Br(),
+                    html.Label("Select a Literary Era:", className="fw-bold mt-3"), # mt-3 adds a little space above
+
+                    dcc.Dropdown(
+                        id='era-dropdown',
+                        options = [option for option in [  # the eras the catalog has books in
+                            {'label': 'Prior to 19th Century', 'value': 'pre-1800s'},
+                            {'label': '19th Century', 'value': '1800s'},
+                            {'label': 'Modern (1900-1945)', 'value': 'modern'},
+                            {'label': 'Contemporary (1946-1999)', 'value': 'contemporary'},
+                            {'label': '21st Century', 'value': '2000s'},
+                        ] if option['value'] in summary['eras']],
+                        multi=False,
+                        placeholder="Select Literary Era (s):",
+                        clearable = True
                     ),
-            dbc.Col(
-                    dbc.Card(
-                                dbc.CardBody(
-                            [
-                                html.H4(f'{overall_ratings:.2f} ★',id='card-rating', className="card-title text-warning", ),
-                                html.P("Overall Avg. Rating", className="card-text"),
-                            ]
-                                            ),
-                            className="text-center",
-                            ), width=6, lg=3
+                    html.Br(),
+                    html.Label("Publication Year:", className='fw-bold'),
+                    dcc.RangeSlider(
+                        id='year-slider',
+                        min=min_year,
+                        max=max_year,
+                        step=1,
+                        value=[min_year, max_year], #Default value is the full range
+                        marks={year:str(year) for year in range(min_year, max_year+1, 5)},
+                        tooltip={'placement':'bottom', 'always_visible': True},
                     ),
-            dbc.Col(
-                    dbc.Card(
-                                dbc.CardBody(
-                            [
-                                html.H4(f'{total_users:,}', id='card-users',className="card-title text-info", ),
-                                html.P("Total Users", className="card-text"),
-                            ]
-                                            ),
-                            className="text-center",
-                            ), width = 6, lg=3
-                    )
-
-
-    ], className='mb-4'
-    ),
-    html.Hr(), # Horizontal Line
-
-    #Third Row for filters and Graphs
-    dbc.Row([
-        # --- Filter Sidebar (Left Column) ---
-        dbc.Col(# first column
-            html.Div([
-                html.H4 ("Filters", className='mb-3'),
-                html.Label("Select Genre:", className='fw-bold'),
-                dcc.Dropdown(
-                    id='genre-dropdown',
-                    options=[{'label':genre, 'value': genre} for genre in genre_options],
-                    multi=True, # allow multiple selections
-                    placeholder="Select Genre (s):"
-                ),
-                html.Br(),
-                html.Label("Select Author:", className='fw-bold'),
-                dcc.Dropdown(
-                    id='author-dropdown',
-                    options=[{'label': author, 'value':author} for author in author_options],
-                    multi=True,
-                    placeholder="Select Author (s):"
-                ),
-
-                html.Br(),
-                html.Label("Select a Literary Era:", className="fw-bold mt-3"), # mt-3 adds a little space above
-
-                dcc.Dropdown(
-                    id='era-dropdown',
-                    options = [
-                        {'label': 'Prior to 19th Century', 'value': 'pre-1800s'},
-                        {'label': '19th Century', 'value': '1800s'},
-                        {'label': 'Modern (1900-1945)', 'value': 'modern'},
-                        {'label': 'Contemporary (1946-1999)', 'value': 'contemporary'},
-                        {'label': '21st Century', 'value': '2000s'},
-                    ],
-                    multi=False,
-                    placeholder="Select Literary Era (s):",
-                    clearable = True
-                ),
-                html.Br(),
-                html.Label("Publication Year:", className='fw-bold'),
-                dcc.RangeSlider(
-                    id='year-slider',
-                    min=min_year,
-                    max=max_year,
-                    step=1,
-                    value=[min_year, max_year], #Default value is the full range
-                    marks={year:str(year) for year in range(min_year, max_year+1, 5)},
-                    tooltip={'placement':'bottom', 'always_visible': True},
-                ),
 
-            ]),
-            width = 12, lg=3,
-            className='big-light p-4 rounded'
-        ),
+                ]),
+                width = 12, lg=3,
+                className='big-light p-4 rounded'
+            ),
+
+            # --- Most Reviewed Books List ---
+            dbc.Col( #second column
+                dcc.Loading(
+                    dbc.Card([
+                        dbc.CardBody(
+                                html.Div(
+                                        id='table-content-area',
+                                        children=[
+                                         table_tabs,
+                                                 ]
+                                ), className='p-0'
+                       ),
+                        dbc.CardFooter(
+                                    dcc.Link(
+                                        "Click here for Complete List ",
+                                        href="/books_all",
+                                        className='small'
+                                    ),
+                                    className='text-end bg-transparent border-0'
+                        )
+                    ], className='border-0')
+                ), width =12, lg=5,
+                style={'height': '85vh', 'overflow': 'auto'} #vh = viewport height
+            ),
+
+            dbc.Col(# 3rd column
+                dcc.Loading(
+                    html.Div(
+                        id = 'graph-content-area',
+                        children=[#html.H4('Book Distribution by Genre'),
+                                dcc.Graph(id='genre_treemap',figure=genre_treemap_fig),
 
-        # --- Most Reviewed Books List ---
-        dbc.Col( #second column
-            dcc.Loading(
-                dbc.Card([
-                    dbc.CardBody(
-                            html.Div(
-                                    id='table-content-area',
-                                    children=[
-                                     table_tabs,
-                                             ]
-                            ), className='p-0'
-                   ),
-                    dbc.CardFooter(
-                                dcc.Link(
-                                    "Click here for Complete List ",
-                                    href="/books_all",
-                                    className='small'
-                                ),
-                                className='text-end bg-transparent border-0'
-                    )
-                ], className='border-0')
-            ), width =12, lg=5,
-            style={'height': '85vh', 'overflow': 'auto'} #vh = viewport height
-        ),
+                              ]
+                     )
+                ), width = 12, lg=4
 
-        dbc.Col(# 3rd column
-            dcc.Loading(
-                html.Div(
-                    id = 'graph-content-area',
-                    children=[#html.H4('Book Distribution by Genre'),
-                            dcc.Graph(id='genre_treemap',figure=genre_treemap_fig),
+            ),
 
-                          ]
-                 )
-            ), width = 12, lg=4
+        ]),
 
-        ),
+        # Client-side mode only: the browser fetches the catalog of this version from its cacheable URL and
+        # keeps it in memory while the page is open
+        *([
+            dcc.Store(id='explorer-catalog-source', data=catalog_source(shared_data.current())),
+            dcc.Store(id='explorer-catalog'),
+        ] if CLIENTSIDE_EXPLORER else []),
 
-    ]),
-
-])
+    ])
 
 
 # --- Callbacks ---
 # A callback links inputs (like dropdowns) to outputs (like graphs)
 
-@callback(
+# The callbacks are registered at the bottom of the file, either on the server or in the browser
+
+dashboard_outputs = [
         Output('table-content-area', 'children'),
         Output('genre_treemap', 'figure'),
         Output('card-books', 'children'),
         Output('card-reviews', 'children'),
         Output('card-rating', 'children'),
         Output('card-users', 'children'),
+]
+dashboard_inputs = [
         Input('author-dropdown', 'value'),
         Input('genre-dropdown', 'value'),
         Input('year-slider', 'value')
-    )
+]
+
+@latest_only  # drop slider positions the user has already dragged past
+@single_flight
+@bounded(4)
 def update_dashboard(selected_authors, selected_genres, selected_years):
     # Filter the DataFrame based on the dropdown selection
 
-    filtered_df = df_books.copy()
-    if selected_genres:
-        filter_pattern = '|'.join(selected_genres)
-        filtered_df = filtered_df[filtered_df['genres'].str.contains(filter_pattern, case=False,na=False)]
-    if selected_authors:
-        filtered_df = filtered_df[filtered_df['author'].isin(selected_authors)].copy()
-    if selected_years:
-        filtered_df = filtered_df[
-            (filtered_df['original_publication_year'] >= selected_years[0]) &
-            (filtered_df['original_publication_year'] <= selected_years[1])
-
-            ]
+    data = shared_data.current()
+    users = catalog_summary(data)['total_users']
+    with metrics.phase('filter'):
+        df_books = data.df_books
+        filtered_df = df_books[filter_mask(df_books, selected_genres, selected_authors, selected_years)]
     if filtered_df.empty:
-        return html.Div(['No books match the selected filters.'], className='mb-4')
+        empty_fig = go.Figure(layout=dict(title=' Genre Distribution of Books', margin=dict(t=50, r=25, b=25, l=25)))
+        return (html.Div(['No books match the selected filters.'], className='mb-4'), empty_fig,
+                '0', '0', '– ★', f'{users:,}')
 
 
     # Calculate Tables based on the filtered_df
-    top_reviewed_books = filtered_df.nlargest(5, 'reviews_count')
-    top_popular_books = filtered_df.nlargest(5, 'popularity_score')
-
-    max_review_gems = filtered_df['reviews_count'].quantile(0.5)
-    gems_df = filtered_df[(filtered_df['reviews_count'] >= min_review_gems) & (filtered_df['reviews_count'] <= max_review_gems)]
-    top_gems_df = gems_df.sort_values(by=['avg_rating', 'reviews_count'], ascending=[False, True]).head(5)
-
-    most_reviewed_table = table_generator(top_reviewed_books)
-    most_popular_table = table_generator(top_popular_books)
-    hidden_gems_table = table_generator(top_gems_df)
-
-    table_tabs = dbc.Tabs(
-        [
-            dbc.Tab(most_reviewed_table,label='Most Reviewed', className='tab'),
-            dbc.Tab(most_popular_table, label='Most Popular', className='tab'),
-            dbc.Tab(hidden_gems_table,label='Hidden Gems', className='tab'),
-        ]
-    , key = str(uuid.uuid4())
-    )
+    with metrics.phase('components'):
+        table_tabs = top_books_tabs(*top_books(filtered_df))
 
     # Replot the Treemap based on filtered_df
-    list_genres = filtered_df['genres'].tolist()
-    unpack_genres = pd.DataFrame([genre.strip().capitalize() for lst in list_genres for genre in lst.split(',')])
-    genre_counts = unpack_genres.value_counts().reset_index()
-    genre_counts.columns = ['genre', 'count']
-    genre_treemap_fig = px.treemap(
-        genre_counts,
-        path=['genre'],  # creates a root node
-        values='count',
-        title=' Genre Distribution of Books',
-        color_discrete_sequence=px.colors.qualitative.Pastel  # set a color scheme
-    )
-    genre_treemap_fig.update_layout(margin=dict(t=50, r=25, b=25, l=25))
+    with metrics.phase('figure'):
+        list_genres = filtered_df['genres'].tolist()
+        unpack_genres = pd.DataFrame([genre.strip().capitalize() for lst in list_genres for genre in lst.split(',')])
+        genre_counts = unpack_genres.value_counts().reset_index()
+        genre_counts.columns = ['genre', 'count']
+        genre_treemap_fig = px.treemap(
+            genre_counts,
+            path=['genre'],  # creates a root node
+            values='count',
+            title=' Genre Distribution of Books',
+            color_discrete_sequence=px.colors.qualitative.Pastel  # set a color scheme
+        )
+        genre_treemap_fig.update_layout(margin=dict(t=50, r=25, b=25, l=25))
 
     #Update cards based on filtered_df
     books = filtered_df['work_id'].nunique()
     reviews = filtered_df['reviews_count'].sum()
     rating = filtered_df['avg_rating'].mean()
-    users = 18800
 
     card_books_text = f'{books:,}'
     card_reviews_text = f'{reviews:,}'
@@ -332,49 +443,43 @@ def update_dashboard(selected_authors, selected_genres, selected_years):
 
 
 # --- Callback for Era Dropdown ---
-@callback(
-Output('year-slider', 'min'),
+slider_outputs = [
+    Output('year-slider', 'min'),
     Output('year-slider', 'max'),
     Output('year-slider', 'value'),
+]
+slider_inputs = [
     Input('era-dropdown', 'value'),  # Input is now the dropdown's value
-)
+]
+
 def update_slider_from_dropdown(selected_era):
-    min_year_data = df_books['original_publication_year'].min()
-    max_year_data = df_books['original_publication_year'].max()
+    summary = catalog_summary(shared_data.current())
+    min_year_data, max_year_data = summary['min_year'], summary['max_year']
 
     if not selected_era:
         # If cleared, return the full range for all properties
         return min_year_data, max_year_data, [min_year_data, max_year_data]
 
     # Define the new min and max based on selection
-    if selected_era == 'pre-1800s':
-        new_min, new_max = min_year_data, 1799
-    elif selected_era == '1800s':
-        new_min, new_max = 1800, 1899
-    elif selected_era == 'modern':
-        new_min, new_max = 1900, 1945
-    elif selected_era == 'contemporary':
-        new_min, new_max = 1946, 1999
-    elif selected_era == '2000s':
-        new_min, new_max = 2000, max_year_data
-    else:
-        new_min, new_max = min_year_data, max_year_data
+    new_min, new_max = summary['eras'].get(selected_era, (min_year_data, max_year_data))
 
     # The function must now return 3 values for the 3 Outputs
     # (min, max, value)
     return new_min, new_max, [new_min, new_max]
 
-@callback(
+store_outputs = [
     Output('shared-filter-store', 'data'),
+]
+store_inputs = [
     Input('genre-dropdown', 'value'),
     Input('author-dropdown', 'value'),
     Input('year-slider', 'value'),
     Input('era-dropdown', 'value'),
+]
 
-)
 def store_filter_values(genres, authors, years, era):
-    min_year_val = df_books['original_publication_year'].min()
-    max_year_val = df_books['original_publication_year'].max()
+    summary = catalog_summary(shared_data.current())
+    min_year_val, max_year_val = summary['min_year'], summary['max_year']
     if years[0] == min_year_val and years[1] == max_year_val:
         years = None
 
@@ -384,3 +489,76 @@ def store_filter_values(genres, authors, years, era):
         'years': years,
         'era': era
     }
+
+
+# --- Callbacks for the Typeahead Dropdowns ---
+@callback(
+    Output('author-dropdown', 'options'),
+    Input('author-dropdown', 'search_value'),
+    State('author-dropdown', 'value'),
+)
+def update_author_options(search_value, selected_authors):
+    if not search_value:
+        raise PreventUpdate
+    return typeahead_options(author_index(shared_data.current()), search_value, selected_authors)
+
+@callback(
+    Output('genre-dropdown', 'options'),
+    Input('genre-dropdown', 'search_value'),
+    State('genre-dropdown', 'value'),
+)
+def update_genre_options(search_value, selected_genres):
+    index = genre_index(shared_data.current())
+    if not search_value or len(index) <= GENRE_STATIC_OPTIONS:  # small vocabularies ship with the layout
+        raise PreventUpdate
+    return typeahead_options(index, search_value, selected_genres)
+
+
+# --- Client-Side Mode ---
+def catalog_source(data):
+    return {'version': data.version, 'url': dash.get_relative_path(f'{CATALOG_ROUTE}/{data.version}.json')}
+
+
+@shared_data.versioned_cache(maxsize=2)
+def catalog_snapshot_body(data):
+    return json.dumps(catalog_snapshot(data), separators=(',', ':')).encode()
+
+
+def install(server):
+    """
+    Adds the GET route of the client-side catalog. The URL names the dataset version, so browsers keep the
+    response for a year and a page load only downloads it again after a new version was published.
+    """
+
+    @server.route(f'{CATALOG_ROUTE}/<version>.json')
+    def explorer_catalog(version):
+        data = shared_data.current()
+        if version != data.version:  # a page rendered before a version swap
+            return flask.redirect(catalog_source(data)['url'])
+        etag = f'catalog-{data.version}'
+        if flask.request.if_none_match.contains_weak(etag):
+            response = flask.Response(status=304)
+        else:
+            response = flask.Response(catalog_snapshot_body(data), mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = CATALOG_MAX_AGE_SECONDS
+        response.cache_control.immutable = True
+        return response
+
+
+# --- Register Callbacks ---
+if CLIENTSIDE_EXPLORER:
+    clientside_callback(ClientsideFunction('explorer', 'load_catalog'),
+                        Output('explorer-catalog', 'data'), Input('explorer-catalog-source', 'data'),
+                        State('explorer-catalog', 'data'))
+    clientside_callback(ClientsideFunction('explorer', 'update_dashboard'),
+                        *dashboard_outputs, *dashboard_inputs, Input('explorer-catalog', 'data'))
+    clientside_callback(ClientsideFunction('explorer', 'update_slider_from_dropdown'),
+                        *slider_outputs, *slider_inputs, State('explorer-catalog', 'data'))
+    clientside_callback(ClientsideFunction('explorer', 'store_filter_values'),
+                        *store_outputs, *store_inputs, State('explorer-catalog', 'data'))
+else:
+    callback(*dashboard_outputs, *dashboard_inputs)(update_dashboard)
+    callback(*slider_outputs, *slider_inputs)(update_slider_from_dropdown)
+    callback(*store_outputs, *store_inputs)(store_filter_values)
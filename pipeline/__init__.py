@@ -0,0 +1 @@
+# Offline data tooling that produces the parquet files loaded by shared_data.py
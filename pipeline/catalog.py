@@ -0,0 +1,118 @@
+"""
+Catalog manifest (catalog.json) written into every dataset snapshot: totals, the genre and author vocabularies
+with their book counts, the publication year bounds and the literary era boundaries. The app reads it when it
+loads a version, so page layouts and the small Explorer callbacks never scan the books table.
+
+    python -m pipeline.catalog data/20261019T120000-1a2b3c
+"""
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from pipeline.snapshots import table_path
+
+
+CATALOG_FILE = 'catalog.json'
+FORMAT = 2  # 2: eras clamped to the catalog's years
+
+# Literary eras offered in the Explorer's era dropdown, None stands for the first/last year of the catalog
+ERA_RANGES = {
+    'pre-1800s': (None, 1799),
+    '1800s': (1800, 1899),
+    'modern': (1900, 1945),
+    'contemporary': (1946, 1999),
+    '2000s': (2000, None),
+}
+
+BOOK_COLUMNS = ['work_id', 'author', 'genres', 'original_publication_year', 'avg_rating', 'reviews_count']
+
+
+def vocabulary(counts):
+    """[[name, count], ...] by descending count, then name."""
+    counts = counts[counts.index != '']
+    counts = counts.groupby(level=0).sum()
+    order = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [[name, int(count)] for name, count in order]
+
+
+def clamp_eras(min_year, max_year):
+    """{era: [first, last]} of the eras overlapping the catalog's years, clamped to them."""
+    eras = {}
+    if min_year is None:
+        return eras
+    for era, (low, high) in ERA_RANGES.items():
+        first = min_year if low is None else max(low, min_year)
+        last = max_year if high is None else min(high, max_year)
+        if first <= last:
+            eras[era] = [first, last]
+    return eras
+
+
+def build_catalog(df_books, total_users):
+    # genres are a comma separated string per book, but there are few distinct strings: count those first
+    genre_strings = df_books['genres'].dropna().astype(str).value_counts()
+    genre_counts = pd.Series(
+        genre_strings.values.repeat(genre_strings.index.str.count(',') + 1),
+        index=[genre.strip().capitalize() for genres in genre_strings.index for genre in genres.split(',')],
+    )
+    years = df_books['original_publication_year'].dropna()
+    min_year = int(years.min()) if len(years) else None
+    max_year = int(years.max()) if len(years) else None
+
+    return {
+        'format': FORMAT,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'books_rows': len(df_books),
+        'total_books': int(df_books['work_id'].nunique()),
+        'total_reviews': int(df_books['reviews_count'].sum()) if 'reviews_count' in df_books else 0,
+        'total_users': int(total_users),
+        'overall_rating': float(df_books['avg_rating'].mean()) if len(df_books) else None,
+        'min_year': min_year,
+        'max_year': max_year,
+        'eras': clamp_eras(min_year, max_year),
+        'genres': vocabulary(genre_counts),
+        'authors': vocabulary(df_books['author'].dropna().astype(str).value_counts()),
+    }
+
+
+def count_rows(folder, name):
+    return ds.dataset(table_path(folder, name), format='parquet').count_rows()
+
+
+def write_catalog(folder, df_books=None, total_users=None):
+    """Writes catalog.json into a snapshot folder, reading whatever isn't passed from the folder's tables."""
+    if df_books is None:
+        books = ds.dataset(table_path(folder, 'books'), format='parquet')
+        df_books = books.to_table(columns=[col for col in BOOK_COLUMNS if col in books.schema.names]).to_pandas()
+    if total_users is None:
+        total_users = count_rows(folder, 'users')
+    catalog = build_catalog(df_books, total_users)
+    with open(os.path.join(folder, CATALOG_FILE), 'w') as file:
+        json.dump(catalog, file)
+    return catalog
+
+
+def read_catalog(folder):
+    """The catalog.json of a snapshot folder, or None if it has none (or one of an older format)."""
+    try:
+        with open(os.path.join(folder, CATALOG_FILE)) as file:
+            catalog = json.load(file)
+    except FileNotFoundError:
+        return None
+    return catalog if catalog.get('format') == FORMAT else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write the catalog.json manifest of a snapshot folder.')
+    parser.add_argument('folder')
+    args = parser.parse_args(argv)
+    catalog = write_catalog(args.folder)
+    print(f"{catalog['total_books']:,} books, {len(catalog['genres'])} genres, {len(catalog['authors']):,} authors")
+
+
+if __name__ == '__main__':
+    main()
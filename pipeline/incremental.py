@@ -0,0 +1,235 @@
+"""
+Incremental updates of avg_rating, ratings_count, the per-star counts, reviews_count and popularity_score.
+
+Instead of recomputing the whole catalog, the sufficient statistics of every book (rating sum, rating count,
+star histogram, review count) are kept in a state folder next to the snapshots. A delta batch of new ratings is
+grouped by work_id and added to those statistics, so applying it costs O(delta). The popularity score is the
+weighted rating
+
+    popularity_score = v / (v + m) * R + m / (v + m) * C
+
+(v = ratings_count, R = avg_rating, m = min_votes, C = catalog mean rating). m is fixed when the state is
+created and C is only refreshed, together with every score, once the catalog mean has drifted by more than
+mean_tolerance, so between refreshes only the books touched by a delta get a new score and only the ranks
+between their old and new positions move.
+
+    python -m pipeline.incremental init --data-dir data
+    python -m pipeline.incremental apply --data-dir data new_ratings.parquet
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.catalog import count_rows, write_catalog
+from pipeline.snapshots import LATEST_FILE, latest_version, publish_snapshot, snapshot_path
+
+
+STATE_FOLDER = '_incremental'
+
+STAR_COUNT_COLS = ['1_star_ratings', '2_star_ratings', '3_star_ratings', '4_star_ratings', '5_star_ratings']
+STATS_COLS = ['rating_sum', 'ratings_count', 'reviews_count'] + STAR_COUNT_COLS
+BOOK_COLS = ['avg_rating', 'ratings_count', 'reviews_count', 'popularity_score', 'popularity_rank'] + STAR_COUNT_COLS
+
+
+class IncrementalAggregator:
+
+    def __init__(self, stats, params):
+        self.stats = stats  # indexed by work_id
+        self.params = params
+        self.dirty = set()
+        self._order = None
+
+    # --- Creating and storing the state ---
+    @classmethod
+    def from_books(cls, df_books, min_votes_quantile=0.9, mean_tolerance=0.005):
+        stats = pd.DataFrame(index=pd.Index(df_books['work_id'].values, name='work_id'))
+        counts = df_books['ratings_count'].fillna(0).astype('int64').values
+        stats['rating_sum'] = df_books['avg_rating'].fillna(0).values * counts
+        stats['ratings_count'] = counts
+        stats['reviews_count'] = df_books['reviews_count'].fillna(0).astype('int64').values
+        for col in STAR_COUNT_COLS:
+            stats[col] = df_books[col].fillna(0).astype('int64').values if col in df_books else 0
+
+        params = {
+            'min_votes': float(np.quantile(counts, min_votes_quantile)) if len(counts) else 0.0,
+            'mean_tolerance': mean_tolerance,
+        }
+        aggregator = cls(stats, params)
+        aggregator.refresh_scores()
+        return aggregator
+
+    @classmethod
+    def load(cls, state_dir):
+        with open(os.path.join(state_dir, 'state.json')) as file:
+            params = json.load(file)
+        stats = pd.read_parquet(os.path.join(state_dir, 'stats.parquet'))
+        aggregator = cls(stats, params)
+        aggregator.dirty = set(params.pop('dirty', []))
+        return aggregator
+
+    def save(self, state_dir):
+        os.makedirs(state_dir, exist_ok=True)
+        self.stats.to_parquet(os.path.join(state_dir, 'stats.parquet'))
+        with open(os.path.join(state_dir, 'state.json'), 'w') as file:
+            json.dump({**self.params, 'dirty': sorted(int(work_id) for work_id in self.dirty)}, file)
+
+    # --- Scores and ranks ---
+    def catalog_mean(self):
+        return self.params['total_sum'] / self.params['total_count'] if self.params['total_count'] else 0.0
+
+    def scores(self, work_ids=None):
+        stats = self.stats if work_ids is None else self.stats.loc[work_ids]
+        votes = stats['ratings_count']
+        mean_rating = (stats['rating_sum'] / votes.where(votes > 0)).fillna(0)
+        min_votes, catalog_mean = self.params['min_votes'], self.params['scored_mean']
+        # NaN only for unrated books when min_votes is 0
+        return (votes / (votes + min_votes) * mean_rating + min_votes / (votes + min_votes) * catalog_mean).fillna(0)
+
+    def refresh_scores(self):
+        """Full recompute: refreshes the catalog mean, every score and every rank."""
+        self.params['total_sum'] = float(self.stats['rating_sum'].sum())
+        self.params['total_count'] = int(self.stats['ratings_count'].sum())
+        self.params['scored_mean'] = self.catalog_mean()
+        self.stats['popularity_score'] = self.scores()
+        order = np.lexsort((self.stats.index.values, -self.stats['popularity_score'].values))
+        self.stats['popularity_rank'] = 0
+        self.stats.iloc[order, self.stats.columns.get_loc('popularity_rank')] = np.arange(1, len(order) + 1)
+        self._order = None
+        self.dirty = set(self.stats.index)
+
+    def _sorted_order(self):
+        """(-score, work_id) keys of every book in rank order, rebuilt lazily after a load or a full refresh."""
+        if self._order is None:
+            ranked = self.stats.sort_values('popularity_rank')
+            self._order = (-ranked['popularity_score'].values, ranked.index.values)
+        return self._order
+
+    def _rerank(self, work_ids):
+        """Moves the given books to their new positions; only ranks between the old and new positions change."""
+        keys, ids = self._sorted_order()
+        old_positions = self.stats.loc[work_ids, 'popularity_rank'].values - 1
+        keys, ids = np.delete(keys, old_positions), np.delete(ids, old_positions)
+
+        new_keys = -self.stats.loc[work_ids, 'popularity_score'].values
+        new_ids = np.asarray(work_ids)
+        moved = np.lexsort((new_ids, new_keys))
+        new_keys, new_ids = new_keys[moved], new_ids[moved]
+        # position in (-score, work_id) order, as refresh_scores sorts: books with the same score by work_id
+        insert_at = np.searchsorted(keys, new_keys, side='left')
+        tie_ends = np.searchsorted(keys, new_keys, side='right')
+        for i in np.flatnonzero(tie_ends > insert_at):
+            insert_at[i] += np.searchsorted(ids[insert_at[i]:tie_ends[i]], new_ids[i])
+        keys, ids = np.insert(keys, insert_at, new_keys), np.insert(ids, insert_at, new_ids)
+        self._order = (keys, ids)
+
+        final_positions = insert_at + np.arange(len(insert_at))
+        low = int(min(old_positions.min(), final_positions.min()))
+        high = int(max(old_positions.max(), final_positions.max()))
+        window = ids[low:high + 1]
+        self.stats.loc[window, 'popularity_rank'] = np.arange(low + 1, high + 2)
+        self.dirty.update(window.tolist())
+
+    # --- Applying deltas ---
+    def apply(self, delta):
+        """
+        Adds a batch of new ratings (columns work_id, rating and optionally is_review) to the statistics.
+        Ratings of books that are not in the catalog are ignored. Returns the work_ids whose values changed.
+        """
+        delta = delta[delta['work_id'].isin(self.stats.index)]
+        if delta.empty:
+            return []
+        rating = delta['rating'].fillna(0).astype(int)
+        rated = rating.between(1, 5)
+        per_book = pd.DataFrame({
+            'work_id': delta['work_id'].values,
+            'rating_sum': rating.where(rated, 0).values,
+            'ratings_count': rated.astype(int).values,
+            'reviews_count': (delta['is_review'].fillna(False).astype(int).values if 'is_review' in delta else 0),
+        })
+        for star in range(1, 6):
+            per_book[f'{star}_star_ratings'] = (rating == star).astype(int).values
+        per_book = per_book.groupby('work_id')[STATS_COLS].sum()
+
+        work_ids = per_book.index
+        self.stats.loc[work_ids, STATS_COLS] += per_book[STATS_COLS].values
+        self.params['total_sum'] += float(per_book['rating_sum'].sum())
+        self.params['total_count'] += int(per_book['ratings_count'].sum())
+
+        if abs(self.catalog_mean() - self.params['scored_mean']) > self.params['mean_tolerance']:
+            self.refresh_scores()
+            return list(self.stats.index)
+
+        self.stats.loc[work_ids, 'popularity_score'] = self.scores(work_ids).values
+        self.dirty.update(work_ids.tolist())
+        self._rerank(work_ids)
+        return work_ids.tolist()
+
+    # --- Publishing ---
+    def book_columns(self, work_ids):
+        """The app's books.parquet columns for the given books."""
+        stats = self.stats.loc[work_ids]
+        votes = stats['ratings_count']
+        columns = stats[['ratings_count', 'reviews_count', 'popularity_score', 'popularity_rank'] + STAR_COUNT_COLS].copy()
+        columns['avg_rating'] = (stats['rating_sum'] / votes.where(votes > 0)).round(2)
+        return columns[BOOK_COLS]
+
+    def publish(self, data_dir):
+        """Writes a new snapshot whose books.parquet carries the updated rows; other tables are linked."""
+        base_version = latest_version(data_dir)
+        base = snapshot_path(data_dir, base_version)
+        df_books = pd.read_parquet(os.path.join(base, 'books.parquet'))
+        df_books = df_books.set_index('work_id')
+        changed = df_books.index.intersection(pd.Index(sorted(self.dirty)))
+        updates = self.book_columns(changed)
+        for col in BOOK_COLS:
+            if col not in df_books:
+                df_books[col] = pd.Series(0, index=df_books.index, dtype=updates[col].dtype)
+            df_books.loc[changed, col] = updates[col].values
+
+        def write(folder):
+            books = df_books.reset_index()
+            books.to_parquet(os.path.join(folder, 'books.parquet'), index=False)
+            # written here so the base version's catalog.json is not linked in with stale totals
+            write_catalog(folder, books, total_users=count_rows(base, 'users'))
+
+        version = publish_snapshot(data_dir, write, base_version)
+        self.dirty = set()
+        return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incrementally update the rating columns of books.parquet.')
+    parser.add_argument('command', choices=['init', 'apply'])
+    parser.add_argument('deltas', nargs='*', help='parquet or csv files with work_id, rating[, is_review]')
+    parser.add_argument('--data-dir', required=True)
+    parser.add_argument('--no-publish', action='store_true', help='only update the state, publish later')
+    args = parser.parse_args(argv)
+
+    state_dir = os.path.join(args.data_dir, STATE_FOLDER)
+    version = latest_version(args.data_dir)
+    if version is None:
+        parser.error(f"{args.data_dir} has no {LATEST_FILE} version, publish a snapshot with pipeline.ingest first")
+    if args.command == 'init':
+        books_path = os.path.join(snapshot_path(args.data_dir, version), 'books.parquet')
+        aggregator = IncrementalAggregator.from_books(pd.read_parquet(books_path))
+    else:
+        if not os.path.exists(os.path.join(state_dir, 'state.json')):
+            parser.error(f"no incremental state in {state_dir}, run the init command first")
+        aggregator = IncrementalAggregator.load(state_dir)
+        for path in args.deltas:
+            delta = pd.read_csv(path) if path.endswith('.csv') else pd.read_parquet(path)
+            unknown = int((~delta['work_id'].isin(aggregator.stats.index)).sum())
+            changed = aggregator.apply(delta)
+            print(f"{path}: {len(delta):,} ratings ({unknown:,} of unknown books ignored), "
+                  f"{len(changed):,} books updated")
+
+    if not args.no_publish:
+        print(f"Published version {aggregator.publish(args.data_dir)}")
+    aggregator.save(state_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,489 @@
+"""
+Ingests the raw Goodreads JSON-lines dumps (https://mengtingwan.github.io/data/goodreads) into the parquet
+files loaded by shared_data.py: books, selected_reviews, users and sunburst.
+
+The gzip files are read in chunks of lines that are parsed and normalized by a pool of worker processes.
+Workers spill each chunk into hash buckets on disk (work_id for reviews, user_id for the per-user tables),
+and every bucket is then sorted and written on its own, so memory is bounded by the chunk and bucket sizes
+rather than by the size of the dumps.
+
+The review features, popularity scores and ranks of books.parquet are computed from the staged reviews with
+pipeline.review_features and pipeline.incremental, and the result is published as a new version of the data
+directory (see pipeline/snapshots.py), so BOOKEND_DATA_DIR can serve it right away.
+
+    python -m pipeline.ingest --books goodreads_books.json.gz --authors goodreads_book_authors.json.gz \\
+        --genres goodreads_book_genres_initial.json.gz --reviews goodreads_reviews_dedup.json.gz --data-dir data
+
+Snapshot layout (plus manifest.json with row counts and sha256 checksums of every file, and the catalog.json
+metadata of pipeline/catalog.py):
+
+    books.parquet
+    users.parquet
+    selected_reviews/bucket=NNN/part-0.parquet   sorted by work_id
+    sunburst/bucket=NNN/part-0.parquet           sorted by user_id
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.catalog import write_catalog
+from pipeline.incremental import IncrementalAggregator
+from pipeline.review_features import SENTIMENT_COLS, STAR_COLS, build_features, merge_into_books
+from pipeline.snapshots import (BOOK_ROW_GROUP, REVIEW_ROW_GROUP, USER_ROW_GROUP, publish_snapshot,
+                                 write_manifest)
+
+
+CHUNK_LINES = 50_000
+BUCKETS = 32
+
+RECENT_READS = 10
+DUMMY_ID_LENGTH = 10
+
+DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+
+# One row per work as read from the dumps; BOOK_SCHEMA adds the columns computed from the reviews
+BOOK_BASE_SCHEMA = pa.schema([
+    ('work_id', pa.int64()),
+    ('book_id', pa.int64()),
+    ('original_title', pa.string()),
+    ('author', DICT_STRING),
+    ('genres', DICT_STRING),
+    ('original_publication_year', pa.float64()),
+    ('num_pages', pa.float64()),
+    ('description', pa.string()),
+    ('image_url', pa.string()),
+    ('avg_rating', pa.float64()),
+    ('ratings_count', pa.int64()),
+    ('similar_books', pa.string()),
+])
+
+BOOK_SCHEMA = pa.schema(
+    list(BOOK_BASE_SCHEMA)
+    + [(col, pa.float64()) for col in SENTIMENT_COLS]
+    + [(col, pa.int64()) for col in STAR_COLS]
+    + [('Avg_Reading_Time', pa.duration('s')), ('reviews_count', pa.int64()), ('popularity_score', pa.float64()),
+       ('popularity_rank', pa.int64()), ('review_text_summary', pa.string())]
+)
+
+REVIEW_SCHEMA = pa.schema([
+    ('user_id', pa.string()),
+    ('work_id', pa.int64()),
+    ('rating', pa.int8()),
+    ('review_text', pa.string()),
+    ('date_added', pa.timestamp('us', tz='UTC')),
+    ('started_at', pa.timestamp('us', tz='UTC')),
+    ('read_at', pa.timestamp('us', tz='UTC')),
+])
+
+SUNBURST_SCHEMA = pa.schema([
+    ('user_id', pa.string()),
+    ('work_id', pa.int64()),
+    ('main_genre', DICT_STRING),
+    ('author', DICT_STRING),
+])
+
+USER_SCHEMA = pa.schema([
+    ('user_id', pa.string()),
+    ('dummy_id', pa.string()),
+    ('name', pa.string()),
+    ('books_read', pa.int64()),
+    ('avg_rating', pa.float64()),
+    ('5_star_rating', pa.int64()),
+    ('4_star_rating', pa.int64()),
+    ('3_star_rating', pa.int64()),
+    ('2_star_rating', pa.int64()),
+    ('1_star_rating', pa.int64()),
+    ('avg_reading_time', pa.duration('s')),
+    ('recent_reads', pa.list_(pa.int64())),
+    ('favorite_genre', pa.string()),
+    ('book_recs_id', pa.string()),
+])
+
+GOODREADS_DATE_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+
+# --- Reading ---
+def read_chunks(path, chunk_lines=CHUNK_LINES):
+    """Yields lists of raw JSON lines from a (optionally gzipped) JSON-lines file."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as file:
+        chunk = []
+        for line in file:
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def run_chunks(pool, fn, chunks, *args, max_pending=8):
+    """Submits fn(chunk_no, chunk, *args) for every chunk, holding at most max_pending chunks in flight."""
+    pending = set()
+    results = []
+    for chunk_no, chunk in enumerate(chunks):
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            results.extend(future.result() for future in done)
+        pending.add(pool.submit(fn, chunk_no, chunk, *args))
+    results.extend(future.result() for future in wait(pending).done)
+    return results
+
+
+def load_authors(path):
+    authors = {}
+    for chunk in read_chunks(path):
+        for line in chunk:
+            record = json.loads(line)
+            authors[int(record['author_id'])] = record['name']
+    return authors
+
+
+def load_genres(path):
+    """Maps book_id to a code into a vocabulary of genre strings ordered by shelf count."""
+    genres, vocabulary = {}, {}
+    for chunk in read_chunks(path):
+        for line in chunk:
+            record = json.loads(line)
+            if not record['genres']:
+                continue
+            names = sorted(record['genres'], key=record['genres'].get, reverse=True)
+            genres[int(record['book_id'])] = vocabulary.setdefault(', '.join(names), len(vocabulary))
+    return genres, list(vocabulary)
+
+
+# --- Helpers shared by the workers ---
+def to_number(values):
+    values = pd.Series(values, dtype='object')
+    return pd.to_numeric(values.where(values != ''), errors='coerce')
+
+
+def to_timestamp(values):
+    values = pd.Series(values, dtype='object')
+    return pd.to_datetime(values.where(values != ''), format=GOODREADS_DATE_FORMAT, errors='coerce', utc=True)
+
+
+def user_bucket(user_ids, buckets):
+    return (pd.util.hash_pandas_object(user_ids, index=False).values % buckets).astype(int)
+
+
+def to_table(df, schema):
+    """Builds an Arrow table with the exact schema, dictionary-encoding the author and genre columns."""
+    columns = []
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_dictionary(field.type):
+            values = values.astype(object)
+            columns.append(pa.array(values.where(values.notna(), None), type=pa.string()).dictionary_encode())
+        else:
+            columns.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_buckets(df, bucket_ids, staging, table, chunk_no, schema):
+    """Spills one chunk into per-bucket parquet files under staging/table/bucket=NNN/."""
+    for bucket, part in df.groupby(bucket_ids):
+        folder = os.path.join(staging, table, f'bucket={bucket:03d}')
+        os.makedirs(folder, exist_ok=True)
+        pq.write_table(to_table(part, schema), os.path.join(folder, f'chunk-{chunk_no:06d}.parquet'))
+
+
+def bucket_files(staging, table):
+    root = os.path.join(staging, table)
+    if not os.path.isdir(root):
+        return []
+    return [(int(name.split('=')[1]), os.path.join(root, name)) for name in sorted(os.listdir(root))]
+
+
+_context = {}
+
+
+def _init_worker(context):
+    _context.update(context)
+
+
+# --- Stage 1: books ---
+def books_chunk(chunk_no, lines, staging, buckets):
+    authors, genres, genre_names = _context['authors'], _context['genres'], _context['genre_names']
+    rows = []
+    for line in lines:
+        record = json.loads(line)
+        if not record.get('work_id'):
+            continue
+        book_id = int(record['book_id'])
+        author_ids = [author['author_id'] for author in record.get('authors') or [] if author.get('author_id')]
+        genre_code = genres.get(book_id)
+        rows.append({
+            'work_id': int(record['work_id']),
+            'book_id': book_id,
+            'original_title': record.get('title_without_series') or record.get('title'),
+            'author': authors.get(int(author_ids[0])) if author_ids else None,
+            'genres': genre_names[genre_code] if genre_code is not None else '',
+            'original_publication_year': record.get('publication_year'),
+            'num_pages': record.get('num_pages'),
+            'description': record.get('description'),
+            'image_url': record.get('image_url'),
+            'avg_rating': record.get('average_rating'),
+            'ratings_count': record.get('ratings_count'),
+            'similar_books': [int(book) for book in record.get('similar_books') or []],
+        })
+    if not rows:
+        return 0
+
+    df = pd.DataFrame(rows)
+    for col in ['original_publication_year', 'num_pages', 'avg_rating']:
+        df[col] = to_number(df[col])
+    df['ratings_count'] = to_number(df['ratings_count']).fillna(0).astype('int64')
+    # similar_books still holds book ids here, they are mapped to work ids once every book has been seen
+    df['similar_books'] = df['similar_books'].apply(json.dumps)
+    write_buckets(df, df['work_id'].values % buckets, staging, 'books', chunk_no, BOOK_BASE_SCHEMA)
+    return len(df)
+
+
+def finalize_books(staging):
+    """Keeps the most rated edition of every work and stages the books bucket by bucket."""
+    book_ids, work_ids = [], []
+    for _, folder in bucket_files(staging, 'books'):
+        editions = pq.read_table(folder, columns=['book_id', 'work_id'])
+        book_ids.append(editions['book_id'].to_numpy())
+        work_ids.append(editions['work_id'].to_numpy())
+    book_ids = np.concatenate(book_ids) if book_ids else np.array([], dtype='int64')
+    work_ids = np.concatenate(work_ids) if work_ids else np.array([], dtype='int64')
+    order = np.argsort(book_ids)
+    book_to_work = (book_ids[order], work_ids[order])
+
+    lookup = []
+    path = os.path.join(staging, 'books.parquet')
+    with pq.ParquetWriter(path, BOOK_BASE_SCHEMA) as writer:
+        for _, folder in bucket_files(staging, 'books'):
+            df = pd.read_parquet(folder)
+            df = (df.sort_values(['work_id', 'ratings_count'], ascending=[True, False])
+                    .drop_duplicates('work_id').reset_index(drop=True))
+            df['similar_books'] = [
+                str(sorted(set(map_book_ids(json.loads(similar), book_to_work).tolist())))
+                for similar in df['similar_books']
+            ]
+            writer.write_table(to_table(df, BOOK_BASE_SCHEMA), row_group_size=BOOK_ROW_GROUP)
+            lookup.append(df[['work_id', 'author', 'genres']])
+
+    lookup = pd.concat(lookup) if lookup else pd.DataFrame(columns=['work_id', 'author', 'genres'])
+    lookup = lookup.sort_values('work_id')
+    main_genre = lookup['genres'].astype(object).fillna('').str.split(',').str[0].str.strip().str.capitalize()
+    work_lookup = {
+        'work_ids': lookup['work_id'].to_numpy('int64'),
+        'authors': pd.Categorical(lookup['author']),
+        'main_genres': pd.Categorical(main_genre.where(main_genre != '')),
+    }
+    return book_to_work, work_lookup
+
+
+def map_book_ids(book_ids, book_to_work):
+    """Vectorized book_id -> work_id lookup against the sorted (book_ids, work_ids) arrays; drops unknown ids."""
+    sorted_books, works = book_to_work
+    book_ids = np.asarray(book_ids, dtype='int64')
+    if not len(sorted_books) or not len(book_ids):
+        return np.array([], dtype='int64')
+    positions = np.searchsorted(sorted_books, book_ids).clip(max=len(sorted_books) - 1)
+    found = sorted_books[positions] == book_ids
+    return works[positions[found]]
+
+
+# --- Stage 2: reviews ---
+def reviews_chunk(chunk_no, lines, staging, buckets):
+    records = [json.loads(line) for line in lines]
+    df = pd.DataFrame.from_records(
+        records, columns=['user_id', 'book_id', 'rating', 'review_text', 'date_added', 'started_at', 'read_at']
+    )
+    sorted_books, works = _context['book_to_work']
+    book_ids = to_number(df['book_id']).fillna(-1).astype('int64').values
+    positions = np.searchsorted(sorted_books, book_ids).clip(max=max(len(sorted_books) - 1, 0))
+    known = (sorted_books[positions] == book_ids) if len(sorted_books) else np.zeros(len(df), dtype=bool)
+    df = df[known].copy()
+    df['work_id'] = works[positions[known]]
+    df['rating'] = to_number(df['rating']).fillna(0).astype('int8')
+    for col in ['date_added', 'started_at', 'read_at']:
+        df[col] = to_timestamp(df[col])
+    df = df[REVIEW_SCHEMA.names]
+
+    write_buckets(df, df['work_id'].values % buckets, staging, 'reviews', chunk_no, REVIEW_SCHEMA)
+    events = df.drop(columns=['review_text'])
+    write_buckets(events, user_bucket(events['user_id'], buckets), staging, 'user_events', chunk_no,
+                  REVIEW_SCHEMA.remove(REVIEW_SCHEMA.get_field_index('review_text')))
+    return len(df)
+
+
+def finalize_reviews(staging, out, reviews_per_book=None):
+    """Sorts every work_id bucket and writes it with row groups sized for work_id predicate pushdown."""
+    for bucket, folder in bucket_files(staging, 'reviews'):
+        df = pd.read_parquet(folder).sort_values(['work_id', 'date_added'], ascending=[True, False])
+        if reviews_per_book:
+            df = df.groupby('work_id', sort=False).head(reviews_per_book)
+        target = os.path.join(out, 'selected_reviews', f'bucket={bucket:03d}')
+        os.makedirs(target, exist_ok=True)
+        pq.write_table(to_table(df, REVIEW_SCHEMA), os.path.join(target, 'part-0.parquet'),
+                       row_group_size=REVIEW_ROW_GROUP)
+
+
+def finalize_book_features(staging, out, workers=None, scorer='lexicon'):
+    """
+    Writes books.parquet: the staged books with the review features of every staged review (not only the
+    selected ones), the popularity scores and ranks of pipeline.incremental and an empty review summary, which
+    the summarization models fill in later.
+    """
+    df_books = pd.read_parquet(os.path.join(staging, 'books.parquet'))
+    features = build_features(os.path.join(staging, 'reviews'), workers=workers, scorer=scorer)
+    df_books = merge_into_books(df_books, features)
+    scored = IncrementalAggregator.from_books(df_books).stats
+    df_books['popularity_score'] = scored['popularity_score'].values
+    df_books['popularity_rank'] = scored['popularity_rank'].values
+    df_books['review_text_summary'] = None
+    pq.write_table(to_table(df_books, BOOK_SCHEMA), os.path.join(out, 'books.parquet'), row_group_size=BOOK_ROW_GROUP)
+    return df_books
+
+
+def dummy_ids(user_ids, length=DUMMY_ID_LENGTH):
+    """
+    The ids readers type into the profile page: the shortest prefix of each user_id that is at least `length`
+    characters long and unique among all user_ids. Returns a Series of them indexed by user_id.
+    """
+    user_ids = pd.Series(pd.unique(np.asarray(user_ids, dtype=object)))
+    short = pd.Series(None, index=user_ids.values, dtype=object)
+    pending = user_ids
+    while len(pending):
+        prefix = pending.str[:length]
+        unique = ~prefix.duplicated(keep=False)
+        short[pending[unique].values] = prefix[unique].values
+        # an id sharing its prefix with another only collides with ids of the same prefix, all still pending
+        pending, length = pending[~unique], length + 2
+    if not short.is_unique:
+        raise ValueError('dummy ids are not unique')
+    return short
+
+
+def finalize_users(staging, out, work_lookup):
+    """Builds the sunburst partitions and the users table from the user_id buckets."""
+    work_ids = work_lookup['work_ids']
+    short_ids = dummy_ids(np.concatenate(
+        [pq.read_table(folder, columns=['user_id'])['user_id'].to_numpy(zero_copy_only=False)
+         for _, folder in bucket_files(staging, 'user_events')] or [np.array([], dtype=object)]
+    ))
+    with pq.ParquetWriter(os.path.join(out, 'users.parquet'), USER_SCHEMA) as users_writer:
+        for bucket, folder in bucket_files(staging, 'user_events'):
+            events = pd.read_parquet(folder).sort_values(['user_id', 'date_added'], ascending=[True, False])
+            positions = np.searchsorted(work_ids, events['work_id'].values).clip(max=max(len(work_ids) - 1, 0))
+            events['main_genre'] = work_lookup['main_genres'][positions]
+            events['author'] = work_lookup['authors'][positions]
+
+            sunburst = events[['user_id', 'work_id', 'main_genre', 'author']]
+            target = os.path.join(out, 'sunburst', f'bucket={bucket:03d}')
+            os.makedirs(target, exist_ok=True)
+            pq.write_table(to_table(sunburst, SUNBURST_SCHEMA), os.path.join(target, 'part-0.parquet'),
+                           row_group_size=USER_ROW_GROUP)
+
+            users_writer.write_table(to_table(aggregate_users(events, short_ids), USER_SCHEMA),
+                                     row_group_size=USER_ROW_GROUP)
+
+
+def aggregate_users(events, short_ids):
+    """Per-user reading statistics in the shape the profile page reads (events are sorted newest first)."""
+    events['read_time'] = (events['read_at'] - events['started_at']).where(lambda delta: delta >= pd.Timedelta(0))
+    rated = events['rating'].where(events['rating'] > 0)
+    grouped = events.groupby('user_id', sort=True)
+
+    genre_counts = events.groupby(['user_id', 'main_genre'], observed=True).size().reset_index(name='count')
+    favorite_genre = (genre_counts.sort_values('count', ascending=False, kind='stable')
+                      .drop_duplicates('user_id').set_index('user_id')['main_genre'].astype(object))
+
+    users = pd.DataFrame({
+        'books_read': grouped.size(),
+        'avg_rating': rated.groupby(events['user_id']).mean(),
+        'avg_reading_time': grouped['read_time'].mean().dt.round('s'),
+        'recent_reads': grouped.head(RECENT_READS).groupby('user_id')['work_id'].agg(list),
+        'favorite_genre': favorite_genre,
+    })
+    for star in range(5, 0, -1):
+        users[f'{star}_star_rating'] = (events['rating'] == star).groupby(events['user_id']).sum()
+    users = users.rename_axis('user_id').reset_index()
+    # Goodreads dumps are anonymized: the short id is what readers type into the profile page, and the
+    # recommendations are filled in later by the recommender models
+    users['dummy_id'] = users['user_id'].map(short_ids)
+    users['name'] = 'Reader ' + users['dummy_id']
+    users['book_recs_id'] = '[]'
+    return users[USER_SCHEMA.names]
+
+
+# --- Driver ---
+def build_snapshot(books, authors, genres, reviews, out, workers=None, chunk_lines=CHUNK_LINES, buckets=BUCKETS,
+                   reviews_per_book=None, scorer='lexicon'):
+    """Writes every file of a snapshot into the folder out and returns its manifest."""
+    workers = workers or os.cpu_count()
+    staging = os.path.join(out, '_staging')
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    author_names = load_authors(authors)
+    genre_codes, genre_names = load_genres(genres)
+    context = {'authors': author_names, 'genres': genre_codes, 'genre_names': genre_names}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(context,)) as pool:
+        book_rows = sum(run_chunks(pool, books_chunk, read_chunks(books, chunk_lines), staging, buckets))
+    del author_names, genre_codes, context
+    book_to_work, work_lookup = finalize_books(staging)
+    print(f"Books: {book_rows:,} editions staged")
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=({'book_to_work': book_to_work},)) as pool:
+        review_rows = sum(run_chunks(pool, reviews_chunk, read_chunks(reviews, chunk_lines), staging, buckets))
+    print(f"Reviews: {review_rows:,} rows staged")
+    finalize_reviews(staging, out, reviews_per_book)
+    df_books = finalize_book_features(staging, out, workers, scorer)
+    finalize_users(staging, out, work_lookup)
+    shutil.rmtree(staging)
+    write_catalog(out, df_books)
+
+    sources = {name: os.path.basename(path) for name, path in
+               [('books', books), ('authors', authors), ('genres', genres), ('reviews', reviews)]}
+    return write_manifest(out, sources)
+
+
+def ingest(books, authors, genres, reviews, data_dir, **options):
+    """Publishes the dumps as a new version of data_dir (and makes it LATEST); returns (version, manifest)."""
+    os.makedirs(data_dir, exist_ok=True)
+    manifest = {}
+    version = publish_snapshot(
+        data_dir, lambda out: manifest.update(build_snapshot(books, authors, genres, reviews, out, **options)),
+        link_unchanged=False,
+    )
+    return version, manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest raw Goodreads dumps into the app's parquet files.")
+    parser.add_argument('--books', required=True)
+    parser.add_argument('--authors', required=True)
+    parser.add_argument('--genres', required=True)
+    parser.add_argument('--reviews', required=True)
+    parser.add_argument('--data-dir', required=True, help='data directory (BOOKEND_DATA_DIR) to publish into')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-lines', type=int, default=CHUNK_LINES)
+    parser.add_argument('--buckets', type=int, default=BUCKETS)
+    parser.add_argument('--reviews-per-book', type=int, default=None, help='keep only the N most recent reviews')
+    parser.add_argument('--scorer', default='lexicon', help="sentiment scorer, see pipeline.review_features")
+    args = parser.parse_args(argv)
+
+    version, manifest = ingest(args.books, args.authors, args.genres, args.reviews, args.data_dir,
+                               workers=args.workers, chunk_lines=args.chunk_lines, buckets=args.buckets,
+                               reviews_per_book=args.reviews_per_book, scorer=args.scorer)
+    for name, table in manifest['tables'].items():
+        print(f"{name}: {table['rows']:,} rows in {len(table['files'])} file(s)")
+    print(f"Published version {version} in {args.data_dir}")
+
+
+if __name__ == '__main__':
+    main()
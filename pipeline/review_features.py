@@ -0,0 +1,222 @@
+"""
+Streams the raw review corpus and builds the per-book review features stored in books.parquet:
+avg_sentiment_pos/neu/neg, 5_star_ratings ... 1_star_ratings, Avg_Reading_Time and reviews_count.
+
+Reviews are read in Arrow record batches, scored in a process pool and reduced into per-book partial
+aggregates, so memory stays bounded by the batch size and the number of books, not by the corpus size.
+
+    python -m pipeline.review_features reviews.parquet features.parquet --books books.parquet --workers 8
+"""
+import argparse
+import importlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+
+# --- Schema of the app's books.parquet ---
+SENTIMENT_COLS = ['avg_sentiment_pos', 'avg_sentiment_neu', 'avg_sentiment_neg']
+STAR_COLS = ['5_star_ratings', '4_star_ratings', '3_star_ratings', '2_star_ratings', '1_star_ratings']
+FEATURE_COLS = SENTIMENT_COLS + STAR_COLS + ['Avg_Reading_Time', 'reviews_count']
+
+REVIEW_COLUMNS = ['work_id', 'rating', 'review_text', 'started_at', 'read_at']
+
+# Partial aggregates are plain sums and counts so they can be merged in any order
+PARTIAL_COLS = ['reviews_count', 'scored_count', 'pos_sum', 'neu_sum', 'neg_sum',
+                'star_5', 'star_4', 'star_3', 'star_2', 'star_1', 'read_seconds_sum', 'read_count']
+
+GOODREADS_DATE_FORMAT = '%a %b %d %H:%M:%S %z %Y'  # e.g. "Sun Jul 30 07:44:10 -0700 2017"
+
+
+# --- Scorers ---
+# score(texts) returns one (pos, neu, neg) row per text, all zeros for a text it found nothing to score in
+class LexiconScorer:
+    """Small word-list scorer, a dependency free stand-in for VADER with the same pos/neu/neg output."""
+
+    positive = {
+        'amazing', 'awesome', 'beautiful', 'beautifully', 'best', 'brilliant', 'captivating', 'charming',
+        'compelling', 'delightful', 'enjoy', 'enjoyable', 'enjoyed', 'excellent', 'fantastic', 'favorite',
+        'fun', 'funny', 'good', 'great', 'happy', 'interesting', 'like', 'liked', 'love', 'loved', 'lovely',
+        'masterpiece', 'nice', 'perfect', 'recommend', 'wonderful', 'gripping', 'engaging', 'powerful',
+    }
+    negative = {
+        'annoying', 'awful', 'bad', 'boring', 'confusing', 'disappointed', 'disappointing', 'dull', 'hate',
+        'hated', 'horrible', 'poor', 'poorly', 'slow', 'stupid', 'terrible', 'tedious', 'waste', 'weak',
+        'worst', 'predictable', 'overrated', 'bland', 'unlikeable', 'dnf',
+    }
+    token_pattern = re.compile(r"[a-z']+")
+
+    def score(self, texts):
+        scores = np.zeros((len(texts), 3))
+        for i, text in enumerate(texts):
+            tokens = self.token_pattern.findall(text.lower())
+            if not tokens:
+                continue
+            pos = sum(token in self.positive for token in tokens)
+            neg = sum(token in self.negative for token in tokens)
+            scores[i] = (pos / len(tokens), (len(tokens) - pos - neg) / len(tokens), neg / len(tokens))
+        return scores
+
+
+class VaderScorer:
+    """VADER polarity scores, from the vaderSentiment package or NLTK's copy of it."""
+
+    def __init__(self):
+        try:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        except ImportError:
+            from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def score(self, texts):
+        scores = np.zeros((len(texts), 3))
+        for i, text in enumerate(texts):
+            if text:
+                polarity = self.analyzer.polarity_scores(text)
+                scores[i] = (polarity['pos'], polarity['neu'], polarity['neg'])
+        return scores
+
+
+SCORERS = {'lexicon': LexiconScorer, 'vader': VaderScorer}
+
+
+def load_scorer(name):
+    """Returns a scorer instance by name, or from a 'package.module:ClassName' path for custom scorers."""
+    if name in SCORERS:
+        return SCORERS[name]()
+    module_name, _, class_name = name.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+# --- Map: runs inside the worker processes ---
+_scorer = None
+
+
+def _init_worker(scorer_name):
+    global _scorer
+    _scorer = load_scorer(scorer_name)
+
+
+def parse_dates(values):
+    """Parses Goodreads date strings (or passes through timestamps) into UTC datetimes."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.to_datetime(values, utc=True)
+    values = values.where(values != '')
+    parsed = pd.to_datetime(values, format=GOODREADS_DATE_FORMAT, errors='coerce', utc=True)
+    missing = parsed.isna() & values.notna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(values[missing], errors='coerce', utc=True, format='mixed')
+    return parsed
+
+
+def aggregate_batch(batch, scorer=None):
+    """Scores one record batch and returns its per-book partial aggregate."""
+    scorer = scorer or _scorer
+    df = batch.to_pandas()
+    texts = df['review_text'].fillna('').astype(str).tolist()
+    scores = scorer.score(texts)
+
+    rating = df['rating'].fillna(0).astype(int)
+    read_seconds = (parse_dates(df['read_at']) - parse_dates(df['started_at'])).dt.total_seconds()
+    read_seconds = read_seconds.where(read_seconds >= 0)
+
+    partial = pd.DataFrame({
+        'work_id': df['work_id'].values,
+        'reviews_count': 1,
+        'scored_count': (scores.sum(axis=1) > 0).astype(int),  # empty or punctuation-only texts don't count
+        'pos_sum': scores[:, 0],
+        'neu_sum': scores[:, 1],
+        'neg_sum': scores[:, 2],
+        'read_seconds_sum': read_seconds.fillna(0).values,
+        'read_count': read_seconds.notna().astype(int).values,
+    })
+    for star in range(1, 6):
+        partial[f'star_{star}'] = (rating == star).astype(int).values
+
+    return partial.groupby('work_id')[PARTIAL_COLS].sum()
+
+
+# --- Reduce ---
+def merge_partials(partials):
+    """Merges per-book partial aggregates; sums and counts are associative so order does not matter."""
+    return pd.concat(partials).groupby(level=0).sum()
+
+
+def finalize(aggregate):
+    """Turns the merged sums and counts into the feature columns of books.parquet."""
+    scored = aggregate['scored_count'].where(aggregate['scored_count'] > 0)
+    read_count = aggregate['read_count'].where(aggregate['read_count'] > 0)
+
+    features = pd.DataFrame(index=aggregate.index)
+    features['avg_sentiment_pos'] = aggregate['pos_sum'] / scored
+    features['avg_sentiment_neu'] = aggregate['neu_sum'] / scored
+    features['avg_sentiment_neg'] = aggregate['neg_sum'] / scored
+    for star in range(5, 0, -1):
+        features[f'{star}_star_ratings'] = aggregate[f'star_{star}'].astype('int64')
+    features['Avg_Reading_Time'] = pd.to_timedelta(aggregate['read_seconds_sum'] / read_count, unit='s').dt.round('s')
+    features['reviews_count'] = aggregate['reviews_count'].astype('int64')
+    return features.rename_axis('work_id').reset_index()
+
+
+def build_features(source, workers=None, scorer='lexicon', batch_size=20_000, merge_every=64):
+    """Streams reviews from a parquet file or directory and returns the per-book feature frame."""
+    workers = workers or os.cpu_count()
+    batches = ds.dataset(source, format='parquet').to_batches(columns=REVIEW_COLUMNS, batch_size=batch_size)
+
+    aggregate = None
+    partials = []
+    max_pending = workers * 2  # bounds the number of batches held in memory at once
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scorer,)) as pool:
+        pending = set()
+        for batch in batches:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                partials.extend(future.result() for future in done)
+            pending.add(pool.submit(aggregate_batch, batch))
+
+            if len(partials) >= merge_every:
+                aggregate = merge_partials(partials if aggregate is None else [aggregate] + partials)
+                partials = []
+
+        partials.extend(future.result() for future in wait(pending).done)
+
+    if aggregate is not None:
+        partials.append(aggregate)
+    if not partials:
+        return pd.DataFrame(columns=['work_id'] + FEATURE_COLS)
+    return finalize(merge_partials(partials))
+
+
+def merge_into_books(df_books, features):
+    """Replaces the feature columns of an existing books frame, keeping every other column as is."""
+    df_books = df_books.drop(columns=[col for col in FEATURE_COLS if col in df_books.columns])
+    df_books = df_books.merge(features, on='work_id', how='left')
+    count_cols = STAR_COLS + ['reviews_count']
+    df_books[count_cols] = df_books[count_cols].fillna(0).astype('int64')
+    return df_books
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('reviews', help='parquet file or directory of raw reviews')
+    parser.add_argument('output', help='parquet file to write')
+    parser.add_argument('--books', help='existing books.parquet to merge the features into')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--scorer', default='lexicon', help="'lexicon', 'vader' or 'package.module:ClassName'")
+    parser.add_argument('--batch-size', type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    features = build_features(args.reviews, workers=args.workers, scorer=args.scorer, batch_size=args.batch_size)
+    if args.books:
+        features = merge_into_books(pd.read_parquet(args.books), features)
+    features.to_parquet(args.output, index=False)
+    print(f"Wrote {len(features):,} books to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Versioned dataset snapshots. Every dataset version lives in its own folder of the data directory and the
+LATEST file names the version the app should serve:
+
+    data/
+        LATEST                      -> 20261019T120000-1a2b3c
+        20261019T120000-1a2b3c/
+            books.parquet
+            selected_reviews/ (or selected_reviews.parquet)
+            users.parquet
+            sunburst/ (or sunburst.parquet)
+            catalog.json                totals and vocabularies, see pipeline/catalog.py
+            manifest.json               row counts and sha256 checksums of every table file
+
+A snapshot is written to a hidden folder first and renamed into place, and LATEST is replaced atomically,
+so readers never see a half written version. When a version only rewrites some files, the manifest linked in
+from the base version is rewritten with the row counts and checksums of the new files.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import pyarrow.parquet as pq
+
+
+TABLES = ['books', 'selected_reviews', 'users', 'sunburst']
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+
+# Row groups small enough that a single work_id (or user_id) lookup only decodes a few thousand rows,
+# large enough that the per-row-group statistics stay a negligible part of the file.
+REVIEW_ROW_GROUP = 10_000
+USER_ROW_GROUP = 20_000
+BOOK_ROW_GROUP = 50_000
+
+
+def new_version():
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:6]}"
+
+
+def latest_version(data_dir):
+    try:
+        with open(os.path.join(data_dir, LATEST_FILE)) as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_path(data_dir, version):
+    return os.path.join(data_dir, version)
+
+
+def table_path(snapshot_dir, name):
+    """Path of a table inside a snapshot: a single parquet file or a partitioned directory."""
+    single = os.path.join(snapshot_dir, f'{name}.parquet')
+    return single if os.path.exists(single) else os.path.join(snapshot_dir, name)
+
+
+# --- Manifest ---
+def file_checksum(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(folder, sources, reuse=None):
+    """
+    Writes manifest.json for the tables of a snapshot folder; reuse maps the relative paths of files known to
+    be unchanged to their entries in an earlier manifest, so they are not checksummed again.
+    """
+    reuse = reuse or {}
+    tables = {}
+    for name in TABLES:
+        single = os.path.join(folder, f'{name}.parquet')
+        paths = [single] if os.path.exists(single) else sorted(
+            os.path.join(root, file)
+            for root, _, files in os.walk(os.path.join(folder, name)) for file in files if file.endswith('.parquet')
+        )
+        files = []
+        for path in paths:
+            relative = os.path.relpath(path, folder)
+            files.append(reuse.get(relative) or {
+                'path': relative,
+                'rows': pq.ParquetFile(path).metadata.num_rows,
+                'bytes': os.path.getsize(path),
+                'sha256': file_checksum(path),
+            })
+        tables[name] = {'rows': sum(file['rows'] for file in files), 'files': files}
+
+    manifest = {'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'sources': sources, 'tables': tables}
+    # replaced rather than written in place: the old manifest may be a hard link into the base version
+    staging = os.path.join(folder, f'.{MANIFEST_FILE}')
+    with open(staging, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(staging, os.path.join(folder, MANIFEST_FILE))
+    return manifest
+
+
+def refresh_manifest(folder, changed):
+    """Rewrites a manifest linked in from the base version; changed holds the top-level names written anew."""
+    with open(os.path.join(folder, MANIFEST_FILE)) as file:
+        previous = json.load(file)
+    reuse = {entry['path']: entry for table in previous['tables'].values() for entry in table['files']
+             if entry['path'].split(os.sep)[0] not in changed}
+    return write_manifest(folder, previous.get('sources', {}), reuse)
+
+
+# --- Publishing ---
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def publish_snapshot(data_dir, write, base_version=None, link_unchanged=True):
+    """
+    Publishes a new version: write(folder) writes the new or changed files, every other file of the base
+    version (LATEST by default) is hard linked in unchanged, unless link_unchanged is False because write
+    produces a complete snapshot. Returns the new version name.
+    """
+    base_version = (base_version or latest_version(data_dir)) if link_unchanged else None
+    version = new_version()
+    staging = os.path.join(data_dir, f'.{version}')
+    os.makedirs(staging)
+    write(staging)
+    written = set(os.listdir(staging))
+
+    if base_version:
+        base = snapshot_path(data_dir, base_version)
+        for name in os.listdir(base):
+            source, target = os.path.join(base, name), os.path.join(staging, name)
+            if os.path.exists(target):
+                continue
+            if os.path.isdir(source):
+                shutil.copytree(source, target, copy_function=_link_or_copy)
+            else:
+                _link_or_copy(source, target)
+        if MANIFEST_FILE not in written and os.path.exists(os.path.join(staging, MANIFEST_FILE)):
+            refresh_manifest(staging, written)
+
+    os.rename(staging, snapshot_path(data_dir, version))
+    pointer = os.path.join(data_dir, f'.{LATEST_FILE}.{version}')
+    with open(pointer, 'w') as file:
+        file.write(version)
+    os.replace(pointer, os.path.join(data_dir, LATEST_FILE))
+    return version
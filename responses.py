@@ -0,0 +1,111 @@
+"""
+Response pipeline of the Flask server behind the Dash app:
+
+* JSON and HTML responses larger than BOOKEND_COMPRESS_MIN_BYTES are compressed with brotli (when the
+  `brotli` package is installed and the client accepts it) or gzip.
+* GET responses get an ETag and are answered with 304 Not Modified when the client already has them. The tag
+  is computed on the uncompressed body, so it is made weak on compressed responses: their bytes differ per
+  encoding, and only a weak tag may be shared between them (If-None-Match compares weakly, so 304s still work).
+* Callbacks that only depend on their inputs and the dataset version (the Book Deep Dive ones) are cached as
+  final, compressed response bodies, so a repeat visit to a popular book skips the callback, the serialization
+  and the compression. Browsers don't revalidate POSTs, so this server-side cache stands in for conditional
+  requests there.
+"""
+import gzip
+import hashlib
+import os
+
+import flask
+
+import metrics
+import shared_data
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESS_MIN_BYTES = int(os.environ.get('BOOKEND_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5  # close to gzip's speed at a noticeably better ratio for JSON
+COMPRESSIBLE = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+# Book Deep Dive callbacks: the response is a function of the URL and the dataset version
+DETERMINISTIC_CALLBACKS = {'update_book_details', 'update_rating_chart', 'update_review_summary',
+                           'update_reviews', 'update_sentiment_chart', 'update_similar_books'}
+
+_cached_responses = shared_data.VersionedCache(maxsize=512, name='responses')
+
+
+def accepted_encoding():
+    accepted = flask.request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _callback_cache_key(app):
+    request = flask.request
+    if request.method != 'POST' or not request.path.endswith('_dash-update-component'):
+        return None
+    if metrics.callback_name(app, request.get_json(silent=True)) not in DETERMINISTIC_CALLBACKS:
+        return None
+    digest = hashlib.sha1(request.get_data()).hexdigest()
+    return (shared_data.current().version, digest, accepted_encoding())
+
+
+def install(app):
+    """Adds the compression, ETag and callback cache hooks to app.server."""
+    server = app.server
+
+    @server.before_request
+    def serve_cached_callback():
+        key = _callback_cache_key(app)
+        if key is None:
+            return None
+        found, cached = _cached_responses.lookup(key)
+        if not found:
+            flask.g.response_cache_key = key  # stored by finish_response
+            return None
+        body, encoding = cached
+        response = flask.Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @server.after_request
+    def finish_response(response):
+        if response.direct_passthrough or response.is_streamed or response.status_code != 200:
+            return response
+
+        if flask.request.method == 'GET' and not response.get_etag()[0]:
+            response.add_etag()
+            response = response.make_conditional(flask.request)
+            if response.status_code == 304:
+                return response
+
+        if (response.mimetype in COMPRESSIBLE and 'Content-Encoding' not in response.headers
+                and response.content_length and response.content_length >= COMPRESS_MIN_BYTES):
+            encoding = accepted_encoding()
+            if encoding:
+                response.set_data(compress(response.get_data(), encoding))
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                etag, weak = response.get_etag()
+                if etag and not weak:
+                    response.set_etag(etag, weak=True)
+
+        key = flask.g.pop('response_cache_key', None)
+        if key is not None:
+            _cached_responses.put(key, (response.get_data(), response.headers.get('Content-Encoding')))
+        return response
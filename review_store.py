@@ -0,0 +1,192 @@
+"""
+On-demand access to the reviews of one book, so the review table never has to be resident in the workers.
+
+Reviews are read from a local parquet file, or the bucketed selected_reviews/ folder written by pipeline.ingest,
+through memory maps. Each file gets a row-group index: when the file is sorted by work_id the row-group min/max
+statistics are enough, otherwise a sidecar index of (work_id, row group) pairs is built once from the work_id
+column and saved next to the file. A lookup then decodes only the columns the pages show, in the row groups
+that can hold the requested book, and the most recently requested books are kept in a small LRU.
+
+A remote file is downloaded again whenever its ETag (or Last-Modified date) changes, and rewritten sorted by
+work_id in small row groups on the way, as pipeline.ingest writes them.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import urllib.request
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from pipeline.snapshots import REVIEW_ROW_GROUP
+
+
+CACHE_DIR = os.environ.get('BOOKEND_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bookend'))
+REVIEW_COLUMNS = ['work_id', 'user_id', 'rating', 'review_text', 'date_added']  # what the Deep Dive shows
+
+
+def remote_version(url):
+    """The ETag (or Last-Modified date) of a remote file, None if the server can't be asked."""
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method='HEAD'), timeout=10) as response:
+            return response.headers.get('ETag') or response.headers.get('Last-Modified')
+    except OSError:
+        return None
+
+
+def sort_reviews(source, target):
+    """Rewrites a review file sorted by work_id (newest first per book) in REVIEW_ROW_GROUP row groups."""
+    table = pq.read_table(source)
+    keys = [('work_id', 'ascending')] + ([('date_added', 'descending')] if 'date_added' in table.schema.names else [])
+    pq.write_table(table.sort_by(keys), target, row_group_size=REVIEW_ROW_GROUP)
+
+
+def download(url, cache_dir=CACHE_DIR):
+    """
+    Local, work_id sorted copy of a remote review file, so it can be memory-mapped and read a book at a time.
+    The copy is keyed by the file's ETag: a changed remote file is downloaded again and older copies removed.
+    When the server can't be reached the latest copy is used.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = hashlib.sha1(url.encode()).hexdigest()[:12]
+    copies = sorted(glob.glob(os.path.join(cache_dir, f'{prefix}-*-{os.path.basename(url)}')), key=os.path.getmtime)
+    version = remote_version(url)
+    if version is None and copies:
+        return copies[-1]
+
+    tag = hashlib.sha1((version or '').encode()).hexdigest()[:8]
+    path = os.path.join(cache_dir, f'{prefix}-{tag}-{os.path.basename(url)}')
+    if not os.path.exists(path):
+        partial = f'{path}.{os.getpid()}.part'
+        urllib.request.urlretrieve(url, partial)
+        sort_reviews(partial, f'{partial}.sorted')
+        os.remove(partial)
+        os.replace(f'{partial}.sorted', path)
+    for old in copies:
+        if old != path:
+            for stale in [old] + glob.glob(f'{old}.*'):  # with its sidecar index
+                try:
+                    os.remove(stale)
+                except OSError:  # still mapped by another worker, removed on the next download
+                    pass
+    return path
+
+
+class _IndexedFile:
+    """One memory-mapped parquet file with its work_id -> row groups index."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet_file = pq.ParquetFile(path, memory_map=True)
+        self.lock = threading.Lock()
+        self.mins, self.maxs = self._statistics()
+        if self.mins is None or np.any(self.mins[1:] < self.maxs[:-1]):
+            self.mins = self.maxs = None
+            self.ids, self.groups = self._sidecar()
+
+    def _statistics(self):
+        metadata = self.parquet_file.metadata
+        column = self.parquet_file.schema_arrow.get_field_index('work_id')
+        mins, maxs = [], []
+        for group in range(metadata.num_row_groups):
+            statistics = metadata.row_group(group).column(column).statistics
+            if statistics is None or not statistics.has_min_max:
+                return None, None
+            mins.append(statistics.min)
+            maxs.append(statistics.max)
+        return np.array(mins, dtype='int64'), np.array(maxs, dtype='int64')
+
+    def _sidecar(self):
+        sidecar = f'{self.path}.work_id.npz'
+        if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(self.path):
+            with np.load(sidecar) as index:
+                return index['ids'], index['groups']
+
+        ids, groups = [], []
+        for group in range(self.parquet_file.metadata.num_row_groups):
+            unique_ids = np.unique(self.parquet_file.read_row_group(group, columns=['work_id'])['work_id'].to_numpy())
+            ids.append(unique_ids)
+            groups.append(np.full(len(unique_ids), group, dtype='int32'))
+        ids = np.concatenate(ids) if ids else np.array([], dtype='int64')
+        groups = np.concatenate(groups) if groups else np.array([], dtype='int32')
+        order = np.argsort(ids, kind='stable')
+        ids, groups = ids[order], groups[order]
+        try:
+            np.savez(sidecar, ids=ids, groups=groups)
+        except OSError:  # read-only data folder, keep the index in memory only
+            pass
+        return ids, groups
+
+    def row_groups(self, work_id):
+        if self.mins is not None:
+            return np.flatnonzero((self.mins <= work_id) & (self.maxs >= work_id)).tolist()
+        start, end = np.searchsorted(self.ids, [work_id, work_id + 1])
+        return self.groups[start:end].tolist()
+
+    def read(self, work_id, columns=None):
+        groups = self.row_groups(work_id)
+        if not groups:
+            return None
+        with self.lock:
+            table = self.parquet_file.read_row_groups(groups, columns=columns)
+        return table.filter(pc.equal(table['work_id'], pa.scalar(work_id, table.schema.field('work_id').type)))
+
+
+class ReviewStore:
+
+    def __init__(self, path, cache_size=32, columns=REVIEW_COLUMNS):
+        if os.path.isdir(path):
+            self.paths = sorted(glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True))
+        else:
+            self.paths = [path]
+        self.cache_size = cache_size
+        self.columns = columns
+        self._files = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def warm(self):
+        """Opens every file and builds its index, meant to run while a dataset version is being loaded."""
+        for path in self.paths:
+            self._file(path)
+        return self
+
+    def _file(self, path):
+        indexed = self._files.get(path)
+        if indexed is None:
+            with self._lock:
+                indexed = self._files.get(path) or _IndexedFile(path)
+                self._files[path] = indexed
+        return indexed
+
+    def reviews(self, work_id):
+        """All reviews of one book as a DataFrame (shared with the LRU, copy it before modifying)."""
+        with self._lock:
+            if work_id in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(work_id)
+                return self._cache[work_id]
+            self.misses += 1
+
+        schema = self._file(self.paths[0]).parquet_file.schema_arrow
+        columns = [col for col in self.columns if col in schema.names] if self.columns else None
+        tables = [table for table in (self._file(path).read(work_id, columns) for path in self.paths)
+                  if table is not None]
+        if tables:
+            df = pa.concat_tables(tables).to_pandas()
+        else:
+            df = schema.empty_table().to_pandas()
+            df = df[columns] if columns else df
+        df = df.drop(columns='bucket', errors='ignore')
+
+        with self._lock:
+            self._cache[work_id] = df
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return df
@@ -0,0 +1,256 @@
+"""
+In-memory indexes for looking up books and authors: a prefix index for typeahead dropdowns and a full-text
+inverted index for the book search.
+"""
+import bisect
+import functools
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+
+def normalize(text):
+    """Lower-cases, strips accents and collapses whitespace, so 'García  Márquez' matches 'garcia marquez'."""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized keys searched with bisect. Every value is indexed under its full name and under
+    each of its word suffixes, so 'king' finds 'Stephen King'. Matches are ranked by weight (e.g. book count).
+    """
+
+    short_query = 2  # results for queries this short cover a large part of the index and are cached
+    short_cache_size = 1024  # bounds the cache: any two characters make a short query
+
+    def __init__(self, values, weights):
+        entries = []
+        for position, value in enumerate(values):
+            words = normalize(value).split()
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), position))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.positions = np.array([position for _, position in entries], dtype='int64')
+        self.values = list(values)
+        self.weights = np.asarray(weights, dtype='float64')
+        # per instance, so the cached results go away with the index of a replaced dataset version
+        self._short_search = functools.lru_cache(maxsize=self.short_cache_size)(self._search)
+
+    def __len__(self):
+        return len(self.values)
+
+    def search(self, query, limit=10):
+        """Up to `limit` values having a word that starts with the query, heaviest first."""
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) <= self.short_query:
+            return list(self._short_search(query, limit))
+        return self._search(query, limit)
+
+    def _search(self, query, limit):
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_left(self.keys, query + '\uffff', lo=start)
+        positions = np.unique(self.positions[start:end])
+        if len(positions) > limit:
+            positions = positions[np.argpartition(-self.weights[positions], limit - 1)[:limit]]
+        ranked = sorted(positions.tolist(), key=lambda position: (-self.weights[position], self.values[position]))
+        return [self.values[position] for position in ranked]
+
+
+# --- Full-text search ---
+TOKEN = re.compile(r'[a-z0-9]+')
+MAX_TOKEN_LENGTH = 24  # longer tokens (URLs, ISBN runs) are cut, the vocabulary is stored at its longest term's width
+INDEX_FORMAT = 2  # part of the fingerprint of saved indexes, bump it when the arrays change
+
+
+def tokenize(text):
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN.findall(normalize(text))] if isinstance(text, str) else []
+
+
+def _trigrams(term):
+    padded = f'${term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _csr(lists, dtype):
+    """Concatenates a list of lists into (offsets, values) arrays."""
+    offsets = np.zeros(len(lists) + 1, dtype='int64')
+    offsets[1:] = np.cumsum([len(values) for values in lists])
+    values = np.fromiter((value for values in lists for value in values), dtype=dtype, count=offsets[-1])
+    return offsets, values
+
+
+class IndexBuilder:
+    """
+    Collects documents batch by batch and freezes them into an InvertedIndex. Field weights multiply the term
+    frequencies, so a word in the title counts more than the same word in the description.
+    """
+
+    def __init__(self, field_weights):
+        self.field_weights = field_weights
+        self.keys = []
+        self.lengths = []
+        self.postings = {}  # term -> ([doc, ...], [weighted tf, ...])
+
+    def add(self, key, fields):
+        doc = len(self.keys)
+        self.keys.append(key)
+        counts = {}
+        length = 0.0
+        for field, weight in self.field_weights.items():
+            for term in tokenize(fields.get(field)):
+                counts[term] = counts.get(term, 0.0) + weight
+                length += weight
+        self.lengths.append(length)
+        for term, count in counts.items():
+            docs, tfs = self.postings.setdefault(term, ([], []))
+            docs.append(doc)
+            tfs.append(count)
+
+    def add_frame(self, df, key_column, batch_size=5000):
+        columns = [key_column] + list(self.field_weights)
+        for start in range(0, len(df), batch_size):
+            for row in df[columns].iloc[start:start + batch_size].itertuples(index=False):
+                self.add(row[0], dict(zip(columns[1:], row[1:])))
+        return self
+
+    def finish(self, fingerprint=''):
+        terms = sorted(self.postings)
+        post_offsets, post_docs = _csr([self.postings[term][0] for term in terms], 'int32')
+        _, post_tfs = _csr([self.postings[term][1] for term in terms], 'float32')
+
+        grams = {}
+        for term_id, term in enumerate(terms):
+            for gram in _trigrams(term):
+                grams.setdefault(gram, []).append(term_id)
+        gram_vocab = sorted(grams)
+        gram_offsets, gram_terms = _csr([grams[gram] for gram in gram_vocab], 'int32')
+
+        return InvertedIndex(
+            keys=np.asarray(self.keys, dtype='int64'), lengths=np.asarray(self.lengths, dtype='float32'),
+            terms=np.asarray(terms, dtype='S'), post_offsets=post_offsets, post_docs=post_docs, post_tfs=post_tfs,
+            grams=np.asarray(gram_vocab, dtype='S'), gram_offsets=gram_offsets, gram_terms=gram_terms,
+            fingerprint=np.asarray(fingerprint),
+        )
+
+
+class InvertedIndex:
+    """
+    BM25 over a sorted term vocabulary with CSR posting lists (doc ids and weighted term frequencies in flat
+    NumPy arrays). Terms are ASCII, so the vocabulary is stored as bytes: one byte per character instead of four.
+    The last query word also matches as a prefix ('tolk' finds 'tolkien'), and words that match nothing fall back
+    to the vocabulary terms sharing the most trigrams with them ('hobit' finds 'hobbit').
+    """
+
+    k1 = 1.2
+    b = 0.75
+    prefix_expansions = 30  # most frequent vocabulary terms a prefix expands to
+    prefix_weight = 0.7
+    fuzzy_candidates = 3
+    fuzzy_similarity = 0.4  # Jaccard similarity of the trigram sets
+    fuzzy_weight = 0.5
+
+    arrays = ['keys', 'lengths', 'terms', 'post_offsets', 'post_docs', 'post_tfs', 'grams', 'gram_offsets',
+              'gram_terms', 'fingerprint']
+
+    def __init__(self, **arrays):
+        for name in self.arrays:
+            setattr(self, name, arrays[name])
+        self.doc_freq = np.diff(self.post_offsets)
+        self.idf = np.log1p((len(self.keys) - self.doc_freq + 0.5) / (self.doc_freq + 0.5)).astype('float32')
+        average = self.lengths.mean() if len(self.lengths) else 1.0
+        self.norms = (self.k1 * (1 - self.b + self.b * self.lengths / max(average, 1e-9))).astype('float32')
+
+    def __len__(self):
+        return len(self.keys)
+
+    # --- Persistence ---
+    def save(self, path):
+        partial = f'{path}.{os.getpid()}.part.npz'
+        np.savez(partial, **{name: getattr(self, name) for name in self.arrays})
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in cls.arrays})
+
+    # --- Query ---
+    def _term_id(self, term):
+        term = term.encode()
+        position = np.searchsorted(self.terms, term)
+        return position if position < len(self.terms) and self.terms[position] == term else None
+
+    def _prefix_ids(self, prefix):
+        prefix = prefix.encode()
+        start, end = np.searchsorted(self.terms, [prefix, prefix + b'\xff'])
+        ids = np.arange(start, end)
+        if len(ids) > self.prefix_expansions:
+            ids = ids[np.argpartition(-self.doc_freq[ids], self.prefix_expansions - 1)[:self.prefix_expansions]]
+        return ids
+
+    def _fuzzy_ids(self, word):
+        query_grams = _trigrams(word)
+        matches = []
+        for gram in query_grams:
+            gram = gram.encode()
+            position = np.searchsorted(self.grams, gram)
+            if position < len(self.grams) and self.grams[position] == gram:
+                matches.append(self.gram_terms[self.gram_offsets[position]:self.gram_offsets[position + 1]])
+        if not matches:
+            return np.array([], dtype='int64')
+        candidates, shared = np.unique(np.concatenate(matches), return_counts=True)
+        term_grams = np.char.str_len(self.terms[candidates])  # '$term$' has len(term) trigrams, give or take repeats
+        similarity = shared / (len(query_grams) + term_grams - shared)
+        best = np.argsort(-similarity)[:self.fuzzy_candidates]
+        return candidates[best[similarity[best] >= self.fuzzy_similarity]]
+
+    def _expand(self, words):
+        """(term ids, weights) the query words stand for."""
+        ids, weights = [], []
+        for position, word in enumerate(words):
+            exact = self._term_id(word)
+            if exact is not None:
+                ids.append([exact])
+                weights.append([1.0])
+            if position == len(words) - 1 and len(word) >= 2:
+                prefix = self._prefix_ids(word)
+                prefix = prefix[prefix != exact] if exact is not None else prefix
+                ids.append(prefix)
+                weights.append(np.full(len(prefix), self.prefix_weight))
+                if exact is not None or len(prefix):
+                    continue
+            if exact is None and len(word) >= 3:
+                fuzzy = self._fuzzy_ids(word)
+                ids.append(fuzzy)
+                weights.append(np.full(len(fuzzy), self.fuzzy_weight))
+        if not ids:
+            return np.array([], dtype='int64'), np.array([], dtype='float32')
+        return np.concatenate(ids).astype('int64'), np.concatenate(weights).astype('float32')
+
+    def search(self, query, limit=10):
+        """[(key, score), ...] of the best matching documents, best first."""
+        term_ids, term_weights = self._expand(tokenize(query))
+        if not len(term_ids):
+            return []
+
+        starts, ends = self.post_offsets[term_ids], self.post_offsets[term_ids + 1]
+        lengths = ends - starts
+        positions = np.repeat(ends - np.cumsum(lengths), lengths) + np.arange(lengths.sum())
+        docs = self.post_docs[positions]
+        tfs = self.post_tfs[positions]
+        weights = np.repeat(self.idf[term_ids] * term_weights, lengths)
+        contributions = weights * tfs * (self.k1 + 1) / (tfs + self.norms[docs])
+        scores = np.bincount(docs, weights=contributions, minlength=len(self.keys))
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(int(self.keys[doc]), float(scores[doc])) for doc in matched]
@@ -1,9 +1,225 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 
+from pipeline.catalog import build_catalog, read_catalog
+from pipeline.snapshots import latest_version, snapshot_path, table_path
+from review_store import CACHE_DIR, ReviewStore, download
+from search_index import INDEX_FORMAT, IndexBuilder, InvertedIndex
+
 #Load the dataframes here
-#This file is created to load the data once and share with other .py scripts using the import statement
+#This file is created to load the data once and share with other .py scripts through current()
+#
+#When BOOKEND_DATA_DIR points to a folder of versioned snapshots (see pipeline/snapshots.py) a background
+#thread watches its LATEST file, loads the new version and its indexes off the request path and then swaps
+#it in. Callbacks call current() once and use the returned Dataset, so every request sees a single version.
+#Without BOOKEND_DATA_DIR the data is loaded once from Google Cloud Storage.
+#
+#Reviews are not loaded into memory: Dataset.reviews reads the rows of one book on demand (see review_store.py).
+#Dataset.catalog holds the totals, vocabularies and year bounds of the snapshot's catalog.json (computed at load
+#time for snapshots without one), so layouts and small callbacks don't scan df_books.
+#Dataset.search is the full-text index of the books, saved next to the snapshot and rebuilt only when the
+#searchable columns change.
+
+DATA_DIR = os.environ.get('BOOKEND_DATA_DIR')
+POLL_SECONDS = float(os.environ.get('BOOKEND_DATA_POLL_SECONDS', 30))
+GCS_URL = 'https://storage.googleapis.com/goodread_data/{name}.parquet'
+SEARCH_FIELDS = {'original_title': 3.0, 'author': 2.0, 'description': 1.0}  # field -> term frequency weight
+
+
+class Dataset:
+    """One immutable version of the dataframes, the review store and the lookup indexes the callbacks use."""
+
+    def __init__(self, version, df_books, reviews, df_users, df_sunburst, search=None, catalog=None):
+        self.version = version
+        self.df_books = df_books
+        self.reviews = reviews
+        self.df_users = df_users
+        self.df_sunburst = df_sunburst
+        self.search = search if search is not None else load_search_index(df_books)
+        self.catalog = catalog if catalog is not None else build_catalog(df_books, len(df_users))
+
+        # Positional indexes, built once per version instead of scanning the frames on every request
+        self.book_index = pd.Index(df_books['work_id'])
+        self.user_index = pd.Index(df_users['user_id'])
+        self.dummy_index = pd.Index(df_users['dummy_id'])
+
+    @classmethod
+    def load(cls, version, folder=None):
+        frames = {}
+        for name in ['books', 'users', 'sunburst']:
+            path = table_path(folder, name) if folder else GCS_URL.format(name=name)
+            # partitioned tables written by pipeline.ingest carry a hive 'bucket' column we don't need
+            frames[name] = pd.read_parquet(path).drop(columns='bucket', errors='ignore')
+
+        reviews_path = table_path(folder, 'selected_reviews') if folder else download(GCS_URL.format(name='selected_reviews'))
+        reviews = ReviewStore(reviews_path).warm()
+        search = load_search_index(frames['books'], folder)
+        catalog = read_catalog(folder) if folder else None
+        if catalog is not None and catalog['books_rows'] != len(frames['books']):
+            catalog = None  # written for another books table
+        return cls(version, frames['books'], reviews, frames['users'], frames['sunburst'], search, catalog)
+
+    def book(self, work_id):
+        """The df_books row of a book, or None."""
+        position = self.book_index.get_indexer([work_id])[0]
+        return None if position < 0 else self.df_books.iloc[position]
+
+    def books(self, work_ids):
+        """The df_books rows of the given books that exist, in the order of work_ids."""
+        positions = self.book_index.get_indexer(list(work_ids))
+        return self.df_books.iloc[positions[positions >= 0]]
+
+    def user(self, dummy_id):
+        """The df_users row of a user by the id typed on the profile page, or None."""
+        position = self.dummy_index.get_indexer([dummy_id])[0]
+        return None if position < 0 else self.df_users.iloc[position]
+
+    def user_names(self, user_ids):
+        """Reviewer names for the given user_ids (None where unknown)."""
+        positions = self.user_index.get_indexer(list(user_ids))
+        names = self.df_users['name'].values
+        return [names[position] if position >= 0 else None for position in positions]
+
+
+def load_search_index(df_books, folder=None):
+    """The saved search index of the folder if it was built from the same books, otherwise a fresh one."""
+    # snapshots hard link unchanged files from the previous version, so check the content, not the file
+    fingerprint = f"{INDEX_FORMAT}:{pd.util.hash_pandas_object(df_books[['work_id', *SEARCH_FIELDS]], index=False).sum()}"
+    path = os.path.join(folder or CACHE_DIR, 'search_index.npz')
+    if os.path.exists(path):
+        index = InvertedIndex.load(path)
+        if str(index.fingerprint) == fingerprint:
+            return index
+
+    index = IndexBuilder(SEARCH_FIELDS).add_frame(df_books, 'work_id').finish(fingerprint)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        index.save(path)
+    except OSError:  # read-only data folder, keep the index in memory only
+        pass
+    return index
+
+
+# --- Registry ---
+_active = None
+_lock = threading.Lock()
+_watcher_pid = None
+_stop_watching = threading.Event()
+_caches = []
+
+
+def current():
+    """The active Dataset. Read it once per callback and use that object for the whole request."""
+    if _active is None:
+        with _lock:
+            if _active is None:
+                _swap(_load_latest())
+    _ensure_watcher()
+    return _active
+
+
+def _load_latest():
+    if not DATA_DIR:
+        return Dataset.load('gcs')
+    version = latest_version(DATA_DIR)
+    return Dataset.load(version, snapshot_path(DATA_DIR, version))
+
+
+def _swap(dataset):
+    global _active
+    _active = dataset  # a single reference assignment, readers see either the old or the new version
+    for cache in _caches:
+        cache.retain(dataset.version)
+
+
+def stop_watcher():
+    """Wakes the snapshot watcher of this process up and ends it, e.g. from a gunicorn worker_exit hook."""
+    _stop_watching.set()
+
+
+def _watch():
+    while not _stop_watching.wait(POLL_SECONDS):
+        try:
+            version = latest_version(DATA_DIR)
+            if version and version != _active.version:
+                dataset = Dataset.load(version, snapshot_path(DATA_DIR, version))
+                with _lock:
+                    _swap(dataset)
+                print(f"Dataset version {version} is now active")
+        except Exception as error:  # keep serving the current version if a snapshot can't be loaded
+            print(f"Dataset reload failed: {error!r}")
+
+
+def _ensure_watcher():
+    # started lazily and per process, so it survives gunicorn forking its workers
+    global _watcher_pid
+    if DATA_DIR and _watcher_pid != os.getpid():
+        with _lock:
+            if _watcher_pid != os.getpid():
+                threading.Thread(target=_watch, name='dataset-watcher', daemon=True).start()
+                _watcher_pid = os.getpid()
+
+
+# --- Version-keyed caches ---
+class VersionedCache:
+    """LRU cache whose keys include the dataset version; entries of older versions are dropped on a swap."""
+
+    def __init__(self, maxsize, name='cache'):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        _caches.append(self)
+
+    def get(self, key, compute):
+        found, value = self.lookup(key)
+        if not found:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def lookup(self, key):
+        """(True, value) if the key is cached, (False, None) otherwise."""
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return True, self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def retain(self, version):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] != version]:
+                del self.entries[key]
+
+
+def caches():
+    """Every VersionedCache of the process, for the cache hit rates in metrics.py."""
+    return list(_caches)
+
+
+def versioned_cache(maxsize=128):
+    """Caches fn(data, *args) per (data.version, *args); args must be hashable."""
+    def decorator(fn):
+        cache = VersionedCache(maxsize, name=f'{fn.__module__}.{fn.__qualname__}')
+
+        @functools.wraps(fn)
+        def wrapper(data, *args):
+            return cache.get((data.version,) + args, lambda: fn(data, *args))
+
+        wrapper.cache = cache
+        return wrapper
 
-df_books = pd.read_parquet('https://storage.googleapis.com/goodread_data/books.parquet')
-df_selected_reviews = pd.read_parquet('https://storage.googleapis.com/goodread_data/selected_reviews.parquet')
-df_users = pd.read_parquet('https://storage.googleapis.com/goodread_data/users.parquet')
-df_sunburst = pd.read_parquet('https://storage.googleapis.com/goodread_data/sunburst.parquet')
+    return decorator
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import flask
+import pandas as pd
+import pytest
+
+import api
+import shared_data
+
+
+@pytest.fixture
+def client(monkeypatch):
+    books = pd.DataFrame({'work_id': [1, 2], 'original_title': ['Dune', 'Emma'], 'author': ['Herbert', 'Austen']})
+    data = SimpleNamespace(version='v1', df_books=books, book_index=pd.Index(books['work_id']))
+    monkeypatch.setattr(shared_data, 'current', lambda: data)
+    server = flask.Flask(__name__)
+    api.install(server)
+    return server.test_client()
+
+
+def test_books_multi_get(client):
+    response = client.post('/api/v1/books', json={'ids': [2, 3, 1], 'fields': ['title']})
+    assert response.status_code == 200
+    assert response.get_json() == {'version': 'v1', 'items': [{'title': 'Emma'}, {'title': 'Dune'}], 'missing': [3]}
+
+    response = client.get('/api/v1/books?ids=1&fields=title,author')
+    assert response.get_json()['items'] == [{'title': 'Dune', 'author': 'Herbert'}]
+    assert client.get('/api/v1/books?ids=1&fields=title,author', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+@pytest.mark.parametrize('body', [[1, 2], 5, 'ids', {'ids': 5}, {'ids': [1], 'fields': 'title'},
+                                  {'ids': [1], 'fields': [['title']]}, {'ids': ['x']}, {'ids': [1], 'fields': ['nope']}, {}])
+def test_malformed_post_bodies_are_bad_requests(client, body):
+    response = client.post('/api/v1/books', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,67 @@
+import json
+from types import SimpleNamespace
+
+import flask
+import numpy as np
+import pandas as pd
+import pytest
+
+from book_filter import check_spec, filter_mask, spec_mask
+import exports
+import shared_data
+
+
+BOOKS = pd.DataFrame({
+    'work_id': [1, 2, 3, 4],
+    'author': ['Austen', 'Tolkien', 'Austen', 'Herbert'],
+    'genres': ['romance, classics', 'Fantasy', None, 'science fiction (sci-fi), fantasy'],
+    'original_publication_year': [1813.0, 1937.0, 1815.0, np.nan],
+})
+
+
+def test_filter_mask_combines_the_filters():
+    assert filter_mask(BOOKS).tolist() == [True] * 4
+    assert filter_mask(BOOKS, genres=['fantasy']).tolist() == [False, True, False, True]
+    assert filter_mask(BOOKS, genres=['Sci-Fi)', 'romance']).tolist() == [True, False, False, True]  # escaped
+    assert filter_mask(BOOKS, authors=['Austen']).tolist() == [True, False, True, False]
+    assert filter_mask(BOOKS, years=[1800, 1900]).tolist() == [True, False, True, False]
+    assert filter_mask(BOOKS, genres=['fantasy'], authors=['Tolkien', 'Herbert'], years=[1900, 2000]).tolist() == \
+        [False, True, False, False]
+
+
+def test_spec_mask_reads_the_stored_filters():
+    assert spec_mask(BOOKS, None).all()
+    assert spec_mask(BOOKS, {'authors': ['Austen'], 'years': [1814, 1900], 'era': '1800s'}).tolist() == \
+        [False, False, True, False]
+
+
+@pytest.mark.parametrize('spec', [
+    {}, {'genres': None, 'authors': None, 'years': None, 'era': None},
+    {'genres': ['Fantasy'], 'authors': ['Austen'], 'years': [1900, 1950.5], 'era': 'modern'},
+])
+def test_check_spec_accepts_stored_specs(spec):
+    check_spec(spec)
+
+
+@pytest.mark.parametrize('spec', [
+    [], 'fantasy', {'genres': 'fantasy'}, {'authors': [1]}, {'years': [1990]}, {'years': [1990, '2000']},
+    {'years': [True, 2000]}, {'years': 1990},
+])
+def test_malformed_export_filters_are_bad_requests(spec, monkeypatch):
+    with pytest.raises(ValueError):
+        check_spec(spec)
+
+    monkeypatch.setattr(shared_data, 'current', lambda: SimpleNamespace(df_books=BOOKS))
+    server = flask.Flask(__name__)
+    exports.install(server)
+    response = server.test_client().get('/export/books.csv', query_string={'filters': json.dumps(spec)})
+    assert response.status_code == 400
+
+
+def test_export_streams_the_matching_books(monkeypatch):
+    monkeypatch.setattr(shared_data, 'current', lambda: SimpleNamespace(df_books=BOOKS))
+    server = flask.Flask(__name__)
+    exports.install(server)
+    response = server.test_client().get('/export/books.csv', query_string={'filters': '{"years": [1800, 1900]}'})
+    assert response.status_code == 200
+    assert response.headers['X-Row-Count'] == '2'
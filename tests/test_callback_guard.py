@@ -0,0 +1,119 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import flask
+import pytest
+from dash.exceptions import PreventUpdate
+from werkzeug.exceptions import ServiceUnavailable
+
+import callback_guard
+import shared_data
+from callback_guard import bounded, latest_only, single_flight
+
+
+server = flask.Flask(__name__)
+
+
+def call(fn, *args, tab=None, sequence=None):
+    """Calls fn in a request context of the given tab; returns the result or the exception raised."""
+    headers = {}
+    if tab:
+        headers[callback_guard.TAB_HEADER] = tab
+    if sequence is not None:
+        headers[callback_guard.SEQUENCE_HEADER] = str(sequence)
+    with server.test_request_context('/_dash-update-component', method='POST', headers=headers):
+        try:
+            return fn(*args)
+        except (PreventUpdate, ServiceUnavailable) as error:
+            return error
+
+
+def in_thread(fn, *args, **kwargs):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(call(fn, *args, **kwargs)))
+    thread.start()
+    return thread, results
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def blocking(calls):
+    gate = threading.Event()
+
+    def fn(value):
+        calls.append(value)
+        gate.wait(2)
+        return value
+
+    return fn, gate
+
+
+def test_single_flight_shares_one_computation(monkeypatch):
+    monkeypatch.setattr(shared_data, 'current', lambda: SimpleNamespace(version='v1'))
+    calls = []
+    fn, gate = blocking(calls)
+    fn = single_flight(fn)
+    first, first_result = in_thread(fn, 'a')
+    wait_until(lambda: calls)
+    second, second_result = in_thread(fn, 'a')
+    time.sleep(0.05)
+    gate.set()
+    first.join(), second.join()
+    assert calls == ['a']
+    assert first_result == second_result == ['a']
+
+
+def test_latest_only_drops_requests_superseded_in_the_same_tab():
+    calls = []
+    fn, gate = blocking(calls)
+    fn = latest_only(fn)
+    first, first_result = in_thread(fn, 1, tab='tab-a', sequence=1)
+    wait_until(lambda: calls)
+    second, second_result = in_thread(fn, 2, tab='tab-a', sequence=2)
+    other_tab, other_result = in_thread(fn, 9, tab='tab-b', sequence=1)
+    time.sleep(0.05)
+    third, third_result = in_thread(fn, 3, tab='tab-a', sequence=3)
+    time.sleep(0.05)
+    gate.set()
+    for thread in (first, second, other_tab, third):
+        thread.join()
+
+    assert first_result == [1] and third_result == [3] and other_result == [9]
+    assert isinstance(second_result[0], PreventUpdate)
+    assert sorted(calls) == [1, 3, 9]
+
+
+def test_latest_only_drops_late_retries_of_older_requests():
+    fn = latest_only(lambda value: value)
+    assert call(fn, 'new', tab='tab-c', sequence=5) == 'new'
+    assert isinstance(call(fn, 'retried', tab='tab-c', sequence=4), PreventUpdate)
+    assert call(fn, 'newer', tab='tab-c', sequence=6) == 'newer'
+
+
+def test_bounded_sheds_with_a_retry_after():
+    calls = []
+    fn, gate = blocking(calls)
+    fn = bounded(1, wait=0.01)(fn)
+    first, first_result = in_thread(fn, 1)
+    wait_until(lambda: calls)
+    shed = call(fn, 2)
+    gate.set()
+    first.join()
+
+    assert first_result == [1]
+    assert isinstance(shed, ServiceUnavailable)
+    assert shed.get_response().status_code == 503
+    assert shed.get_response().headers['Retry-After'] == str(callback_guard.RETRY_AFTER_SECONDS)
+    assert call(fn, 3) == 3
+
+
+@pytest.fixture(autouse=True)
+def reset_queues():
+    yield
+    callback_guard._latest.clear()
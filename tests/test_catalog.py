@@ -0,0 +1,45 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.catalog import CATALOG_FILE, FORMAT, clamp_eras, read_catalog, write_catalog
+
+
+def test_catalog_round_trip(tmp_path):
+    books = pd.DataFrame({
+        'work_id': [1, 2, 3, 4],
+        'author': ['Austen', 'Austen', 'Tolkien', None],
+        'genres': ['romance, classics', 'Romance', 'fantasy', None],
+        'original_publication_year': [1813.0, 1815.0, 1937.0, None],
+        'avg_rating': [4.0, 3.0, 5.0, 4.0],
+        'reviews_count': [10, 5, 20, 0],
+    })
+    pq.write_table(pa.Table.from_pandas(books, preserve_index=False), tmp_path / 'books.parquet')
+    pq.write_table(pa.table({'dummy_id': ['a', 'b']}), tmp_path / 'users.parquet')
+
+    written = write_catalog(str(tmp_path))
+    assert read_catalog(str(tmp_path)) == written
+    assert written['total_books'] == 4
+    assert written['total_reviews'] == 35
+    assert written['total_users'] == 2
+    assert written['overall_rating'] == 4.0
+    assert (written['min_year'], written['max_year']) == (1813, 1937)
+    assert written['eras'] == {'1800s': [1813, 1899], 'modern': [1900, 1937]}
+    assert all(first <= last for first, last in written['eras'].values())
+    assert written['genres'] == [['Romance', 2], ['Classics', 1], ['Fantasy', 1]]
+    assert written['authors'] == [['Austen', 2], ['Tolkien', 1]]
+
+
+def test_read_catalog_ignores_missing_and_older_formats(tmp_path):
+    assert read_catalog(str(tmp_path)) is None
+    (tmp_path / CATALOG_FILE).write_text(f'{{"format": {FORMAT - 1}}}')
+    assert read_catalog(str(tmp_path)) is None
+
+
+def test_eras_are_clamped_to_the_catalog_years():
+    eras = clamp_eras(1750, 2020)
+    assert eras['pre-1800s'] == [1750, 1799]
+    assert eras['2000s'] == [2000, 2020]
+    assert eras['modern'] == [1900, 1945]
+    assert list(clamp_eras(2005, 2005)) == ['2000s']
+    assert clamp_eras(None, None) == {}
@@ -0,0 +1,42 @@
+import base64
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.catalog import build_catalog
+import shared_data
+
+
+@pytest.fixture
+def dataset(monkeypatch):
+    books = pd.DataFrame({
+        'work_id': [1, 2, 3], 'original_title': ['Dune', 'Emma', None], 'image_url': ['a.jpg', 'b.jpg', None],
+        'author': ['Herbert', 'Austen', 'Austen'], 'genres': ['science fiction', 'romance, classics', None],
+        'original_publication_year': [1965.0, 1815.0, np.nan], 'reviews_count': [10, 5, 0],
+        'popularity_score': [0.9, 0.5, 0.0], 'avg_rating': [4.2, 3.9, np.nan],
+    })
+    data = SimpleNamespace(version='v1', df_books=books, catalog=build_catalog(books, 7))
+    monkeypatch.setattr(shared_data, 'current', lambda: data)
+    return data
+
+
+def test_catalog_is_served_once_per_version(dataset):
+    import app
+    from pages import explorer
+
+    client = app.server.test_client()
+    url = explorer.catalog_source(dataset)['url']
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    snapshot = json.loads(response.data)
+    assert snapshot['count'] == 3
+    assert snapshot['title'] == ['Dune', 'Emma', '']
+    assert np.isnan(np.frombuffer(base64.b64decode(snapshot['avg_rating']), '<f4')[2])
+
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    moved = client.get('/explorer/catalog/v0.json')
+    assert moved.status_code == 302 and moved.headers['Location'].endswith(url)
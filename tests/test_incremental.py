@@ -0,0 +1,89 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.incremental import IncrementalAggregator
+from pipeline.snapshots import latest_version, publish_snapshot, snapshot_path, write_manifest
+
+
+def make_books(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 50, size=n)
+    counts[::7] = 0  # unrated books all get the same score: ties broken by work_id
+    books = pd.DataFrame({
+        'work_id': rng.permutation(np.arange(1, n + 1) * 3),
+        'avg_rating': np.where(counts > 0, rng.integers(10, 50, size=n) / 10, 0),
+        'ratings_count': counts,
+        'reviews_count': counts // 2,
+        'author': [f'Author {i % 9}' for i in range(n)],
+        'genres': 'fiction, fantasy',
+        'original_publication_year': 2000.0,
+    })
+    return books
+
+
+def make_delta(books, n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'work_id': books['work_id'].values[rng.integers(0, len(books), size=n)],
+        'rating': rng.integers(1, 6, size=n),
+        'is_review': rng.random(n) < 0.3,
+    })
+
+
+def refreshed(aggregator):
+    """A copy of the aggregator rescored from scratch with the same catalog mean."""
+    copy = IncrementalAggregator(aggregator.stats.copy(), dict(aggregator.params))
+    copy.stats['popularity_score'] = copy.scores()
+    order = np.lexsort((copy.stats.index.values, -copy.stats['popularity_score'].values))
+    copy.stats['popularity_rank'] = 0
+    copy.stats.iloc[order, copy.stats.columns.get_loc('popularity_rank')] = np.arange(1, len(order) + 1)
+    return copy
+
+
+@pytest.mark.parametrize('min_votes_quantile', [0.0, 0.9])
+def test_apply_matches_a_full_refresh(min_votes_quantile):
+    books = make_books()
+    aggregator = IncrementalAggregator.from_books(books, min_votes_quantile=min_votes_quantile, mean_tolerance=10)
+    for seed in range(5):
+        aggregator.apply(make_delta(books, 30, seed))
+        expected = refreshed(aggregator)
+        assert not aggregator.stats['popularity_score'].isna().any()
+        np.testing.assert_allclose(aggregator.stats['popularity_score'], expected.stats['popularity_score'])
+        assert (aggregator.stats['popularity_rank'] == expected.stats['popularity_rank']).all()
+
+
+def test_apply_ignores_books_outside_the_catalog():
+    books = make_books()
+    aggregator = IncrementalAggregator.from_books(books, mean_tolerance=10)
+    ranks = aggregator.stats['popularity_rank'].copy()
+    assert aggregator.apply(pd.DataFrame({'work_id': [10 ** 9], 'rating': [5]})) == []
+    assert len(aggregator.stats) == len(books)
+    assert (aggregator.stats['popularity_rank'] == ranks).all()
+
+
+def test_publish_rewrites_the_manifest(tmp_path):
+    data_dir = str(tmp_path)
+    books = make_books()
+
+    def write(folder):
+        books.to_parquet(os.path.join(folder, 'books.parquet'), index=False)
+        pd.DataFrame({'user_id': ['a', 'b']}).to_parquet(os.path.join(folder, 'users.parquet'), index=False)
+        write_manifest(folder, {'books': 'test'})
+
+    base = publish_snapshot(data_dir, write)
+    aggregator = IncrementalAggregator.from_books(books)
+    aggregator.apply(make_delta(books, 100, 0))
+    version = aggregator.publish(data_dir)
+
+    assert latest_version(data_dir) == version != base
+    with open(os.path.join(snapshot_path(data_dir, base), 'manifest.json')) as file:
+        old = json.load(file)
+    with open(os.path.join(snapshot_path(data_dir, version), 'manifest.json')) as file:
+        new = json.load(file)
+    assert new['sources'] == {'books': 'test'}
+    assert new['tables']['users'] == old['tables']['users']
+    assert new['tables']['books']['files'][0]['sha256'] != old['tables']['books']['files'][0]['sha256']
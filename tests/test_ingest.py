@@ -0,0 +1,97 @@
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+from pipeline import ingest
+from pipeline.snapshots import latest_version, snapshot_path
+import shared_data
+
+
+DATE = 'Sun Jul 30 07:44:10 -0700 2017'
+
+
+def write_dump(path, records):
+    with gzip.open(path, 'wt') as file:
+        for record in records:
+            file.write(json.dumps(record) + '\n')
+    return str(path)
+
+
+def read_dump(path):
+    with gzip.open(path, 'rt') as file:
+        return [json.loads(line) for line in file]
+
+
+@pytest.fixture
+def dumps(tmp_path):
+    books = [{
+        'book_id': str(book_id), 'work_id': str(book_id * 10), 'title': f'Book {book_id}',
+        'authors': [{'author_id': str(book_id % 3)}], 'publication_year': str(1990 + book_id),
+        'num_pages': '300', 'description': f'A story about the number {book_id}', 'image_url': 'cover.jpg',
+        'average_rating': '3.9', 'ratings_count': str(book_id * 7), 'similar_books': [str(book_id % 8 + 1)],
+    } for book_id in range(1, 9)]
+    authors = [{'author_id': str(author_id), 'name': f'Author {author_id}'} for author_id in range(3)]
+    genres = [{'book_id': str(book_id), 'genres': {'fiction': 10, 'fantasy': book_id}} for book_id in range(1, 9)]
+    reviews = [{
+        'user_id': f'{user:032x}', 'book_id': str(user % 8 + 1), 'rating': str(user % 5 + 1),
+        'review_text': 'loved it, a great read' if user % 2 else 'boring and slow',
+        'date_added': DATE, 'started_at': 'Sun Jul 02 07:44:10 -0700 2017', 'read_at': DATE,
+    } for user in range(40)]
+    return {name: write_dump(tmp_path / f'{name}.json.gz', records)
+            for name, records in [('books', books), ('authors', authors), ('genres', genres), ('reviews', reviews)]}
+
+
+def test_ingest_publishes_a_snapshot_the_app_loads(dumps, tmp_path):
+    data_dir = tmp_path / 'data'
+    version, manifest = ingest.ingest(dumps['books'], dumps['authors'], dumps['genres'], dumps['reviews'],
+                                      str(data_dir), workers=1, buckets=4)
+
+    assert latest_version(str(data_dir)) == version
+    assert manifest['tables']['books']['rows'] == 8
+    data = shared_data.Dataset.load(version, snapshot_path(str(data_dir), version))
+    assert set(ingest.BOOK_SCHEMA.names) <= set(data.df_books.columns)
+    assert data.df_books['reviews_count'].sum() == 40
+    assert data.catalog['total_reviews'] == 40
+    assert data.df_users['dummy_id'].is_unique
+    assert data.user(data.df_users['dummy_id'].iloc[0]) is not None
+    assert len(data.reviews.reviews(20)) == 5
+
+
+def test_dummy_ids_are_unique_prefixes():
+    user_ids = ['abcdefghij01', 'abcdefghij02', 'abcdefghik00', 'zz']
+    short = ingest.dummy_ids(user_ids, length=10)
+    assert short.is_unique
+    assert short['abcdefghik00'] == 'abcdefghik'
+    assert short['zz'] == 'zz'
+    assert all(user_id.startswith(short[user_id]) for user_id in user_ids)
+    assert len(ingest.dummy_ids(np.array([f'{i:06d}' for i in range(5000)]), length=3)) == 5000
+
+
+def test_pages_render_books_and_users_with_missing_values(dumps, tmp_path, monkeypatch):
+    def without(record, *keys):
+        return {key: value for key, value in record.items() if key not in keys}
+
+    books = read_dump(dumps['books'])
+    books = [without(book, 'publication_year', 'num_pages') if int(book['book_id']) % 2 else book for book in books]
+    reviews = [without(review, 'started_at', 'read_at') for review in read_dump(dumps['reviews'])]
+    dumps['books'] = write_dump(tmp_path / 'books.json.gz', books)
+    dumps['reviews'] = write_dump(tmp_path / 'reviews.json.gz', reviews)
+    data_dir = tmp_path / 'data'
+    version, _ = ingest.ingest(dumps['books'], dumps['authors'], dumps['genres'], dumps['reviews'],
+                               str(data_dir), workers=1, buckets=2)
+    data = shared_data.Dataset.load(version, snapshot_path(str(data_dir), version))
+    assert data.df_books['Avg_Reading_Time'].isna().all()
+    assert data.df_books['num_pages'].isna().any()
+
+    monkeypatch.setattr(shared_data, 'current', lambda: data)
+    import app  # noqa: F401  (registers the pages)
+    from pages import book_dive, recommender
+
+    for work_id in data.df_books['work_id']:
+        for name in ['update_book_details', 'update_rating_chart', 'update_review_summary', 'update_reviews',
+                     'update_sentiment_chart', 'update_similar_books']:
+            assert getattr(book_dive, name).__wrapped__(f'/book_dive/{work_id}')
+    for dummy_id in data.df_users['dummy_id']:
+        assert 'Unknown' in str(recommender.update_profile_page.__wrapped__(1, dummy_id))
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import flask
+import pytest
+
+import responses
+
+
+@pytest.fixture
+def client():
+    server = flask.Flask(__name__)
+    responses.install(SimpleNamespace(server=server))
+
+    @server.route('/report')
+    def report():
+        return flask.jsonify({'rows': list(range(1000))})
+
+    return server.test_client()
+
+
+def test_etags_are_weak_on_compressed_responses(client):
+    plain = client.get('/report', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/report', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+
+    assert not plain.headers['ETag'].startswith('W/')
+    assert compressed.headers['ETag'] == 'W/' + plain.headers['ETag']
+
+    for etag in [plain.headers['ETag'], compressed.headers['ETag']]:
+        assert client.get('/report', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.review_features import LexiconScorer, aggregate_batch, build_features, finalize
+
+DATE = 'Sun Jul 30 07:44:10 -0700 2017'
+
+
+def write_reviews(path, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    texts = np.array(['loved it, a great read', 'boring and slow', 'it was a book', '', '?!... ', None], dtype=object)
+    dated = rng.random(n) < 0.5
+    df = pd.DataFrame({
+        'work_id': rng.integers(1, 12, size=n),
+        'rating': rng.integers(0, 6, size=n),
+        'review_text': texts[rng.integers(0, len(texts), size=n)],
+        'started_at': np.where(dated, 'Sun Jul 02 07:44:10 -0700 2017', None),
+        'read_at': np.where(dated | (rng.random(n) < 0.5), DATE, None),
+    })
+    df.loc[df['work_id'] == 11, ['started_at', 'read_at']] = None  # a book read without any dates
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+    return df
+
+
+def test_chunked_features_match_a_single_pass(tmp_path):
+    path = tmp_path / 'reviews.parquet'
+    reviews = write_reviews(path)
+
+    single = build_features(str(path), workers=1, batch_size=len(reviews)).set_index('work_id').sort_index()
+    chunked = build_features(str(path), workers=2, batch_size=17, merge_every=2).set_index('work_id').sort_index()
+    pd.testing.assert_frame_equal(chunked, single, check_exact=False)
+
+    assert single['reviews_count'].sum() == len(reviews)
+    assert pd.isna(single.loc[11, 'Avg_Reading_Time'])
+    assert single['Avg_Reading_Time'].dropna().eq(pd.Timedelta(days=28)).all()
+
+
+def test_only_texts_with_words_are_scored():
+    batch = pa.RecordBatch.from_pandas(pd.DataFrame({
+        'work_id': [1, 1, 1, 1], 'rating': [5, 4, 3, None], 'review_text': ['great', '', '...  !', None],
+        'started_at': [None] * 4, 'read_at': [None] * 4,
+    }), preserve_index=False)
+    partial = aggregate_batch(batch, LexiconScorer())
+    assert partial.loc[1, 'scored_count'] == 1
+    features = finalize(partial).iloc[0]
+    assert features['avg_sentiment_pos'] == 1.0
+    assert features['reviews_count'] == 4
+    assert pd.isna(features['Avg_Reading_Time'])
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import review_store
+from review_store import ReviewStore, download
+
+
+def write_reviews(path, work_ids, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'work_id': np.asarray(work_ids, dtype='int64'),
+        'user_id': [f'user{i}' for i in range(len(work_ids))],
+        'rating': rng.integers(1, 6, size=len(work_ids)),
+        'review_text': ['text'] * len(work_ids),
+        'date_added': pd.Timestamp('2017-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 1000, len(work_ids)), 'D'),
+        'n_votes': 0,
+    })
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=len(work_ids))
+
+
+def test_download_sorts_by_work_id_and_follows_the_remote_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_store, 'REVIEW_ROW_GROUP', 100)
+    source = tmp_path / 'selected_reviews.parquet'
+    write_reviews(source, np.random.default_rng(0).integers(1, 50, size=1000))
+    url = source.as_uri()
+
+    path = download(url, str(tmp_path / 'cache'))
+    assert download(url, str(tmp_path / 'cache')) == path
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == 10
+    store = ReviewStore(path).warm()
+    indexed = store._file(path)
+    assert indexed.mins is not None  # sorted: the row-group statistics are the index
+    assert len(indexed.row_groups(25)) <= 2
+
+    reviews = store.reviews(25)
+    assert list(reviews.columns) == review_store.REVIEW_COLUMNS
+    assert (reviews['work_id'] == 25).all()
+    assert reviews['date_added'].is_monotonic_decreasing
+
+    write_reviews(source, [1, 2, 3], seed=1)
+    os.utime(source, (1e9, 1e9))  # a new Last-Modified date
+    new_path = download(url, str(tmp_path / 'cache'))
+    assert new_path != path and not os.path.exists(path)
+    assert len(ReviewStore(new_path).reviews(2)) == 1
+
+
+def test_unsorted_files_use_the_sidecar_index(tmp_path):
+    path = str(tmp_path / 'reviews.parquet')
+    write_reviews(path, [5, 1, 5, 3] * 25)
+    pq.write_table(pq.read_table(path), path, row_group_size=10)
+    store = ReviewStore(path).warm()
+    assert store._file(path).mins is None
+    assert len(store.reviews(5)) == 50
+    assert store.reviews(4).empty
@@ -0,0 +1,62 @@
+import pandas as pd
+
+from search_index import MAX_TOKEN_LENGTH, IndexBuilder, InvertedIndex, PrefixIndex
+
+
+def test_prefix_index_matches_word_starts_heaviest_first():
+    index = PrefixIndex(['Stephen King', 'Gabriel García Márquez', 'Stephenie Meyer', 'Carole King'], [5, 3, 8, 1])
+    assert index.search('king') == ['Stephen King', 'Carole King']
+    assert index.search('steph') == ['Stephenie Meyer', 'Stephen King']
+    assert index.search('garcia marq') == ['Gabriel García Márquez']
+    assert index.search('  ') == []
+    assert index.search('st', limit=1) == ['Stephenie Meyer']
+
+
+def test_prefix_index_bounds_the_short_query_cache():
+    index = PrefixIndex([f'author {i}' for i in range(100)], range(100))
+    for i in range(3 * index.short_cache_size):
+        index.search(chr(0x4e00 + i))
+    assert index._short_search.cache_info().currsize == index.short_cache_size
+
+    results = index.search('au', limit=3)
+    results.append('mutated')
+    assert index.search('au', limit=3) == ['author 99', 'author 98', 'author 97']
+
+
+def build_index():
+    books = pd.DataFrame({
+        'work_id': [1, 2, 3, 4],
+        'title': ['The Hobbit', 'The Lord of the Rings', 'Dune', 'Hobbit Houses'],
+        'author': ['J.R.R. Tolkien', 'J.R.R. Tolkien', 'Frank Herbert', 'Anne Builder'],
+        'description': ['A hobbit goes on a journey', 'The ring must be destroyed', 'Spice and sand worms',
+                        'http://example.com/' + 'x' * 500],
+    })
+    return IndexBuilder({'title': 3.0, 'author': 2.0, 'description': 1.0}).add_frame(books, 'work_id').finish('test')
+
+
+def test_inverted_index_ranks_with_bm25():
+    index = build_index()
+    results = index.search('hobbit')
+    assert [key for key, _ in results] == [1, 4]  # the description mention adds to the title one
+    assert results[0][1] > results[1][1] > 0
+    assert [key for key, _ in index.search('tolkien rings', limit=1)] == [2]
+    assert index.search('nothing matches zzz') == []
+
+
+def test_inverted_index_prefix_and_fuzzy_matching():
+    index = build_index()
+    assert {key for key, _ in index.search('tolk')} == {1, 2}
+    assert [key for key, _ in index.search('hobit')][0] == 1
+    assert [key for key, _ in index.search('herbrt')] == [3]
+    assert index.search('tolk')[0][1] < index.search('tolkien')[0][1]
+
+
+def test_inverted_index_caps_terms_and_round_trips(tmp_path):
+    index = build_index()
+    assert index.terms.dtype.itemsize <= MAX_TOKEN_LENGTH
+    assert [key for key, _ in index.search('x' * 500)] == [4]
+
+    index.save(str(tmp_path / 'index.npz'))
+    loaded = InvertedIndex.load(str(tmp_path / 'index.npz'))
+    assert str(loaded.fingerprint) == 'test'
+    assert loaded.search('hobit') == index.search('hobit')
@@ -0,0 +1,15 @@
+import threading
+
+import shared_data
+
+
+def test_stop_watcher_ends_the_watcher_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_data, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(shared_data, 'POLL_SECONDS', 60)
+    monkeypatch.setattr(shared_data, '_stop_watching', threading.Event())
+    watcher = threading.Thread(target=shared_data._watch, daemon=True)
+    watcher.start()
+
+    shared_data.stop_watcher()
+    watcher.join(timeout=5)
+    assert not watcher.is_alive()